@@ -1,12 +1,40 @@
-from openai import OpenAI
-
+import logging
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+from codexa.client.hedging import Attempt, HedgePolicy, hedged_call
+from codexa.client.packing import (
+    DETAIL,
+    FAILURE,
+    SOURCE,
+    Chunk,
+    PackedPrompt,
+    PromptPacker,
+    pack_test_output,
+    split_diff,
+)
+from codexa.client.results import TestResult
+from codexa.client.routing import InputProfile, ModelRouter, log_decision
+from codexa.client.tokens import estimate_tokens, prompt_budget
+from codexa.client.transport import get_client
+from codexa.client.usage import USAGE, UsageRecord
+from codexa.core.config import load_config
 from codexa.core.errors import CodexaAccessorError
+from codexa.core.profiling import span
+
+logger = logging.getLogger(__name__)
 
 
 class RemoteAIAccessor:
     """Class for interacting with remote LLM APIs.
 
-    Uses the DeepSeek R1 free model by default.
+    Uses the DeepSeek R1 free model by default. With a hedging policy, the
+    policy's first endpoint is the primary one and slow or failing requests
+    are hedged to the next endpoints. With a model router, requests carrying
+    an input profile are sent to a model matching their size and complexity.
+    Messages are packed to fit the smallest context window among all the
+    models a request may reach.
     """
 
     def __init__(
@@ -15,15 +43,23 @@ class RemoteAIAccessor:
         prompt: str,
         base_url: str = "https://openrouter.ai/api/v1",
         model: str = "deepseek/deepseek-r1:free",
+        hedging: Optional[HedgePolicy] = None,
+        routing: Optional[ModelRouter] = None,
+        context_windows: Optional[Dict[str, int]] = None,
     ) -> None:
         if not api_key:
             raise CodexaAccessorError("API key is required")
         if not prompt:
             raise CodexaAccessorError("Accessor requires setup prompt")
+        if hedging is not None:
+            base_url, model = hedging.targets[0].base_url, hedging.targets[0].model
         self.__api_key = api_key
+        self.__hedging = hedging
+        self.__routing = routing
+        self.__context_windows = context_windows or {}
         self.__base_url = base_url
         self.__model = model
-        self.__client = OpenAI(api_key=self.__api_key, base_url=self.__base_url)
+        self.__client = get_client(self.__base_url, self.__api_key)
         self.__setup_prompt = prompt
 
     @property
@@ -31,28 +67,51 @@ class RemoteAIAccessor:
         """Return the setup prompt."""
         return self.__setup_prompt
 
-    def make_request(self, message: str, timeout: float = 60.0) -> str:
-        """Make a request to the LLM API.
+    @property
+    def model(self) -> str:
+        """Return the model used for requests."""
+        return self.__model
 
-        Args:
-            message (str): Interaction message
-            timeout (float, optional): Request timeout (s), defaults to 60.0.
+    def prompt_budget(self, preamble: str = "") -> int:
+        """Get the tokens available for content sent after a preamble.
 
-        Raises:
-            CodexaGenerationError: If the LLM API call fails
+        Args:
+            preamble (str, optional): Fixed message text preceding the content
 
         Returns:
-            str: LLM response text
+            int: Content budget (tokens)
         """
-        response = self.__client.chat.completions.create(
-            model=self.__model,
-            messages=[
-                {"role": "system", "content": self.__setup_prompt},
-                {"role": "user", "content": message},
-            ],
-            stream=False,
-            timeout=timeout,
+        models = [self.__model]
+        if self.__hedging is not None:
+            models += [t.model for t in self.__hedging.targets]
+        if self.__routing is not None:
+            models += [self.__routing.fast_model, self.__routing.large_model]
+        budget = prompt_budget(
+            [m for m in models if m], self.__setup_prompt, self.__context_windows
+        )
+        return max(budget - estimate_tokens(preamble), 0)
+
+    def log_packing(self, packed: PackedPrompt, content: str) -> None:
+        """Report the content that was left out to fit the context window."""
+        if packed.complete:
+            return
+        logger.warning(
+            f"Sending partial {content} to fit a {packed.budget}-token budget: "
+            f"{len(packed.truncated)} section(s) truncated, "
+            f"{len(packed.omitted)} omitted"
         )
+        for label in packed.truncated:
+            logger.info(f"Truncated: {label}")
+        for label in packed.omitted:
+            logger.info(f"Omitted: {label}")
+
+    def __messages(self, message: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.__setup_prompt},
+            {"role": "user", "content": message},
+        ]
+
+    def __read_completion(self, response: Any) -> str:
         content = response.choices[0].message.content
         if not content:
             reason = response.choices[0].message.refusal
@@ -62,11 +121,153 @@ class RemoteAIAccessor:
             )
         return content
 
+    def __complete(self, message: str, timeout: float, model: str) -> str:
+        start = time.perf_counter()
+        response: Any = None
+        status = "error"
+        try:
+            response = self.__client.chat.completions.create(
+                model=model,
+                messages=self.__messages(message),
+                stream=False,
+                timeout=timeout,
+            )
+            content = self.__read_completion(response)
+            status = "ok"
+            return content
+        finally:
+            USAGE.record(
+                UsageRecord.from_usage(
+                    getattr(response, "usage", None),
+                    model=model,
+                    latency_s=time.perf_counter() - start,
+                    status=status,
+                )
+            )
+
+    def __stream(
+        self,
+        message: str,
+        timeout: float,
+        model: str,
+        attempt: Optional[Attempt] = None,
+    ) -> str:
+        client = self.__client
+        if attempt is not None:
+            target = attempt.target
+            client = get_client(target.base_url, target.api_key or self.__api_key)
+            model = target.model
+        start = time.perf_counter()
+        first_token: Optional[float] = None
+        usage: Any = None
+        parts: List[str] = []
+        status = "error"
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=self.__messages(message),
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+            )
+            if attempt is not None:
+                attempt.register(stream)
+            for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if first_token is None and (
+                    delta.content or getattr(delta, "reasoning", None)
+                ):
+                    first_token = time.perf_counter() - start
+                    if attempt is not None:
+                        attempt.first_token.set()
+                if delta.content:
+                    parts.append(delta.content)
+            content = "".join(parts)
+            if not content:
+                raise CodexaAccessorError(
+                    message="Failed to generate code: empty response stream",
+                    help_text="Please try again re-running the command",
+                )
+            status = "ok"
+            return content
+        finally:
+            if status != "ok" and attempt is not None and attempt.cancelled.is_set():
+                status = "cancelled"
+            USAGE.record(
+                UsageRecord.from_usage(
+                    usage,
+                    model=model,
+                    latency_s=time.perf_counter() - start,
+                    ttft_s=first_token,
+                    streamed=True,
+                    status=status,
+                )
+            )
+
+    def __dispatch(self, message: str, timeout: float, stream: bool, model: str) -> str:
+        if self.__hedging is not None:
+            primary, *fallbacks = self.__hedging.targets
+            return hedged_call(
+                [replace(primary, model=model), *fallbacks],
+                lambda attempt: self.__stream(message, timeout, model, attempt),
+                delay=self.__hedging.delay(model=model),
+            )
+        if stream:
+            return self.__stream(message, timeout, model)
+        return self.__complete(message, timeout, model)
+
+    def make_request(
+        self,
+        message: str,
+        timeout: float = 60.0,
+        stream: bool = False,
+        profile: Optional[InputProfile] = None,
+    ) -> str:
+        """Make a request to the LLM API.
+
+        Token usage and latency of every request are recorded, including the
+        time to first token when streaming. With a hedging policy the request
+        is always streamed, so that the first token can be awaited.
+
+        Args:
+            message (str): Interaction message
+            timeout (float, optional): Request timeout (s), defaults to 60.0.
+            stream (bool, optional): Stream the response, defaults to False.
+            profile (InputProfile, optional): Input size and complexity, used
+                to route the request to a model
+
+        Raises:
+            CodexaGenerationError: If the LLM API call fails
+
+        Returns:
+            str: LLM response text
+        """
+        if self.__routing is None or profile is None:
+            with span("llm.request", model=self.__model, chars=len(message)):
+                return self.__dispatch(message, timeout, stream, self.__model)
+
+        decision = self.__routing.route(profile, self.__model)
+        start, ok = time.perf_counter(), False
+        try:
+            with span("llm.request", model=decision.model, chars=len(message)):
+                response = self.__dispatch(message, timeout, stream, decision.model)
+            ok = True
+            return response
+        finally:
+            log_decision(decision, time.perf_counter() - start, ok, USAGE.command)
+
 
 class ReportScanner(RemoteAIAccessor):
-    """Class for generating test report summary."""
+    """Class for generating test report summary.
+
+    The configuration is loaded from the working directory unless given.
+    """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, config: Optional[Dict[str, Any]] = None):
         self.__setup_prompt = """Take on the role of a Senior QA Engineer.
 
         I need to implement testing in Python. I am using Pytest as my test harness.
@@ -92,7 +293,14 @@ class ReportScanner(RemoteAIAccessor):
         the summary, not write additional comments or greetings.
         """
 
-        super().__init__(api_key, prompt=self.__setup_prompt)
+        config = load_config() if config is None else config
+        super().__init__(
+            api_key,
+            prompt=self.__setup_prompt,
+            hedging=HedgePolicy.from_config(config),
+            routing=ModelRouter.from_config(config),
+            context_windows=(config.get("llm", {}) or {}).get("context_windows"),
+        )
 
     def analyze_tests(self, test_output: str, timeout: float = 60.0) -> str:
         """Read the test execution output and generate a report.
@@ -103,14 +311,57 @@ class ReportScanner(RemoteAIAccessor):
         Returns:
             str: Generated test summary report
         """
-        message = f"Generate a report for the following test output:\n\n{test_output}"
-        return self.make_request(message, timeout)
+        preamble = "Generate a report for the following test output:\n\n"
+        packed = pack_test_output(test_output, self.prompt_budget(preamble))
+        self.log_packing(packed, "test output")
+        profile = InputProfile.from_test_output(packed.text)
+        return self.make_request(preamble + packed.text, timeout, profile=profile)
+
+    def analyze_failures(
+        self,
+        failures: List[TestResult],
+        timeout: float = 60.0,
+        appendix: Optional[str] = None,
+    ) -> str:
+        """Explain a set of failures that could not be diagnosed locally.
+
+        Args:
+            failures (List[TestResult]): Failed test results
+            appendix (str, optional): Supporting context such as the test
+                profile, packed after the failures
+
+        Returns:
+            str: Generated failure analysis
+        """
+        sections = [
+            Chunk(
+                f.node_id,
+                f"## {f.node_id}\n\n{f.longrepr or f.message or 'No details'}\n\n",
+                FAILURE,
+            )
+            for f in failures
+        ]
+        if appendix:
+            sections.append(Chunk("appendix", f"{appendix}\n", DETAIL))
+        preamble = (
+            "Only explain the following failing tests; other results are already "
+            "covered. Start the section for each test with a `## <node id>` "
+            "heading, and do not add a run summary.\n\n"
+        )
+        packed = PromptPacker(self.prompt_budget(preamble)).pack(sections)
+        self.log_packing(packed, "failures")
+        message = preamble + packed.text
+        profile = InputProfile.from_failures(failures, message)
+        return self.make_request(message, timeout, profile=profile)
 
 
 class RepoAnalyzer(RemoteAIAccessor):
-    """Class for analyzing the repository."""
+    """Class for analyzing the repository.
 
-    def __init__(self, api_key: str):
+    The configuration is loaded from the working directory unless given.
+    """
+
+    def __init__(self, api_key: str, config: Optional[Dict[str, Any]] = None):
         self.__setup_prompt = """# Overview
 
         Take on the role of a Senior Software Engineer,
@@ -152,16 +403,33 @@ class RepoAnalyzer(RemoteAIAccessor):
         - You are not writing the tests — you are identifying and planning them.
         """
 
-        super().__init__(api_key, prompt=self.__setup_prompt)
+        config = load_config() if config is None else config
+        super().__init__(
+            api_key,
+            prompt=self.__setup_prompt,
+            hedging=HedgePolicy.from_config(config),
+            routing=ModelRouter.from_config(config),
+            context_windows=(config.get("llm", {}) or {}).get("context_windows"),
+        )
 
-    def compare_diff(self, diff: str, timeout: float = 60.0) -> str:
+    def compare_diff(
+        self, diff: str, timeout: float = 60.0, context: Optional[str] = None
+    ) -> str:
         """Assess the repository changes and generate a report.
 
         Args:
             diff (str): Repository changes
+            context (str, optional): Repository context on the changed
+                symbols, packed after the source changes
 
         Returns:
             str: Generated test summary report
         """
-        message = f"Prepare an analysis and report for this diff:\n\n{diff}"
-        return self.make_request(message, timeout)
+        preamble = "Prepare an analysis and report for this diff:\n\n"
+        chunks = split_diff(diff)
+        if context:
+            chunks.append(Chunk("repository context", f"\n{context}", SOURCE))
+        packed = PromptPacker(self.prompt_budget(preamble)).pack(chunks)
+        self.log_packing(packed, "diff")
+        profile = InputProfile.from_diff(packed.text)
+        return self.make_request(preamble + packed.text, timeout, profile=profile)
@@ -0,0 +1,422 @@
+import hashlib
+import io
+import logging
+import shlex
+import tarfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError
+
+import docker
+from docker.errors import DockerException
+
+from codexa.client.executor import ExecutionBackend
+from codexa.client.results import TestResult, parse_junit_xml
+from codexa.core.errors import CodexaExecutionError
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "codexa.pool"
+DEPENDENCY_LABEL = "codexa.dependencies"
+JUNIT_REPORT_DIR = "/tmp"
+LEASE_DIR = "/tmp/codexa.lease"
+# Leases older than this are left over from crashed runs and can be taken over
+LEASE_TIMEOUT_MINUTES = 120
+# Keeps every command line well below ARG_MAX
+MAX_COMMAND_BYTES = 64 * 1024
+
+DEFAULT_DEPENDENCY_FILES = ("requirements.txt", "pyproject.toml", "uv.lock")
+DEFAULT_IGNORED_NAMES = frozenset(
+    {
+        ".git",
+        ".venv",
+        "venv",
+        "__pycache__",
+        ".pytest_cache",
+        ".mypy_cache",
+        ".codexa",
+        "node_modules",
+    }
+)
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _is_ignored(relative: str, ignored: Iterable[str]) -> bool:
+    parts = Path(relative).parts
+    return any(part in ignored or part.endswith(".egg-info") for part in parts)
+
+
+def build_manifest(
+    source_dir: Path, ignored: Iterable[str] = DEFAULT_IGNORED_NAMES
+) -> Dict[str, str]:
+    """Hash every file of the workspace that should be shipped to a container.
+
+    Args:
+        source_dir (Path): Root of the local workspace
+        ignored (Iterable[str], optional): Directory or file names to skip
+
+    Returns:
+        Dict[str, str]: Mapping of POSIX relative path to SHA-1 digest
+    """
+    ignored = set(ignored)
+    manifest = {}
+    for path in sorted(source_dir.rglob("*")):
+        relative = path.relative_to(source_dir)
+        if _is_ignored(relative.as_posix(), ignored):
+            continue
+        if path.is_file() and not path.is_symlink():
+            manifest[relative.as_posix()] = _sha1(path.read_bytes())
+    return manifest
+
+
+def dependency_digest(source_dir: Path, files: Iterable[str]) -> str:
+    """Compute a digest of the files that define the dependency layer."""
+    digest = hashlib.sha1()
+    for name in sorted(files):
+        path = source_dir / name
+        if path.is_file():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _make_archive(source_dir: Path, paths: Iterable[str]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        for path in paths:
+            archive.add(str(source_dir / path), arcname=path, recursive=False)
+    return buffer.getvalue()
+
+
+def _decode(data: Optional[bytes]) -> str:
+    return data.decode(errors="replace") if data else ""
+
+
+def _batches(paths: List[str], limit: int = MAX_COMMAND_BYTES) -> List[List[str]]:
+    batches: List[List[str]] = []
+    size = limit
+    for path in paths:
+        length = len(path.encode()) + 1
+        if size + length > limit:
+            batches.append([])
+            size = 0
+        batches[-1].append(path)
+        size += length
+    return batches
+
+
+class ContainerPool:
+    """Pool of long-lived containers with the dependency layer pre-installed.
+
+    Containers are tagged with the pool name and a digest of the dependency
+    files, so that later runs can pick them up again instead of starting and
+    provisioning fresh containers. Containers built from outdated dependency
+    files are retired automatically.
+
+    A container is leased to one run at a time through a lock directory
+    created inside it, so concurrent runs never share a workspace. Containers
+    leased by another run are skipped, and new ones are started instead.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        image: str,
+        size: int = 2,
+        workdir: str = "/workspace",
+        install_command: Optional[str] = None,
+        name: str = "codexa",
+    ) -> None:
+        if size < 1:
+            raise CodexaExecutionError(
+                message=f"Container pool size must be positive, got {size}",
+            )
+        self.__client = client
+        self.__image = image
+        self.__size = size
+        self.__workdir = workdir
+        self.__install_command = install_command
+        self.__name = name
+
+    @property
+    def workdir(self) -> str:
+        """Return the workspace directory inside the containers."""
+        return self.__workdir
+
+    def __pool_filters(self) -> Dict[str, List[str]]:
+        return {"label": [f"{POOL_LABEL}={self.__name}"]}
+
+    def __lease(self, container: Any) -> bool:
+        script = (
+            f'if [ -n "$(find {LEASE_DIR} -maxdepth 0 '
+            f'-mmin +{LEASE_TIMEOUT_MINUTES} 2>/dev/null)" ]; '
+            f"then rm -rf {LEASE_DIR}; fi; mkdir {LEASE_DIR}"
+        )
+        return container.exec_run(["sh", "-c", script]).exit_code == 0
+
+    def release(self, containers: Iterable[Any]) -> None:
+        """Return leased containers to the pool.
+
+        Args:
+            containers (Iterable[Any]): Containers returned by acquire
+        """
+        for container in containers:
+            try:
+                container.exec_run(["rm", "-rf", LEASE_DIR])
+            except DockerException as e:
+                logger.warning(f"Failed to release container {container.short_id}: {e}")
+
+    def __start(self, source_dir: Path, digest: str, files: Iterable[str]) -> Any:
+        logger.info(f"Starting pooled container from image {self.__image}")
+        container = self.__client.containers.run(
+            self.__image,
+            command=["sleep", "infinity"],
+            detach=True,
+            working_dir=self.__workdir,
+            labels={POOL_LABEL: self.__name, DEPENDENCY_LABEL: digest},
+        )
+        try:
+            if not self.__lease(container):
+                raise CodexaExecutionError(
+                    message=f"Failed to lease new container {container.short_id}",
+                )
+            if self.__install_command:
+                self.__install(container, source_dir, files)
+        except BaseException:
+            container.remove(force=True)
+            raise
+        return container
+
+    def __install(self, container: Any, source_dir: Path, files: Iterable[str]) -> None:
+        present = [name for name in files if (source_dir / name).is_file()]
+        if present:
+            container.put_archive(self.__workdir, _make_archive(source_dir, present))
+        result = container.exec_run(
+            ["sh", "-c", self.__install_command], workdir=self.__workdir
+        )
+        if result.exit_code != 0:
+            raise CodexaExecutionError(
+                message=f"Dependency install failed: {_decode(result.output)}",
+                help_text="Check the install command and the container image",
+            )
+
+    def acquire(
+        self,
+        source_dir: Path,
+        dependency_files: Iterable[str] = DEFAULT_DEPENDENCY_FILES,
+    ) -> List[Any]:
+        """Lease pool containers, reusing idle running ones where possible.
+
+        The containers must be handed back with release once the run is over.
+
+        Args:
+            source_dir (Path): Root of the local workspace
+            dependency_files (Iterable[str], optional): Files defining the
+                dependency layer, relative to the workspace root
+
+        Returns:
+            List[Any]: Leased running containers, exactly the pool size
+        """
+        dependency_files = list(dependency_files)
+        layer = f"{self.__image}\n{self.__install_command}\n"
+        digest = _sha1(
+            (layer + dependency_digest(source_dir, dependency_files)).encode()
+        )
+        reusable: List[Any] = []
+        try:
+            for container in self.__client.containers.list(
+                all=True, filters=self.__pool_filters()
+            ):
+                if container.status != "running":
+                    logger.debug(f"Retiring stopped container {container.short_id}")
+                    container.remove(force=True)
+                elif len(reusable) >= self.__size:
+                    continue
+                elif not self.__lease(container):
+                    logger.debug(f"Skipping container {container.short_id} in use")
+                elif container.labels.get(DEPENDENCY_LABEL) != digest:
+                    logger.debug(f"Retiring outdated container {container.short_id}")
+                    container.remove(force=True)
+                else:
+                    reusable.append(container)
+            logger.debug(f"Reusing {len(reusable)} pooled container(s)")
+            while len(reusable) < self.__size:
+                reusable.append(self.__start(source_dir, digest, dependency_files))
+        except BaseException:
+            # Leases would otherwise block the containers for other runs
+            # until they time out
+            self.release(reusable)
+            raise
+        return reusable
+
+    def shutdown(self) -> int:
+        """Remove every container belonging to the pool.
+
+        Returns:
+            int: Number of removed containers
+        """
+        containers = self.__client.containers.list(
+            all=True, filters=self.__pool_filters()
+        )
+        for container in containers:
+            container.remove(force=True)
+        return len(containers)
+
+
+class DockerBackend(ExecutionBackend):
+    """Run tests inside pooled Docker containers.
+
+    Before each job the container workspace is reset to mirror the local one:
+    only files whose content changed are copied in, and anything else left
+    behind in the workspace (removed sources, files written by earlier test
+    runs) is deleted. Tests are split into shards, one per container, which
+    run in parallel.
+    """
+
+    def __init__(
+        self,
+        image: str,
+        workers: int = 2,
+        install_command: Optional[str] = None,
+        source_dir: Optional[Path] = None,
+        workdir: str = "/workspace",
+        dependency_files: Iterable[str] = DEFAULT_DEPENDENCY_FILES,
+        client: Optional[Any] = None,
+    ) -> None:
+        if client is None:
+            try:
+                client = docker.from_env()
+            except DockerException as e:
+                raise CodexaExecutionError(
+                    message=f"Failed to connect to the Docker daemon: {e}",
+                    help_text="Make sure Docker is running and accessible",
+                )
+        super().__init__()
+        self.__source_dir = (source_dir or Path.cwd()).resolve()
+        self.__dependency_files = list(dependency_files)
+        self.__pool = ContainerPool(
+            client,
+            image,
+            size=workers,
+            workdir=workdir,
+            install_command=install_command,
+        )
+
+    @property
+    def pool(self) -> ContainerPool:
+        """Return the container pool."""
+        return self.__pool
+
+    def __remote_manifest(self, container: Any) -> Dict[str, str]:
+        result = container.exec_run(
+            ["sh", "-c", "find . -type f -exec sha1sum {} +"],
+            workdir=self.__pool.workdir,
+        )
+        manifest = {}
+        for line in _decode(result.output).splitlines():
+            digest, _, path = line.partition("  ")
+            path = path.removeprefix("./")
+            if path and not _is_ignored(path, DEFAULT_IGNORED_NAMES):
+                manifest[path] = digest
+        return manifest
+
+    def sync(self, container: Any, local: Dict[str, str]) -> Tuple[int, int]:
+        """Reset a container workspace to match the local manifest.
+
+        Args:
+            container (Any): Target container
+            local (Dict[str, str]): Manifest of the local workspace
+
+        Returns:
+            Tuple[int, int]: Number of copied and deleted files
+        """
+        remote = self.__remote_manifest(container)
+        changed = [path for path, digest in local.items() if remote.get(path) != digest]
+        stale = [path for path in remote if path not in local]
+        for batch in _batches(stale):
+            container.exec_run(["rm", "-f", "--", *batch], workdir=self.__pool.workdir)
+        if changed:
+            container.put_archive(
+                self.__pool.workdir, _make_archive(self.__source_dir, changed)
+            )
+        logger.debug(
+            f"Synced container {container.short_id}: "
+            f"{len(changed)} copied, {len(stale)} deleted"
+        )
+        return len(changed), len(stale)
+
+    def __collect(self, container: Any, test_ids: List[str]) -> List[str]:
+        result = container.exec_run(
+            ["python", "-m", "pytest", "--collect-only", "-q", *test_ids],
+            workdir=self.__pool.workdir,
+        )
+        return [
+            line.strip()
+            for line in _decode(result.output).splitlines()
+            if "::" in line and not line.startswith(" ")
+        ]
+
+    def __run_shard(
+        self, container: Any, shard: List[str], verbose: bool
+    ) -> Tuple[int, str, str, List[TestResult]]:
+        # A fresh report path per shard run, so a run crashing before writing
+        # its report can never be mistaken for the previous run's results
+        report_path = f"{JUNIT_REPORT_DIR}/codexa-junit-{uuid.uuid4().hex}.xml"
+        args = ["python", "-m", "pytest", f"--junitxml={report_path}"]
+        args.extend(["-o", "junit_family=xunit1"])
+        if verbose:
+            args.append("-vv")
+        logger.debug(
+            f"Running {len(shard)} test(s) in container {container.short_id}: "
+            f"{shlex.join(args)}"
+        )
+        result = container.exec_run(
+            [*args, *shard], workdir=self.__pool.workdir, demux=True
+        )
+        stdout, stderr = result.output
+        report = container.exec_run(["cat", report_path])
+        container.exec_run(["rm", "-f", report_path])
+        results = []
+        if report.exit_code == 0:
+            try:
+                results = parse_junit_xml(_decode(report.output))
+            except ParseError as e:
+                logger.warning(f"Failed to parse JUnit report from container: {e}")
+        return result.exit_code, _decode(stdout), _decode(stderr), results
+
+    def __run_leased(
+        self, containers: List[Any], test_ids: List[str], verbose: bool
+    ) -> List[Tuple[int, str, str, List[TestResult]]]:
+        manifest = build_manifest(self.__source_dir)
+        with ThreadPoolExecutor(max_workers=len(containers)) as pool:
+            list(pool.map(lambda c: self.sync(c, manifest), containers))
+
+        node_ids = self.__collect(containers[0], test_ids)
+        if node_ids:
+            shards = [node_ids[i :: len(containers)] for i in range(len(containers))]
+            jobs = [(c, s) for c, s in zip(containers, shards) if s]
+        else:
+            jobs = [(containers[0], test_ids)]
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            return list(pool.map(lambda job: self.__run_shard(*job, verbose), jobs))
+
+    def run(self, test_ids: List[str], verbose: bool = False) -> Tuple[int, str, str]:
+        containers = self.__pool.acquire(self.__source_dir, self.__dependency_files)
+        try:
+            outputs = self.__run_leased(containers, test_ids, verbose)
+        finally:
+            self.__pool.release(containers)
+
+        self.results = [result for *_, shard in outputs for result in shard]
+        exit_code = next((code for code, *_ in outputs if code != 0), 0)
+        shell_output = "\n".join(
+            f"===== shard {index}/{len(outputs)} =====\n{stdout}"
+            for index, (_, stdout, _, _) in enumerate(outputs, start=1)
+        )
+        error_output = "\n".join(stderr for _, _, stderr, _ in outputs if stderr)
+        return exit_code, shell_output, error_output
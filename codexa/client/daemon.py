@@ -0,0 +1,399 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from git.exc import GitError
+
+from codexa.client.accessor import RemoteAIAccessor, RepoAnalyzer, ReportScanner
+from codexa.client.executor import TestcaseMetadata, TestExecutor
+from codexa.client.results import TestResult
+from codexa.client.usage import USAGE, UsageRecord
+from codexa.client.versioning import DiffSession, open_repository
+from codexa.core import errors
+from codexa.core.config import load_config
+from codexa.core.constants import Environment
+from codexa.core.env import get_codexa_home, load_api_key
+from codexa.core.errors import CodexaBaseError, CodexaRuntimeError
+from codexa.core.profiling import PROFILER, Span, span
+
+logger = logging.getLogger(__name__)
+
+_FINGERPRINT_SUFFIXES = (".py", ".ini", ".cfg", ".toml")
+MAX_ACCESSORS = 8
+MAX_SESSIONS = 8
+
+
+def get_socket_path() -> Path:
+    """Get the daemon socket path, overridable with CODEXA_SOCKET."""
+    configured = os.environ.get(Environment.SOCKET, None)
+    return Path(configured) if configured else get_codexa_home() / "codexa.sock"
+
+
+def _tree_fingerprint(paths: List[str], cwd: str) -> str:
+    digest = hashlib.sha1()
+    for base in sorted((Path(cwd) / p).resolve() for p in paths or [cwd]):
+        files = [base] if base.is_file() else sorted(base.rglob("*"))
+        for path in files:
+            if path.suffix in _FINGERPRINT_SUFFIXES and "__pycache__" not in path.parts:
+                stat = path.stat()
+                digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def _collect_in(cwd: str, paths: List[str]) -> List[Dict]:
+    # Runs in a fresh child process: changing its directory affects nothing
+    # else, and no module imported by a previous collection is served stale
+    os.chdir(cwd)
+    return [e.to_dict() for e in TestExecutor(paths).collect_metadata()]
+
+
+class CodexaDaemon:
+    """Long-lived worker state shared across CLI invocations.
+
+    Keeps LLM clients (and their keep-alive connection pools), open
+    repository handles and test collection results warm between requests.
+    """
+
+    def __init__(self) -> None:
+        self.__accessors: OrderedDict[Tuple[str, str, str], RemoteAIAccessor] = (
+            OrderedDict()
+        )
+        self.__sessions: OrderedDict[str, DiffSession] = OrderedDict()
+        self.__collections: Dict[Tuple[str, ...], Tuple[str, List[Dict]]] = {}
+        self.__lock = threading.Lock()
+        self.__collect_lock = threading.Lock()
+        self.__git_lock = threading.Lock()
+        self.__handlers: Dict[str, Callable[..., Any]] = {
+            "ping": lambda: "pong",
+            "analyze_tests": self.analyze_tests,
+            "analyze_failures": self.analyze_failures,
+            "compare_diff": self.compare_diff,
+            "git_diffs": self.git_diffs,
+            "collect": self.collect,
+        }
+
+    def __accessor(self, cls: type, api_key: str, config: Dict[str, Any]) -> Any:
+        # Clients send their own configuration, which the daemon's working
+        # directory does not know; the least recently used accessors go first
+        key = (cls.__name__, api_key, json.dumps(config, sort_keys=True))
+        with self.__lock:
+            if key not in self.__accessors:
+                self.__accessors[key] = cls(api_key, config=config)
+                while len(self.__accessors) > MAX_ACCESSORS:
+                    self.__accessors.popitem(last=False)
+            self.__accessors.move_to_end(key)
+            return self.__accessors[key]
+
+    def __session(self, repo_path: str) -> DiffSession:
+        with self.__lock:
+            if repo_path not in self.__sessions:
+                self.__sessions[repo_path] = DiffSession(
+                    repo_path, open_repository(repo_path)
+                )
+                while len(self.__sessions) > MAX_SESSIONS:
+                    self.__sessions.popitem(last=False)
+            self.__sessions.move_to_end(repo_path)
+            return self.__sessions[repo_path]
+
+    def analyze_tests(
+        self, api_key: str, test_output: str, config: Optional[Dict] = None
+    ) -> str:
+        """Forward a full test report request to a warm scanner."""
+        scanner = self.__accessor(ReportScanner, api_key, config or {})
+        return scanner.analyze_tests(test_output)
+
+    def analyze_failures(
+        self,
+        api_key: str,
+        failures: List[Dict],
+        config: Optional[Dict] = None,
+        appendix: Optional[str] = None,
+    ) -> str:
+        """Forward a failure analysis request to a warm scanner."""
+        results = [TestResult.from_dict(f) for f in failures]
+        scanner = self.__accessor(ReportScanner, api_key, config or {})
+        return scanner.analyze_failures(results, appendix=appendix)
+
+    def compare_diff(
+        self,
+        api_key: str,
+        diff: str,
+        context: Optional[str] = None,
+        config: Optional[Dict] = None,
+    ) -> str:
+        """Forward a diff analysis request to a warm analyzer."""
+        analyzer = self.__accessor(RepoAnalyzer, api_key, config or {})
+        return analyzer.compare_diff(diff, context=context)
+
+    def git_diffs(
+        self, refs: List[str], repo_path: str, fetch: bool = True
+    ) -> Dict[str, Dict]:
+        """Compute the diffs against several refs, reusing cached patches."""
+        try:
+            session = self.__session(repo_path)
+        except GitError as e:
+            raise CodexaRuntimeError(f"Failed to get git diff: {e!r}")
+        with self.__git_lock:
+            diffs = session.compare(refs, fetch=fetch)
+        return {ref: diff.to_dict() for ref, diff in diffs.items()}
+
+    def collect(self, paths: List[str], cwd: str) -> List[Dict]:
+        """Collect test metadata, reusing the last result if no file changed.
+
+        The collection runs in a child process started in the client's
+        working directory, so that relative paths and the Pytest configuration
+        resolve as they would in the client, without changing the directory
+        of the daemon's other requests.
+        """
+        if not os.path.isabs(cwd) or not os.path.isdir(cwd):
+            raise errors.CodexaInputError(
+                message=f"Collection directory is not an absolute directory: {cwd}"
+            )
+        key = (cwd, *sorted(paths))
+        fingerprint = _tree_fingerprint(paths, cwd)
+        with self.__collect_lock:
+            cached = self.__collections.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                logger.debug(f"Serving cached collection for {list(key)}")
+                return cached[1]
+            context = multiprocessing.get_context("spawn")
+            with span("executor.collect", paths=len(paths)):
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    entries = pool.submit(_collect_in, cwd, paths).result()
+            self.__collections[key] = (fingerprint, entries)
+            return entries
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a decoded request and encode its outcome.
+
+        The usage records and, if the client profiles, the spans of the
+        request are returned with its outcome, for the client to record.
+        """
+        profiling = PROFILER.capture() if request.get("profile") else nullcontext([])
+        with USAGE.capture(request.get("command")) as usage, profiling as spans:
+            response = self.__dispatch(request)
+        response["usage"] = [record.to_dict() for record in usage]
+        response["spans"] = [recorded.to_dict() for recorded in spans]
+        return response
+
+    def __dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = self.__handlers.get(request.get("op", ""))
+        if handler is None:
+            return {
+                "ok": False,
+                "error": {
+                    "type": "CodexaInputError",
+                    "message": f"Unknown daemon operation: {request.get('op')}",
+                },
+            }
+        try:
+            return {"ok": True, "result": handler(**request.get("args", {}))}
+        except CodexaBaseError as e:
+            error = {"type": type(e).__name__, "message": e.message}
+            return {"ok": False, "error": {**error, "help_text": e.help_text}}
+        except Exception as e:
+            logger.exception(e)
+            return {
+                "ok": False,
+                "error": {
+                    "type": "CodexaRuntimeError",
+                    "message": f"Daemon request failed: {e}",
+                },
+            }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            response = {
+                "ok": False,
+                "error": {
+                    "type": "CodexaInputError",
+                    "message": f"Malformed daemon request: {e}",
+                },
+            }
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            return
+        if request.get("op") == "shutdown":
+            response = {"ok": True, "result": None}
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            response = self.server.daemon_state.handle(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server exposing a `CodexaDaemon` to local CLI invocations."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, state: Optional[CodexaDaemon] = None):
+        if socket_path.exists():
+            if DaemonClient(socket_path, timeout=0.5).ping():
+                raise CodexaRuntimeError(
+                    message=f"A codexa daemon is already listening on {socket_path}",
+                    help_text="Stop it with 'codexa serve --stop' first",
+                )
+            socket_path.unlink()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.daemon_state = state or CodexaDaemon()
+        self.socket_path = socket_path
+        # Create the socket owner-only from the start, rather than narrowing
+        # its permissions after it is already reachable
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class DaemonClient:
+    """Client forwarding CLI work to a running `codexa serve` daemon."""
+
+    def __init__(self, socket_path: Path, timeout: Optional[float] = None) -> None:
+        self.__socket_path = socket_path
+        self.__timeout = timeout
+
+    @classmethod
+    def connect(
+        cls, socket_path: Optional[Path] = None, timeout: float = 0.5
+    ) -> Optional["DaemonClient"]:
+        """Return a client if a daemon answers on the socket, else None.
+
+        Forwarding can be disabled with the CODEXA_NO_DAEMON environment
+        variable.
+        """
+        socket_path = socket_path or get_socket_path()
+        if os.environ.get(Environment.NO_DAEMON) or not socket_path.exists():
+            return None
+        if not cls(socket_path, timeout=timeout).ping():
+            logger.debug(f"No codexa daemon answering on {socket_path}")
+            return None
+        logger.debug(f"Forwarding work to the codexa daemon on {socket_path}")
+        return cls(socket_path)
+
+    def ping(self) -> bool:
+        """Return whether a daemon answers on the socket."""
+        try:
+            return self.call("ping") == "pong"
+        except (OSError, ValueError, CodexaBaseError):
+            return False
+
+    def call(self, op: str, **args: Any) -> Any:
+        """Send a request to the daemon and return its result.
+
+        Raises:
+            CodexaBaseError: The error raised by the daemon-side operation
+        """
+        request = {
+            "op": op,
+            "args": args,
+            "command": USAGE.command,
+            "profile": PROFILER.enabled,
+        }
+        start = time.perf_counter_ns()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(self.__timeout)
+            conn.connect(str(self.__socket_path))
+            conn.sendall(json.dumps(request).encode() + b"\n")
+            with conn.makefile("rb") as stream:
+                response = json.loads(stream.readline())
+        for record in response.get("usage", []):
+            USAGE.record(UsageRecord.from_dict(record))
+        PROFILER.merge([Span(**s) for s in response.get("spans", [])], start)
+        if not response["ok"]:
+            error = response["error"]
+            error_cls = getattr(errors, error["type"], CodexaRuntimeError)
+            raise error_cls(message=error["message"], help_text=error.get("help_text"))
+        return response["result"]
+
+    def collect(self, paths: List[str]) -> List[TestcaseMetadata]:
+        """Collect test metadata through the daemon's cache."""
+        entries = self.call("collect", paths=paths, cwd=os.getcwd())
+        return [TestcaseMetadata(**e) for e in entries]
+
+
+class RemoteReportScanner:
+    """`ReportScanner` stand-in that runs requests inside the daemon.
+
+    The configuration of the client's working directory is sent along, for
+    the daemon to apply instead of its own.
+    """
+
+    def __init__(self, client: DaemonClient, api_key: str) -> None:
+        self.__client = client
+        self.__api_key = api_key
+        self.__config = load_config()
+
+    def analyze_tests(self, test_output: str) -> str:
+        """Read the test execution output and generate a report."""
+        return self.__client.call(
+            "analyze_tests",
+            api_key=self.__api_key,
+            test_output=test_output,
+            config=self.__config,
+        )
+
+    def analyze_failures(
+        self, failures: List[TestResult], appendix: Optional[str] = None
+    ) -> str:
+        """Explain a set of failures that could not be diagnosed locally."""
+        return self.__client.call(
+            "analyze_failures",
+            api_key=self.__api_key,
+            failures=[f.to_dict() for f in failures],
+            config=self.__config,
+            appendix=appendix,
+        )
+
+
+class RemoteRepoAnalyzer:
+    """`RepoAnalyzer` stand-in that runs requests inside the daemon.
+
+    The configuration of the client's working directory is sent along, for
+    the daemon to apply instead of its own.
+    """
+
+    def __init__(self, client: DaemonClient, api_key: str) -> None:
+        self.__client = client
+        self.__api_key = api_key
+        self.__config = load_config()
+
+    def compare_diff(self, diff: str, context: Optional[str] = None) -> str:
+        """Assess the repository changes and generate a report."""
+        return self.__client.call(
+            "compare_diff",
+            api_key=self.__api_key,
+            diff=diff,
+            context=context,
+            config=self.__config,
+        )
+
+
+def create_report_scanner() -> Union[ReportScanner, RemoteReportScanner]:
+    """Create a report scanner, running it in the daemon when one is up."""
+    key = load_api_key()
+    daemon = DaemonClient.connect()
+    return RemoteReportScanner(daemon, key) if daemon else ReportScanner(key)
@@ -1,5 +1,6 @@
 import io
 import logging
+from abc import ABC, abstractmethod
 from collections import defaultdict
 from contextlib import redirect_stderr, redirect_stdout
 from dataclasses import asdict, dataclass
@@ -9,6 +10,10 @@ from typing import Any, Dict, List, Optional, Tuple
 import pytest
 from _pytest.reports import CollectReport
 
+from codexa.client.phases import PhaseProfile, PhaseProfilerPlugin
+from codexa.client.results import ResultCollectorPlugin, TestResult
+from codexa.core.profiling import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,27 +32,61 @@ class TestcaseMetadata:
     module: Optional[str] = None
     cls: Optional[str] = None
     function: Optional[str] = None
+    path: Optional[str] = None
+
+    @property
+    def runnable_id(self) -> str:
+        """Return a node ID selecting the test from any working directory."""
+        if self.path is None:
+            return self.node_id
+        _, separator, rest = self.node_id.partition("::")
+        return f"{self.path}{separator}{rest}"
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary map structure."""
         return asdict(self)
 
 
-class TestExecutor:
-    """Class for executing tests."""
+class ExecutionBackend(ABC):
+    """Base class for the environments that tests can be executed in.
 
-    def __init__(self, test_ids: List[str]):
-        self.__test_ids = test_ids
+    After each run, `results` holds the structured result of every test and
+    `rootdir` the directory their node IDs are relative to, when known.
+    Backends supporting it fill `phases` with phase and fixture timings.
+    """
 
-    def run(self, verbose: bool = False) -> Tuple[int, str, str]:
-        """Run the Pytest tests located at the specified path.
+    def __init__(self) -> None:
+        self.results: List[TestResult] = []
+        self.rootdir: Optional[Path] = None
+        self.phases: Optional[PhaseProfile] = None
+
+    @abstractmethod
+    def run(self, test_ids: List[str], verbose: bool = False) -> Tuple[int, str, str]:
+        """Run the given Pytest node IDs.
 
         Args:
-            path (str): _description_
+            test_ids (List[str]): Node IDs or paths to run
+            verbose (bool, optional): Enable verbose Pytest output
 
         Returns:
-            Tuple[str, str, int]: _description_
+            Tuple[int, str, str]: Exit code, shell output and error output
         """
+
+
+class LocalBackend(ExecutionBackend):
+    """Run tests in-process with the current interpreter.
+
+    Args:
+        profile (bool, optional): Time the test phases and fixture setups
+        trace_memory (bool, optional): Also measure peak memory per test
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False) -> None:
+        super().__init__()
+        self.__profile = profile or trace_memory
+        self.__trace_memory = trace_memory
+
+    def run(self, test_ids: List[str], verbose: bool = False) -> Tuple[int, str, str]:
         stdout = io.StringIO()
         stderr = io.StringIO()
 
@@ -56,8 +95,17 @@ class TestExecutor:
             pytest_base_args.append("-vv")
 
         # Redirect both stdout and stderr during the test run
+        collector = ResultCollectorPlugin()
+        plugins: List[Any] = [collector]
+        profiler = None
+        if self.__profile:
+            profiler = PhaseProfilerPlugin(trace_memory=self.__trace_memory)
+            plugins.append(profiler)
         with redirect_stdout(stdout), redirect_stderr(stderr):
-            exit_code = pytest.main([*pytest_base_args, *self.__test_ids])
+            exit_code = pytest.main([*pytest_base_args, *test_ids], plugins=plugins)
+        self.results = collector.results
+        self.rootdir = collector.rootpath
+        self.phases = profiler.profile if profiler is not None else None
 
         # Retrieve output
         shell_output = stdout.getvalue()
@@ -65,6 +113,42 @@ class TestExecutor:
 
         return exit_code, shell_output, error_output
 
+
+class TestExecutor:
+    """Class for executing tests."""
+
+    def __init__(self, test_ids: List[str], backend: Optional[ExecutionBackend] = None):
+        self.__test_ids = test_ids
+        self.__backend = backend or LocalBackend()
+
+    def run(self, verbose: bool = False) -> Tuple[int, str, str]:
+        """Run the selected Pytest tests on the configured backend.
+
+        Args:
+            verbose (bool, optional): Enable verbose Pytest output
+
+        Returns:
+            Tuple[int, str, str]: Exit code, shell output and error output
+        """
+        backend = type(self.__backend).__name__
+        with span("executor.run", backend=backend, tests=len(self.__test_ids)):
+            return self.__backend.run(list(self.__test_ids), verbose=verbose)
+
+    @property
+    def results(self) -> List[TestResult]:
+        """Return the structured test results of the last run."""
+        return self.__backend.results
+
+    @property
+    def rootdir(self) -> Optional[Path]:
+        """Return the rootdir of the last run, if known."""
+        return self.__backend.rootdir
+
+    @property
+    def phases(self) -> Optional[PhaseProfile]:
+        """Return the phase and fixture timings of the last run, if profiled."""
+        return self.__backend.phases
+
     @staticmethod
     def __collect_ids(paths: List[str]) -> List[TestcaseMetadata]:
         args = ["--collect-only", "-q", "-p", "no:warnings"]
@@ -90,15 +174,25 @@ class TestExecutor:
                     module=item.module.__name__ if item.module else None,
                     cls=item.cls.__name__ if item.cls else None,
                     function=getattr(item.function, "__name__", None),
+                    path=str(item.path),
                 )
                 collected.append(entry)
 
         stdout = io.StringIO()
         stderr = io.StringIO()
-        with redirect_stdout(stdout), redirect_stderr(stderr):
-            pytest.main(args, plugins=[CollectorPlugin()])
+        with span("executor.collect", paths=len(paths)):
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                pytest.main(args, plugins=[CollectorPlugin()])
         return collected
 
+    def collect_metadata(self) -> List[TestcaseMetadata]:
+        """Collect the metadata of all available tests.
+
+        Returns:
+            List[TestcaseMetadata]: Collected test case metadata
+        """
+        return self.__collect_ids(self.__test_ids)
+
     def collect_all_tests(self) -> List[str]:
         """Collect all available Pytest node IDs.
 
@@ -120,14 +214,25 @@ class TestExecutor:
         Returns:
             TestTree: Test entries map
         """
-        entries = self.__collect_ids(self.__test_ids)
-        test_map = defaultdict(lambda: defaultdict(list))
+        return build_test_tree(self.__collect_ids(self.__test_ids))
+
+
+def build_test_tree(entries: List[TestcaseMetadata]) -> Dict[str, Any]:
+    """Group collected test cases by module and class.
+
+    Args:
+        entries (List[TestcaseMetadata]): Collected test case metadata
+
+    Returns:
+        TestTree: Test entries map
+    """
+    test_map = defaultdict(lambda: defaultdict(list))
 
-        for entry in entries:
-            module_path = entry.file
-            class_name = entry.cls
-            func_name = entry.name
+    for entry in entries:
+        module_path = entry.file
+        class_name = entry.cls
+        func_name = entry.name
 
-            test_map[module_path][class_name].append(func_name)
+        test_map[module_path][class_name].append(func_name)
 
-        return test_map
+    return test_map
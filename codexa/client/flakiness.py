@@ -0,0 +1,123 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from codexa.client.results import TestResult, parse_junit_xml
+from codexa.core.profiling import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RerunVerdict:
+    """Outcome of re-running a failed test several times."""
+
+    node_id: str
+    runs: int
+    passes: int
+
+    @property
+    def is_flaky(self) -> bool:
+        """Return whether the test passed in at least one rerun."""
+        return self.passes > 0
+
+    @property
+    def classification(self) -> str:
+        """Return "flaky" or "deterministic"."""
+        return "flaky" if self.is_flaky else "deterministic"
+
+    @property
+    def pass_ratio(self) -> float:
+        """Return the fraction of reruns that passed."""
+        return self.passes / self.runs if self.runs else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return {**asdict(self), "classification": self.classification}
+
+
+def _run_chunk(node_ids: List[str], rootdir: Path) -> List[TestResult]:
+    fd, report = tempfile.mkstemp(prefix="codexa-rerun-", suffix=".xml")
+    os.close(fd)
+    command = [
+        sys.executable,
+        "-m",
+        "pytest",
+        "-q",
+        "-p",
+        "no:cacheprovider",
+        f"--junitxml={report}",
+        "-o",
+        "junit_family=xunit1",
+        *node_ids,
+    ]
+    try:
+        subprocess.run(command, cwd=rootdir, capture_output=True, check=False)
+        return parse_junit_xml(Path(report).read_text())
+    except Exception as e:
+        logger.warning(f"Rerun of {len(node_ids)} test(s) failed: {e}")
+        return []
+    finally:
+        Path(report).unlink(missing_ok=True)
+
+
+def rerun_failures(
+    failures: List[TestResult],
+    reruns: int,
+    workers: Optional[int] = None,
+    rootdir: Optional[Path] = None,
+) -> Dict[str, RerunVerdict]:
+    """Re-run failed tests in parallel worker processes to detect flakiness.
+
+    The failed node IDs are split across the workers, and each chunk is run
+    `reruns` times in a fresh Pytest process. A test that passes at least
+    once is flaky; a test failing every rerun is deterministic. Collection
+    errors are not re-run.
+
+    Args:
+        failures (List[TestResult]): Failed test results
+        reruns (int): Number of times to re-run each failure
+        workers (int, optional): Number of parallel processes, defaults to
+            the CPU count
+        rootdir (Path, optional): Directory the node IDs are relative to,
+            defaults to the working directory
+
+    Returns:
+        Dict[str, RerunVerdict]: Verdict per failed node ID
+    """
+    node_ids = [f.node_id for f in failures if f.is_failure and f.when != "collect"]
+    if not node_ids or reruns < 1:
+        return {}
+    workers = max(min(workers or os.cpu_count() or 1, len(node_ids)), 1)
+    chunks = [node_ids[i::workers] for i in range(workers)]
+    jobs = [chunk for _ in range(reruns) for chunk in chunks]
+    rootdir = rootdir or Path.cwd()
+
+    passes: Dict[str, int] = defaultdict(int)
+    runs: Dict[str, int] = defaultdict(int)
+    with span("executor.rerun", tests=len(node_ids), reruns=reruns):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for results in pool.map(lambda c: _run_chunk(c, rootdir), jobs):
+                for result in results:
+                    runs[result.node_id] += 1
+                    if result.outcome in ("passed", "xpassed"):
+                        passes[result.node_id] += 1
+
+    verdicts = {
+        node_id: RerunVerdict(node_id, runs[node_id], passes[node_id])
+        for node_id in node_ids
+        if runs[node_id]
+    }
+    flaky = sum(1 for v in verdicts.values() if v.is_flaky)
+    logger.info(
+        f"Re-ran {len(verdicts)} failure(s) {reruns} time(s): "
+        f"{flaky} flaky, {len(verdicts) - flaky} deterministic"
+    )
+    return verdicts
@@ -0,0 +1,327 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from codexa.client.usage import (
+    UsageRecord,
+    get_metrics_file,
+    load_records,
+    percentile,
+)
+from codexa.core.errors import CodexaAccessorError, CodexaInputError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY_S = 20.0
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_AFTER_S = 60.0
+
+
+@dataclass(frozen=True)
+class EndpointTarget:
+    """A model served by an OpenAI-compatible endpoint."""
+
+    base_url: str
+    model: str
+    api_key: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Return a readable identifier for logs and errors."""
+        return f"{self.model}@{self.base_url}"
+
+
+class CircuitBreaker:
+    """Tracks endpoint health, skipping endpoints that keep failing.
+
+    After `failure_threshold` consecutive failures an endpoint is skipped
+    until `reset_after_s` seconds have passed, after which it gets one trial
+    request again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_after_s: float = DEFAULT_RESET_AFTER_S,
+    ) -> None:
+        self.__failure_threshold = failure_threshold
+        self.__reset_after_s = reset_after_s
+        self.__failures: Dict[EndpointTarget, int] = {}
+        self.__opened_at: Dict[EndpointTarget, float] = {}
+        self.__lock = threading.Lock()
+
+    def allow(self, target: EndpointTarget) -> bool:
+        """Return whether requests may be sent to the endpoint."""
+        with self.__lock:
+            opened_at = self.__opened_at.get(target)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.__reset_after_s:
+                # Half-open: let one request through, re-open if it fails
+                self.__opened_at[target] = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, target: EndpointTarget) -> None:
+        """Mark the endpoint as healthy."""
+        with self.__lock:
+            self.__failures.pop(target, None)
+            self.__opened_at.pop(target, None)
+
+    def record_failure(self, target: EndpointTarget) -> None:
+        """Count a failed request, opening the circuit past the threshold."""
+        with self.__lock:
+            self.__failures[target] = self.__failures.get(target, 0) + 1
+            if self.__failures[target] >= self.__failure_threshold:
+                if target not in self.__opened_at:
+                    logger.warning(
+                        f"Endpoint {target.name} failed {self.__failures[target]} "
+                        f"times, skipping it for {self.__reset_after_s:.0f}s"
+                    )
+                self.__opened_at[target] = time.monotonic()
+
+
+BREAKER = CircuitBreaker()
+
+# Metrics file -> (mtime, size) it was read at and its records
+_HISTORY: Dict[Path, Tuple[Tuple[int, int], List[UsageRecord]]] = {}
+_HISTORY_LOCK = threading.Lock()
+
+
+def _usage_history() -> List[UsageRecord]:
+    # The metrics file only grows between commands, so it is re-read only
+    # once it changed rather than on every request
+    path = get_metrics_file()
+    try:
+        stat = path.stat()
+    except OSError:
+        return []
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _HISTORY_LOCK:
+        cached = _HISTORY.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    records = load_records(path)
+    with _HISTORY_LOCK:
+        _HISTORY[path] = (version, records)
+    return records
+
+
+class Attempt:
+    """A single in-flight request of a hedged call."""
+
+    def __init__(self, target: EndpointTarget) -> None:
+        self.target = target
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+        self.__stream: Any = None
+        self.__lock = threading.Lock()
+
+    def register(self, stream: Any) -> None:
+        """Attach the response stream, so that it can be closed on cancel."""
+        with self.__lock:
+            self.__stream = stream
+        if self.cancelled.is_set():
+            stream.close()
+
+    def cancel(self) -> None:
+        """Abort the request by closing its response stream."""
+        self.cancelled.set()
+        with self.__lock:
+            stream = self.__stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.debug(f"Error closing cancelled stream: {e}")
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """Ordered endpoints and timing of hedged requests.
+
+    Configured under `llm` in .codexa.yaml. Without a fixed `delay_s`, the
+    hedge delay is the recorded `percentile` time to first token of the
+    model the request is sent to, the primary one unless routed elsewhere.
+    """
+
+    targets: Tuple[EndpointTarget, ...]
+    delay_s: Optional[float] = None
+    percentile: float = 95.0
+    min_delay_s: float = 1.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["HedgePolicy"]:
+        """Build the policy from the `llm` configuration section.
+
+        Args:
+            config (Dict[str, Any]): Codexa configuration
+
+        Raises:
+            CodexaInputError: If an endpoint entry is incomplete
+
+        Returns:
+            Optional[HedgePolicy]: Policy, None if fewer than two endpoints
+        """
+        section = config.get("llm", {}) or {}
+        targets = []
+        for entry in section.get("endpoints", []) or []:
+            if not isinstance(entry, dict) or not {"base_url", "model"} <= set(entry):
+                raise CodexaInputError(
+                    message=f"Invalid LLM endpoint configuration: {entry!r}",
+                    help_text="Each entry of llm.endpoints needs a base_url and a model",
+                )
+            key_env = entry.get("api_key_env")
+            targets.append(
+                EndpointTarget(
+                    base_url=entry["base_url"],
+                    model=entry["model"],
+                    api_key=os.environ.get(key_env) if key_env else None,
+                )
+            )
+        if len(targets) < 2:
+            return None
+        hedge = section.get("hedge", {}) or {}
+        return cls(
+            targets=tuple(targets),
+            delay_s=hedge.get("delay_s"),
+            percentile=hedge.get("percentile", 95.0),
+            min_delay_s=hedge.get("min_delay_s", 1.0),
+        )
+
+    def delay(
+        self,
+        records: Optional[List[UsageRecord]] = None,
+        model: Optional[str] = None,
+    ) -> float:
+        """Compute the delay before hedging to the next endpoint.
+
+        Args:
+            records (List[UsageRecord], optional): Usage history, defaults to
+                the recorded metrics
+            model (str, optional): Model of the first attempt, defaults to
+                the primary endpoint's
+
+        Returns:
+            float: Hedge delay (s)
+        """
+        if self.delay_s is not None:
+            return float(self.delay_s)
+        model = model or self.targets[0].model
+        history = _usage_history() if records is None else records
+        ttfts = [r.ttft_s for r in history if r.model == model and r.ttft_s]
+        if len(ttfts) < DEFAULT_MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY_S
+        return max(percentile(ttfts, self.percentile), self.min_delay_s)
+
+
+def hedged_call(
+    targets: Sequence[EndpointTarget],
+    call: Callable[[Attempt], str],
+    delay: float,
+    breaker: Optional[CircuitBreaker] = None,
+) -> str:
+    """Run a request against several endpoints, keeping the first response.
+
+    The request goes to the first healthy endpoint. If no attempt produced a
+    first token after `delay` seconds, the next endpoint is tried in parallel;
+    failed attempts fall back to the next endpoint immediately. The first
+    successful response wins and the other attempts are cancelled. Endpoint
+    health is checked only when an endpoint is about to be tried, so that an
+    unused endpoint never consumes its half-open trial request. If every
+    endpoint is unhealthy, they are all tried anyway.
+
+    Args:
+        targets (Sequence[EndpointTarget]): Endpoints in order of preference
+        call (Callable[[Attempt], str]): Performs the request for an attempt
+        delay (float): Hedge delay (s)
+        breaker (CircuitBreaker, optional): Endpoint health tracker
+
+    Raises:
+        CodexaAccessorError: If every endpoint failed
+
+    Returns:
+        str: Response of the winning attempt
+    """
+    breaker = breaker or BREAKER
+    remaining = list(targets)
+    outcomes: "queue.Queue[Tuple[Attempt, Optional[BaseException], str]]"
+    outcomes = queue.Queue()
+    attempts: List[Attempt] = []
+    errors: List[str] = []
+
+    def run(attempt: Attempt) -> None:
+        try:
+            outcomes.put((attempt, None, call(attempt)))
+        except BaseException as e:
+            outcomes.put((attempt, e, ""))
+
+    pool = ThreadPoolExecutor(max_workers=max(len(targets), 1))
+
+    check_health = True
+
+    def launch() -> Optional[float]:
+        while remaining:
+            target = remaining.pop(0)
+            if check_health and not breaker.allow(target):
+                logger.debug(f"Skipping unhealthy endpoint {target.name}")
+                continue
+            attempt = Attempt(target)
+            if attempts:
+                logger.info(f"Hedging LLM request to {target.name}")
+            attempts.append(attempt)
+            # Usage records and spans of the attempt belong to the caller's context
+            pool.submit(contextvars.copy_context().run, run, attempt)
+            return time.monotonic() + delay
+        return None
+
+    try:
+        hedge_at = launch()
+        if hedge_at is None:
+            # Every endpoint is unhealthy, try them all anyway
+            check_health = False
+            remaining.extend(targets)
+            hedge_at = launch()
+        pending = 1
+        while pending:
+            wait = None
+            if hedge_at is not None and remaining:
+                wait = max(hedge_at - time.monotonic(), 0.0)
+            try:
+                attempt, error, response = outcomes.get(timeout=wait)
+            except queue.Empty:
+                if any(a.first_token.is_set() for a in attempts):
+                    # The response is already streaming, stop hedging
+                    hedge_at = None
+                else:
+                    hedge_at = launch()
+                    pending += hedge_at is not None
+                continue
+            pending -= 1
+            if error is not None:
+                logger.warning(f"LLM request to {attempt.target.name} failed: {error}")
+                breaker.record_failure(attempt.target)
+                errors.append(f"{attempt.target.name}: {error}")
+                hedge_at = launch()
+                pending += hedge_at is not None
+                continue
+            breaker.record_success(attempt.target)
+            for other in attempts:
+                if other is not attempt:
+                    other.cancel()
+            return response
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    raise CodexaAccessorError(
+        message=f"All LLM endpoints failed: {'; '.join(errors)}",
+        help_text="Check the llm.endpoints configuration and try again",
+    )
@@ -0,0 +1,574 @@
+import ast
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from codexa.client.executor import TestcaseMetadata
+from codexa.core.env import get_codexa_home
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+MAX_CONTEXT_SYMBOLS = 40
+MAX_LISTED_REFERENCES = 5
+
+_SKIPPED_DIRS = {
+    "__pycache__",
+    "node_modules",
+    "venv",
+    "build",
+    "dist",
+    "site-packages",
+}
+_HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(?P<start>\d+)(?:,\d+)? @@")
+
+
+@dataclass(frozen=True)
+class SymbolInfo:
+    """Function or class definition found in a source file."""
+
+    qualname: str
+    path: str
+    line: int
+    end_line: int
+    kind: str
+    signature: str
+    doc: str = ""
+
+    @property
+    def name(self) -> str:
+        """Return the unqualified name."""
+        return self.qualname.rsplit(".", 1)[-1]
+
+    @property
+    def key(self) -> str:
+        """Return a pytest-style identifier, e.g. `pkg/mod.py::Cls.method`."""
+        return f"{self.path}::{self.qualname}"
+
+    @property
+    def dotted_name(self) -> str:
+        """Return the import path, e.g. `pkg.mod.Cls.method`."""
+        module = _module_name(self.path)
+        return f"{module}.{self.qualname}" if module else self.qualname
+
+
+@dataclass
+class FileEntry:
+    """Indexed definitions and references of a single source file."""
+
+    mtime_ns: int
+    size: int
+    symbols: List[SymbolInfo] = field(default_factory=list)
+    # References made inside the body of each function, by qualified name:
+    # import paths where resolvable, bare names otherwise
+    references: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FileEntry":
+        """Build an entry from its dictionary map structure."""
+        return cls(
+            mtime_ns=data["mtime_ns"],
+            size=data["size"],
+            symbols=[SymbolInfo(**s) for s in data.get("symbols", [])],
+            references=data.get("references", {}),
+        )
+
+
+def _signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _module_name(path: str) -> str:
+    parts = path[: -len(".py")].split("/") if path.endswith(".py") else [path]
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _is_test_module(path: str) -> bool:
+    name = Path(path).name
+    return name.startswith("test_") or name.endswith("_test.py")
+
+
+def _import_aliases(tree: ast.Module, path: str) -> Dict[str, str]:
+    module = _module_name(path).split(".")
+    package = module if Path(path).name == "__init__.py" else module[:-1]
+    aliases: Dict[str, str] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".", 1)[0]
+                    aliases[top] = top
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module.split(".") if node.module else []
+            if node.level:
+                base = package[: max(len(package) - node.level + 1, 0)] + base
+            for alias in node.names:
+                if alias.name != "*":
+                    target = ".".join(base + [alias.name])
+                    aliases[alias.asname or alias.name] = target
+    return aliases
+
+
+def _referenced_names(
+    node: ast.AST, scopes: Dict[str, str], owner: Optional[str]
+) -> List[str]:
+    """Resolve the names a function references to import paths.
+
+    Names bound by imports or module-level definitions, and attributes of
+    `self` or `cls` within a class, are resolved. Anything else is kept as
+    the bare (attribute) name.
+    """
+    names: Set[str] = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(scopes.get(child.id, child.id))
+        elif isinstance(child, ast.Attribute):
+            parts = [child.attr]
+            value = child.value
+            while isinstance(value, ast.Attribute):
+                parts.append(value.attr)
+                value = value.value
+            base = None
+            if isinstance(value, ast.Name):
+                base = scopes.get(value.id)
+                if value.id in ("self", "cls") and owner is not None:
+                    base = owner
+            names.add(".".join([base] + parts[::-1]) if base else child.attr)
+    return sorted(names)
+
+
+def parse_source(
+    source: str, path: str
+) -> Tuple[List[SymbolInfo], Dict[str, List[str]]]:
+    """Extract the definitions and per-function references of a module.
+
+    Args:
+        source (str): Python source code
+        path (str): Repository-relative path of the module
+
+    Raises:
+        SyntaxError: If the source cannot be parsed
+
+    Returns:
+        Tuple[List[SymbolInfo], Dict[str, List[str]]]: Definitions, and the
+            references made by each function
+    """
+    symbols: List[SymbolInfo] = []
+    references: Dict[str, List[str]] = {}
+    tree = ast.parse(source, filename=path)
+    module = _module_name(path)
+    scopes = _import_aliases(tree, path)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            scopes[node.name] = f"{module}.{node.name}" if module else node.name
+
+    def visit(
+        body: List[ast.stmt], scope: str, in_class: bool, owner: Optional[str]
+    ) -> None:
+        for node in body:
+            if not isinstance(
+                node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            ):
+                continue
+            qualname = f"{scope}.{node.name}" if scope else node.name
+            is_class = isinstance(node, ast.ClassDef)
+            kind = "class" if is_class else "method" if in_class else "function"
+            doc = (ast.get_docstring(node) or "").strip().split("\n", 1)[0]
+            symbols.append(
+                SymbolInfo(
+                    qualname=qualname,
+                    path=path,
+                    line=node.lineno,
+                    end_line=node.end_lineno or node.lineno,
+                    kind=kind,
+                    signature=_signature(node),
+                    doc=doc,
+                )
+            )
+            if is_class:
+                dotted = f"{module}.{qualname}" if module else qualname
+                visit(node.body, qualname, True, dotted)
+            else:
+                references[qualname] = _referenced_names(node, scopes, owner)
+                visit(node.body, qualname, False, owner)
+
+    visit(tree.body, "", False, None)
+    return symbols, references
+
+
+def changed_lines(diff: str) -> Dict[str, Set[int]]:
+    """Get the lines of each file touched by a unified diff.
+
+    Removed lines are attributed to the line of the new file they were
+    removed before.
+
+    Args:
+        diff (str): Unified diff
+
+    Returns:
+        Dict[str, Set[int]]: Changed line numbers of the new file, by path
+    """
+    changes: Dict[str, Set[int]] = {}
+    path: Optional[str] = None
+    line, in_header = 0, True
+    for text in diff.splitlines():
+        if text.startswith("diff --git"):
+            in_header = True
+            continue
+        if in_header and text.startswith("+++ "):
+            target = text[4:].strip()
+            path = target[2:] if target.startswith("b/") else None
+            continue
+        hunk = _HUNK.match(text)
+        if hunk:
+            line, in_header = int(hunk.group("start")), False
+            continue
+        if in_header or path is None or not text:
+            continue
+        if text[0] == "+":
+            changes.setdefault(path, set()).add(line)
+            line += 1
+        elif text[0] == "-":
+            changes.setdefault(path, set()).add(line)
+        elif text[0] == " ":
+            line += 1
+    return changes
+
+
+def get_index_file(root: Path) -> Path:
+    """Get the file holding the index of a repository."""
+    digest = hashlib.sha256(str(root.resolve()).encode()).hexdigest()[:16]
+    return get_codexa_home() / "index" / f"{digest}.json"
+
+
+class RepositoryIndex:
+    """Persistent map of a repository's symbols to their callers and tests.
+
+    Definitions and the names referenced by each function are extracted
+    with `ast` and stored per file. `update` only re-parses files whose size
+    or modification time changed since the last update. References are
+    matched by import path where they could be resolved. Unresolved names,
+    such as methods called on arbitrary objects, only match when a single
+    definition carries the name.
+    """
+
+    def __init__(self, root: Path, path: Optional[Path] = None) -> None:
+        self.__root = root.resolve()
+        self.__path = path or get_index_file(self.__root)
+        self.__files: Dict[str, FileEntry] = {}
+        self.__tests: Optional[Set[str]] = None
+        self.__tests_fingerprint: Optional[str] = None
+        self.__referrers: Optional[Dict[str, List[SymbolInfo]]] = None
+        if self.__path.is_file():
+            try:
+                raw = json.loads(self.__path.read_text())
+                if raw.get("version") == INDEX_VERSION:
+                    self.__files = {
+                        p: FileEntry.from_dict(e) for p, e in raw["files"].items()
+                    }
+                    if raw.get("tests"):
+                        self.__tests = set(raw["tests"]["keys"])
+                        self.__tests_fingerprint = raw["tests"]["fingerprint"]
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(
+                    f"Ignoring unreadable repository index {self.__path}: {e}"
+                )
+
+    @property
+    def root(self) -> Path:
+        """Return the repository root."""
+        return self.__root
+
+    @property
+    def symbols(self) -> List[SymbolInfo]:
+        """Return all indexed definitions."""
+        return [s for entry in self.__files.values() for s in entry.symbols]
+
+    def __sources(self, scope: str) -> Iterator[Path]:
+        base = self.__root / scope if scope else self.__root
+        for directory, dirs, files in os.walk(base):
+            dirs[:] = [
+                d for d in dirs if not d.startswith(".") and d not in _SKIPPED_DIRS
+            ]
+            for name in files:
+                if name.endswith(".py"):
+                    yield Path(directory, name)
+
+    def update(self, scope: str = "") -> int:
+        """Re-index the source files changed since the last update.
+
+        Args:
+            scope (str, optional): Directory to index, relative to the root
+
+        Returns:
+            int: Number of files parsed
+        """
+        prefix = f"{scope.rstrip('/')}/" if scope else ""
+        seen: Set[str] = set()
+        parsed = 0
+        for source in self.__sources(scope):
+            relative = source.relative_to(self.__root).as_posix()
+            seen.add(relative)
+            stat = source.stat()
+            entry = self.__files.get(relative)
+            if entry and (entry.mtime_ns, entry.size) == (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                continue
+            entry = FileEntry(stat.st_mtime_ns, stat.st_size)
+            try:
+                entry.symbols, entry.references = parse_source(
+                    source.read_text(encoding="utf-8", errors="replace"), relative
+                )
+            except (SyntaxError, ValueError) as e:
+                logger.debug(f"Indexing {relative} without symbols: {e}")
+            self.__files[relative] = entry
+            parsed += 1
+        removed = [p for p in self.__files if p.startswith(prefix) and p not in seen]
+        for relative in removed:
+            del self.__files[relative]
+        if parsed or removed:
+            self.__referrers = None
+            self.save()
+        logger.debug(
+            f"Indexed {parsed} changed file(s), dropped {len(removed)}, "
+            f"{len(self.__files)} file(s) in total"
+        )
+        return parsed
+
+    def save(self) -> None:
+        """Write the index to disk."""
+        data = {
+            "version": INDEX_VERSION,
+            "root": str(self.__root),
+            "files": {p: e.to_dict() for p, e in self.__files.items()},
+        }
+        if self.__tests is not None:
+            data["tests"] = {
+                "fingerprint": self.__tests_fingerprint,
+                "keys": sorted(self.__tests),
+            }
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.__path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.__path)
+
+    def __test_files_fingerprint(self, scope: str) -> str:
+        prefix = f"{scope.rstrip('/')}/" if scope else ""
+        digest = hashlib.sha256(scope.encode())
+        for path, entry in sorted(self.__files.items()):
+            if path.startswith(prefix) and (
+                _is_test_module(path) or Path(path).name == "conftest.py"
+            ):
+                digest.update(f"\0{path}:{entry.mtime_ns}:{entry.size}".encode())
+        return digest.hexdigest()
+
+    def has_linked_tests(self, scope: str = "") -> bool:
+        """Return whether tests linked from a scope are still current.
+
+        Linked tests go stale when a test module or conftest file in the
+        scope is added, removed or modified since they were collected.
+
+        Args:
+            scope (str, optional): Directory the tests were collected from,
+                relative to the root
+        """
+        return self.__tests is not None and (
+            self.__tests_fingerprint == self.__test_files_fingerprint(scope)
+        )
+
+    def link_tests(self, tests: List[TestcaseMetadata], scope: str = "") -> None:
+        """Mark the functions of collected tests as test functions.
+
+        Without linked tests, functions named `test*` in test modules count
+        as tests. Linked tests are saved with the index.
+
+        Args:
+            tests (List[TestcaseMetadata]): Collected test metadata
+            scope (str, optional): Directory the tests were collected from,
+                relative to the root
+        """
+        keys = set()
+        for test in tests:
+            if not test.function:
+                continue
+            path = Path(test.path) if test.path else self.__root / test.file
+            try:
+                relative = path.resolve().relative_to(self.__root).as_posix()
+            except ValueError:
+                continue
+            # Node IDs name the whole class nesting, e.g. `f.py::Outer::Inner::test`
+            classes = test.node_id.split("::")[1:-1]
+            if not classes and test.cls:
+                classes = [test.cls]
+            qualname = ".".join(classes + [test.function])
+            keys.add(f"{relative}::{qualname}")
+        self.__tests = keys
+        self.__tests_fingerprint = self.__test_files_fingerprint(scope)
+
+    def is_test(self, symbol: SymbolInfo) -> bool:
+        """Return whether a definition is a test function."""
+        if self.__tests is not None:
+            return symbol.key in self.__tests
+        return (
+            symbol.kind != "class"
+            and symbol.name.startswith("test")
+            and _is_test_module(symbol.path)
+        )
+
+    def __targets(self) -> Callable[[str], List[SymbolInfo]]:
+        by_name: Dict[str, List[SymbolInfo]] = {}
+        for symbol in self.symbols:
+            by_name.setdefault(symbol.name, []).append(symbol)
+        packages = {
+            part for path in self.__files for part in _module_name(path).split(".")
+        }
+
+        @functools.lru_cache(maxsize=None)
+        def targets(reference: str) -> List[SymbolInfo]:
+            candidates = by_name.get(reference.rsplit(".", 1)[-1], [])
+            if "." in reference:
+                suffix = f".{reference}"
+                found = [s for s in candidates if f".{s.dotted_name}".endswith(suffix)]
+                # Fall back to the name for re-exports of first-party modules
+                if found or reference.split(".", 1)[0] not in packages:
+                    return found
+            return candidates if len(candidates) == 1 else []
+
+        return targets
+
+    def __referrer_map(self) -> Dict[str, List[SymbolInfo]]:
+        if self.__referrers is None:
+            by_key = {s.key: s for s in self.symbols}
+            targets = self.__targets()
+            referrers: Dict[str, List[SymbolInfo]] = {}
+            for path, entry in sorted(self.__files.items()):
+                for qualname, references in entry.references.items():
+                    symbol = by_key.get(f"{path}::{qualname}")
+                    if symbol is None:
+                        continue
+                    found = {t.key for r in references for t in targets(r)}
+                    for key in sorted(found):
+                        referrers.setdefault(key, []).append(symbol)
+            self.__referrers = referrers
+        return self.__referrers
+
+    def referrers(self, symbol: SymbolInfo) -> List[SymbolInfo]:
+        """Get the functions referencing a symbol, excluding itself."""
+        return [
+            s
+            for s in self.__referrer_map().get(symbol.key, [])
+            if s.key != symbol.key and not s.key.startswith(f"{symbol.key}.")
+        ]
+
+    def callers(self, symbol: SymbolInfo) -> List[SymbolInfo]:
+        """Get the non-test functions referencing a symbol."""
+        return [s for s in self.referrers(symbol) if not self.is_test(s)]
+
+    def tests_for(self, symbol: SymbolInfo) -> List[SymbolInfo]:
+        """Get the test functions referencing a symbol."""
+        return [s for s in self.referrers(symbol) if self.is_test(s)]
+
+    def __symbols_of(self, path: str, source: Optional[str]) -> List[SymbolInfo]:
+        if source is None:
+            entry = self.__files.get(path)
+            return entry.symbols if entry else []
+        try:
+            return parse_source(source, path)[0]
+        except (SyntaxError, ValueError) as e:
+            logger.debug(f"No symbols for the diffed version of {path}: {e}")
+            return []
+
+    def changed_symbols(
+        self, diff: str, sources: Optional[Dict[str, str]] = None
+    ) -> List[SymbolInfo]:
+        """Get the innermost definitions containing the lines changed by a diff.
+
+        Args:
+            diff (str): Unified diff relative to the repository root
+            sources (Dict[str, str], optional): Source of the diffed version of
+                the files whose working tree copy differs from it, by path
+
+        Returns:
+            List[SymbolInfo]: Changed definitions, in file and line order
+        """
+        sources = sources or {}
+        changed: Dict[str, SymbolInfo] = {}
+        for path, lines in sorted(changed_lines(diff).items()):
+            symbols = self.__symbols_of(path, sources.get(path))
+            for line in sorted(lines):
+                enclosing = [s for s in symbols if s.line <= line <= s.end_line]
+                if enclosing:
+                    symbol = min(enclosing, key=lambda s: s.end_line - s.line)
+                    changed.setdefault(symbol.key, symbol)
+        return list(changed.values())
+
+    def context_for_diff(
+        self, diff: str, sources: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Render compact context on the symbols changed by a diff.
+
+        Args:
+            diff (str): Unified diff relative to the repository root
+            sources (Dict[str, str], optional): Source of the diffed version of
+                the files whose working tree copy differs from it, by path
+
+        Returns:
+            str: Markdown context, empty if no indexed symbol changed
+        """
+        symbols = self.changed_symbols(diff, sources)
+        if not symbols:
+            return ""
+
+        def listing(found: List[SymbolInfo]) -> str:
+            keys = [f"`{s.key}`" for s in found[:MAX_LISTED_REFERENCES]]
+            if len(found) > MAX_LISTED_REFERENCES:
+                keys.append(f"{len(found) - MAX_LISTED_REFERENCES} more")
+            return ", ".join(keys)
+
+        lines = [
+            "# Repository Context",
+            "",
+            "Changed definitions, the functions referencing them and the tests "
+            "referencing them.",
+            "",
+        ]
+        for symbol in symbols[:MAX_CONTEXT_SYMBOLS]:
+            doc = f" - {symbol.doc}" if symbol.doc else ""
+            lines.append(
+                f"- `{symbol.key}` ({symbol.kind}, lines {symbol.line}-"
+                f"{symbol.end_line}): `{symbol.signature}`{doc}"
+            )
+            if self.is_test(symbol):
+                continue
+            callers, tests = self.callers(symbol), self.tests_for(symbol)
+            if callers:
+                lines.append(f"  - Callers: {listing(callers)}")
+            lines.append(
+                f"  - Tests: {listing(tests)}" if tests else "  - Tests: none found"
+            )
+        if len(symbols) > MAX_CONTEXT_SYMBOLS:
+            lines.append(f"- {len(symbols) - MAX_CONTEXT_SYMBOLS} more changed symbols")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from codexa.client.results import TestResult
+from codexa.core.env import get_codexa_home
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_FRAME_DEPTH = 3
+
+# Lock files left behind by a killed process are broken after this long
+LOCK_STALE_S = 30.0
+LOCK_POLL_S = 0.05
+
+# Volatile fragments replaced before fingerprinting, most specific first
+_VOLATILE_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<hex>"),
+    (
+        re.compile(
+            r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I
+        ),
+        "<uuid>",
+    ),
+    (re.compile(r"(?:/[\w.\-]+){2,}"), "<path>"),
+    (re.compile(r"\b\d+(?:\.\d+)?"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_message(message: Optional[str]) -> str:
+    """Strip run-specific details (addresses, paths, numbers) from a message."""
+    text = (message or "").strip()
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+@dataclass(frozen=True)
+class FailureSignature:
+    """Fingerprint of a failure that is stable across runs and machines."""
+
+    exception_type: str
+    message: str
+    frames: Tuple[str, ...]
+
+    @classmethod
+    def from_result(
+        cls, result: TestResult, depth: int = DEFAULT_FRAME_DEPTH
+    ) -> "FailureSignature":
+        """Build the signature of a failed test result.
+
+        Args:
+            result (TestResult): Failed test result
+            depth (int, optional): Number of innermost frames to include
+
+        Returns:
+            FailureSignature: Failure fingerprint
+        """
+        return cls(
+            exception_type=result.exception_type or "UnknownError",
+            message=normalize_message(result.message),
+            frames=tuple(result.frames[-depth:]) if depth else (),
+        )
+
+    @property
+    def digest(self) -> str:
+        """Return a short, stable identifier for the signature."""
+        key = "\n".join([self.exception_type, self.message, *self.frames])
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+@dataclass
+class KnowledgeEntry:
+    """Stored analysis of a failure signature."""
+
+    digest: str
+    exception_type: str
+    message: str
+    frames: List[str]
+    analysis: str
+    example: str
+    created_at: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.time)
+    hits: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+
+@contextmanager
+def _exclusive_file(lock_path: Path) -> Iterator[None]:
+    """Hold a lock by owning the lock file, where `fcntl` is unavailable."""
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > LOCK_STALE_S:
+                    logger.warning(f"Breaking stale knowledge lock {lock_path}")
+                    lock_path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(LOCK_POLL_S)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        lock_path.unlink(missing_ok=True)
+
+
+class SignatureIndex:
+    """Persistent index of analyses, keyed by failure signature.
+
+    Entries expire `ttl_days` after they were stored, so that analyses do not
+    outlive the code they describe for too long. Several processes may share
+    the index: saving merges the changes made since loading into the current
+    file contents, under a lock.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, ttl_days: float = DEFAULT_TTL_DAYS
+    ) -> None:
+        self.__path = path or get_codexa_home() / "signatures.json"
+        self.__ttl_s = ttl_days * 24 * 3600
+        self.__entries = self.__read()
+        self.__stored: Set[str] = set()
+        self.__hits: Dict[str, int] = {}
+        self.__removed: Set[str] = set()
+        self.__cleared = False
+
+    def __read(self) -> Dict[str, KnowledgeEntry]:
+        if not self.__path.is_file():
+            return {}
+        try:
+            raw = json.loads(self.__path.read_text())
+            return {d: KnowledgeEntry(**e) for d, e in raw.items()}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable signature index {self.__path}: {e}")
+            return {}
+
+    @contextmanager
+    def __locked(self) -> Iterator[None]:
+        lock_path = self.__path.with_name(self.__path.name + ".lock")
+        if fcntl is None:
+            with _exclusive_file(lock_path):
+                yield
+            return
+        with open(lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SignatureIndex":
+        """Open the default index with the `knowledge.ttl_days` setting."""
+        knowledge = config.get("knowledge", {}) or {}
+        return cls(ttl_days=knowledge.get("ttl_days", DEFAULT_TTL_DAYS))
+
+    @property
+    def entries(self) -> List[KnowledgeEntry]:
+        """Return all stored entries, most recently seen first."""
+        return sorted(self.__entries.values(), key=lambda e: -e.last_seen)
+
+    def is_expired(self, entry: KnowledgeEntry, now: Optional[float] = None) -> bool:
+        """Return whether the entry is past its time to live."""
+        return (now or time.time()) - entry.created_at > self.__ttl_s
+
+    def lookup(self, signature: FailureSignature) -> Optional[KnowledgeEntry]:
+        """Find the stored analysis for a signature, recording the hit.
+
+        Args:
+            signature (FailureSignature): Failure fingerprint
+
+        Returns:
+            Optional[KnowledgeEntry]: Stored entry, None if unknown or expired
+        """
+        entry = self.__entries.get(signature.digest)
+        if entry is None or self.is_expired(entry):
+            return None
+        entry.hits += 1
+        entry.last_seen = time.time()
+        self.__hits[entry.digest] = self.__hits.get(entry.digest, 0) + 1
+        return entry
+
+    def store(
+        self, signature: FailureSignature, analysis: str, example: str
+    ) -> KnowledgeEntry:
+        """Store the analysis generated for a signature.
+
+        Args:
+            signature (FailureSignature): Failure fingerprint
+            analysis (str): Markdown analysis of the failure
+            example (str): Node ID of a test that failed with this signature
+
+        Returns:
+            KnowledgeEntry: Stored entry
+        """
+        entry = KnowledgeEntry(
+            digest=signature.digest,
+            exception_type=signature.exception_type,
+            message=signature.message,
+            frames=list(signature.frames),
+            analysis=analysis,
+            example=example,
+        )
+        self.__entries[entry.digest] = entry
+        self.__stored.add(entry.digest)
+        self.__removed.discard(entry.digest)
+        return entry
+
+    def __remove(self, digest: str) -> bool:
+        self.__stored.discard(digest)
+        self.__hits.pop(digest, None)
+        self.__removed.add(digest)
+        return self.__entries.pop(digest, None) is not None
+
+    def invalidate(self, digest: str) -> bool:
+        """Remove a single entry, returning whether it existed."""
+        return self.__remove(digest)
+
+    def clear(self) -> int:
+        """Remove all entries, returning how many were removed."""
+        count = len(self.__entries)
+        self.__entries.clear()
+        self.__stored.clear()
+        self.__hits.clear()
+        self.__removed.clear()
+        self.__cleared = True
+        return count
+
+    def prune(self) -> int:
+        """Remove expired entries, returning how many were removed."""
+        now = time.time()
+        expired = [d for d, e in self.__entries.items() if self.is_expired(e, now)]
+        for digest in expired:
+            self.__remove(digest)
+        return len(expired)
+
+    def save(self) -> None:
+        """Merge the changes into the index on disk and write it atomically.
+
+        Entries stored or removed here win over the file contents, recorded
+        hits are added to them, and entries written by other processes since
+        loading are kept.
+        """
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        with self.__locked():
+            merged = {} if self.__cleared else self.__read()
+            for digest in self.__removed:
+                merged.pop(digest, None)
+            for digest, hits in self.__hits.items():
+                current = merged.get(digest)
+                if digest not in self.__stored and current is not None:
+                    current.hits += hits
+                    current.last_seen = self.__entries[digest].last_seen
+            for digest in self.__stored:
+                merged[digest] = self.__entries[digest]
+            data = {digest: entry.to_dict() for digest, entry in merged.items()}
+            fd, tmp = tempfile.mkstemp(dir=self.__path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.__path)
+        self.__entries = merged
+        self.__stored, self.__hits, self.__removed = set(), {}, set()
+        self.__cleared = False
+
+
+def group_by_signature(
+    failures: List[TestResult],
+) -> Dict[str, Tuple[FailureSignature, List[TestResult]]]:
+    """Group failures sharing the same signature, keyed by digest."""
+    groups: Dict[str, Tuple[FailureSignature, List[TestResult]]] = {}
+    for failure in failures:
+        signature = FailureSignature.from_result(failure)
+        groups.setdefault(signature.digest, (signature, []))[1].append(failure)
+    return groups
+
+
+def split_sections(analysis: str, node_ids: List[str]) -> Dict[str, str]:
+    """Split an LLM analysis into per-test sections.
+
+    A section starts at a Markdown heading containing one of the node IDs and
+    runs until the next such heading. The heading line itself is dropped.
+
+    Args:
+        analysis (str): Markdown analysis covering several tests
+        node_ids (List[str]): Node IDs the analysis was requested for
+
+    Returns:
+        Dict[str, str]: Analysis text per node ID that had a section
+    """
+    sections: Dict[str, List[str]] = {}
+    current: Optional[str] = None
+    for line in analysis.splitlines():
+        if line.lstrip().startswith("#"):
+            found = max((n for n in node_ids if n in line), key=len, default=None)
+            if found is not None:
+                current = found
+                sections[current] = []
+                continue
+        if current is not None:
+            sections[current].append(line)
+    return {n: "\n".join(lines).strip() for n, lines in sections.items()}
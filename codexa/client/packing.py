@@ -0,0 +1,261 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import List, Optional
+
+from codexa.client.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Sections are cut to fit only if at least this many tokens remain
+MIN_TRUNCATED_TOKENS = 256
+MAX_LISTED_OMISSIONS = 20
+TRUNCATION_MARKER = "[... truncated to fit the context window]\n"
+
+# Lower values are packed first
+SUMMARY, FAILURE, DETAIL, PASS = 0, 1, 2, 3
+SOURCE, TESTS, DOCS, GENERATED = 0, 1, 2, 3
+
+_SECTION = re.compile(r"^={3,} (?P<title>.+?) ={3,}$")
+_ENTRY = re.compile(r"^_{3,} (?P<title>.+?) _{3,}$")
+_COUNTS = re.compile(r"\b(passed|failed|errors?|skipped|no tests ran)\b")
+_DIFF_HEADER = re.compile(r"^diff --git a/(?P<a>\S+) b/(?P<b>\S+)")
+
+_DOC_SUFFIXES = {".md", ".rst", ".txt", ".adoc"}
+_GENERATED_NAMES = {"poetry.lock", "package-lock.json", "uv.lock", "yarn.lock"}
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Section of a prompt that is kept or omitted as a whole."""
+
+    label: str
+    text: str
+    priority: int
+
+    @property
+    def tokens(self) -> int:
+        """Return the estimated token count."""
+        return estimate_tokens(self.text)
+
+
+@dataclass(frozen=True)
+class PackedPrompt:
+    """Prompt content fitted into a token budget."""
+
+    text: str
+    budget: int
+    included: List[str] = field(default_factory=list)
+    truncated: List[str] = field(default_factory=list)
+    omitted: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """Return whether all the content fit."""
+        return not self.truncated and not self.omitted
+
+    @property
+    def tokens(self) -> int:
+        """Return the estimated token count."""
+        return estimate_tokens(self.text)
+
+
+def _omission_note(truncated: List[str], omitted: List[str]) -> str:
+    lines = ["", "[Content left out to fit the model context window]"]
+    if truncated:
+        lines.append(f"Truncated: {', '.join(label[:80] for label in truncated)}")
+    if omitted:
+        listed = [f"- {label[:80]}" for label in omitted[:MAX_LISTED_OMISSIONS]]
+        lines.append(f"Omitted {len(omitted)} section(s):")
+        lines += listed
+        if len(omitted) > MAX_LISTED_OMISSIONS:
+            lines.append(f"- and {len(omitted) - MAX_LISTED_OMISSIONS} more")
+    return "\n".join(lines) + "\n"
+
+
+class PromptPacker:
+    """Fit prompt sections into a token budget by priority.
+
+    When everything fits, the sections are kept as they are, in their
+    original order. Otherwise they are packed in priority order, keeping
+    their original order within a priority. A section that no longer fits is
+    cut if enough of the budget remains, and skipped otherwise; lower
+    priority sections that still fit are packed after it. Left out sections
+    are listed at the end of the prompt, so the model knows the input is
+    partial.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.__budget = budget
+
+    def pack(self, chunks: List[Chunk]) -> PackedPrompt:
+        """Pack the sections into the budget.
+
+        Args:
+            chunks (List[Chunk]): Prompt sections
+
+        Returns:
+            PackedPrompt: Packed content with the included and left out labels
+        """
+        if sum(c.tokens for c in chunks) <= self.__budget:
+            return PackedPrompt(
+                text="".join(c.text for c in chunks),
+                budget=self.__budget,
+                included=[c.label for c in chunks],
+            )
+
+        ordered = sorted(chunks, key=lambda c: c.priority)
+
+        # At most one section is cut, so this note is the longest possible
+        labels = [c.label for c in ordered]
+        longest = max(labels, key=len)
+        note_tokens = estimate_tokens(_omission_note([longest], labels))
+        available = max(self.__budget - note_tokens, 0)
+        parts: List[str] = []
+        included: List[str] = []
+        truncated: List[str] = []
+        omitted: List[str] = []
+        for chunk in ordered:
+            if chunk.tokens <= available:
+                parts.append(chunk.text)
+                included.append(chunk.label)
+                available -= chunk.tokens
+            elif available >= MIN_TRUNCATED_TOKENS:
+                keep = int(
+                    (available - estimate_tokens(TRUNCATION_MARKER)) * CHARS_PER_TOKEN
+                )
+                head = chunk.text[:keep]
+                head = head[: head.rfind("\n") + 1] or head + "\n"
+                parts.append(head + TRUNCATION_MARKER)
+                truncated.append(chunk.label)
+                available -= estimate_tokens(parts[-1])
+            else:
+                omitted.append(chunk.label)
+        parts.append(_omission_note(truncated, omitted))
+        return PackedPrompt(
+            text="".join(parts),
+            budget=self.__budget,
+            included=included,
+            truncated=truncated,
+            omitted=omitted,
+        )
+
+
+def split_test_output(test_output: str) -> List[Chunk]:
+    """Split Pytest output into sections prioritized for failure analysis.
+
+    The short summary and final counts come first, then each failure and
+    error, then warnings and other details, then the progress lines and
+    passing test output.
+
+    Args:
+        test_output (str): Pytest execution output
+
+    Returns:
+        List[Chunk]: Prioritized sections
+    """
+    chunks: List[Chunk] = []
+    label, priority, lines = "session header", PASS, []
+    section: Optional[str] = None
+
+    def close() -> None:
+        if lines:
+            chunks.append(Chunk(label, "".join(lines), priority))
+
+    for line in test_output.splitlines(keepends=True):
+        stripped = line.strip()
+        section_match = _SECTION.match(stripped)
+        entry_match = _ENTRY.match(stripped) if section else None
+        if section_match:
+            close()
+            section = section_match.group("title")
+            label, lines = section, [line]
+            lowered = section.lower()
+            if lowered == "short test summary info" or _COUNTS.search(lowered):
+                priority = SUMMARY
+            elif lowered in ("failures", "errors"):
+                priority = FAILURE
+            elif lowered in ("passes", "test session starts"):
+                priority = PASS
+            else:
+                priority = DETAIL
+        elif entry_match and section and section.lower() in ("failures", "errors"):
+            close()
+            label, priority = f"{section}: {entry_match.group('title')}", FAILURE
+            lines = [line]
+        elif entry_match and section and section.lower() == "passes":
+            close()
+            label, priority = f"{section}: {entry_match.group('title')}", PASS
+            lines = [line]
+        else:
+            lines.append(line)
+    close()
+    if chunks and not chunks[-1].text.endswith("\n"):
+        last = chunks[-1]
+        chunks[-1] = Chunk(last.label, last.text + "\n", last.priority)
+    return chunks
+
+
+def classify_path(path: str) -> int:
+    """Get the packing priority of a changed file.
+
+    Args:
+        path (str): Repository-relative file path
+
+    Returns:
+        int: Priority, source files first, then tests, docs and lock files
+    """
+    posix = PurePosixPath(path)
+    parts = {p.lower() for p in posix.parts[:-1]}
+    name = posix.name.lower()
+    if name in _GENERATED_NAMES or posix.suffix == ".lock":
+        return GENERATED
+    if posix.suffix.lower() in _DOC_SUFFIXES or parts & {"docs", "doc"}:
+        return DOCS
+    if (
+        parts & {"tests", "test"}
+        or name.startswith("test_")
+        or name.endswith("_test.py")
+        or name == "conftest.py"
+    ):
+        return TESTS
+    return SOURCE
+
+
+def split_diff(diff: str) -> List[Chunk]:
+    """Split a unified diff into per-file sections prioritized by file kind.
+
+    Args:
+        diff (str): Unified diff of one or more files
+
+    Returns:
+        List[Chunk]: Prioritized sections
+    """
+    chunks: List[Chunk] = []
+    label, lines = "diff header", []
+    for line in diff.splitlines(keepends=True):
+        header = _DIFF_HEADER.match(line)
+        if header:
+            if lines:
+                chunks.append(Chunk(label, "".join(lines), classify_path(label)))
+            label, lines = header.group("b"), [line]
+        else:
+            lines.append(line)
+    if lines:
+        text = "".join(lines)
+        chunks.append(
+            Chunk(
+                label,
+                text if text.endswith("\n") else text + "\n",
+                classify_path(label),
+            )
+        )
+    return chunks
+
+
+def pack_test_output(test_output: str, budget: int) -> PackedPrompt:
+    """Fit Pytest output into a token budget, failures first."""
+    return PromptPacker(budget).pack(split_test_output(test_output))
+
+
+def pack_diff(diff: str, budget: int) -> PackedPrompt:
+    """Fit a unified diff into a token budget, source changes first."""
+    return PromptPacker(budget).pack(split_diff(diff))
@@ -0,0 +1,211 @@
+import json
+import logging
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from _pytest.reports import TestReport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP = 10
+# Function-scoped fixtures costing more than this on average are flagged
+SCOPE_HINT_THRESHOLD_S = 0.1
+
+
+@dataclass
+class TestTiming:
+    """Setup, call and teardown durations of a single test."""
+
+    node_id: str
+    setup: float = 0.0
+    call: float = 0.0
+    teardown: float = 0.0
+    peak_memory: Optional[int] = None
+
+    @property
+    def total(self) -> float:
+        """Return the duration of all phases (s)."""
+        return self.setup + self.call + self.teardown
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return {**asdict(self), "total": self.total}
+
+
+@dataclass
+class FixtureTiming:
+    """Accumulated setup cost of a fixture definition."""
+
+    name: str
+    scope: str
+    location: str
+    setups: int = 0
+    total: float = 0.0
+    slowest: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        """Return the mean setup duration (s)."""
+        return self.total / self.setups if self.setups else 0.0
+
+    @property
+    def scope_hint(self) -> bool:
+        """Return whether the fixture looks expensive enough to widen its scope."""
+        return (
+            self.scope == "function"
+            and self.setups > 1
+            and self.mean >= SCOPE_HINT_THRESHOLD_S
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return {**asdict(self), "mean": self.mean, "scope_hint": self.scope_hint}
+
+
+@dataclass
+class PhaseProfile:
+    """Phase and fixture timings of a test run."""
+
+    tests: List[TestTiming] = field(default_factory=list)
+    fixtures: List[FixtureTiming] = field(default_factory=list)
+
+    def slowest_tests(self, top: int = DEFAULT_TOP) -> List[TestTiming]:
+        """Return the tests with the longest total duration."""
+        return sorted(self.tests, key=lambda t: -t.total)[:top]
+
+    def expensive_fixtures(self, top: int = DEFAULT_TOP) -> List[FixtureTiming]:
+        """Return the fixtures with the highest accumulated setup cost."""
+        return sorted(self.fixtures, key=lambda f: -f.total)[:top]
+
+    def biggest_allocators(self, top: int = DEFAULT_TOP) -> List[TestTiming]:
+        """Return the tests with the highest peak traced memory."""
+        traced = [t for t in self.tests if t.peak_memory is not None]
+        return sorted(traced, key=lambda t: -t.peak_memory)[:top]
+
+    def to_dict(self, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+        """Convert to dictionary map structure, with the rankings."""
+        return {
+            "slowest_tests": [t.to_dict() for t in self.slowest_tests(top)],
+            "expensive_fixtures": [f.to_dict() for f in self.expensive_fixtures(top)],
+            "biggest_allocators": [t.to_dict() for t in self.biggest_allocators(top)],
+            "tests": [t.to_dict() for t in self.tests],
+            "fixtures": [f.to_dict() for f in self.fixtures],
+        }
+
+    def write(self, path: Path, top: int = DEFAULT_TOP) -> None:
+        """Write the profile as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(top), indent=2))
+
+    def to_markdown(self, top: int = DEFAULT_TOP) -> str:
+        """Render the rankings as a Markdown report section."""
+        lines = ["## Test Performance", "", "### Slowest Tests", ""]
+        lines += [
+            "| Test | Total | Setup | Call | Teardown |",
+            "| --- | --- | --- | --- | --- |",
+        ]
+        for t in self.slowest_tests(top):
+            lines.append(
+                f"| `{t.node_id}` | {t.total:.3f}s | {t.setup:.3f}s "
+                f"| {t.call:.3f}s | {t.teardown:.3f}s |"
+            )
+        lines += ["", "### Most Expensive Fixtures", ""]
+        lines += [
+            "| Fixture | Scope | Setups | Total | Mean |",
+            "| --- | --- | --- | --- | --- |",
+        ]
+        for f in self.expensive_fixtures(top):
+            lines.append(
+                f"| `{f.name}` ({f.location}) | {f.scope} | {f.setups} "
+                f"| {f.total:.3f}s | {f.mean:.3f}s |"
+            )
+        hinted = [f for f in self.expensive_fixtures(top) if f.scope_hint]
+        if hinted:
+            lines.append("")
+            for f in hinted:
+                lines.append(
+                    f"- `{f.name}` is function-scoped but set up {f.setups} times at "
+                    f"{f.mean:.3f}s each; consider a wider scope if it holds no "
+                    "per-test state."
+                )
+        allocators = self.biggest_allocators(top)
+        if allocators:
+            lines += ["", "### Biggest Allocators", ""]
+            lines += ["| Test | Peak memory |", "| --- | --- |"]
+            for t in allocators:
+                lines.append(f"| `{t.node_id}` | {t.peak_memory / 1024:.1f} KiB |")
+        return "\n".join(lines) + "\n"
+
+
+class PhaseProfilerPlugin:
+    """Pytest plugin timing test phases and fixture setups.
+
+    With `trace_memory`, the peak memory allocated while running each test is
+    measured with tracemalloc, which slows the run down noticeably.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.__trace_memory = trace_memory
+        self.__started_tracing = False
+        self.__tests: Dict[str, TestTiming] = {}
+        self.__fixtures: Dict[Tuple[str, str], FixtureTiming] = {}
+
+    @property
+    def profile(self) -> PhaseProfile:
+        """Return the collected timings."""
+        return PhaseProfile(
+            tests=list(self.__tests.values()), fixtures=list(self.__fixtures.values())
+        )
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        if self.__trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing = True
+
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_fixture_setup(self, fixturedef: Any, request: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return (yield)
+        finally:
+            elapsed = time.perf_counter() - start
+            location = getattr(fixturedef.func, "__module__", None) or "<unknown>"
+            key = (fixturedef.argname, location)
+            timing = self.__fixtures.get(key)
+            if timing is None:
+                timing = FixtureTiming(fixturedef.argname, fixturedef.scope, location)
+                self.__fixtures[key] = timing
+            timing.setups += 1
+            timing.total += elapsed
+            timing.slowest = max(timing.slowest, elapsed)
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_protocol(self, item: pytest.Item, nextitem: Any) -> Any:
+        tracing = self.__trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            return (yield)
+        finally:
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                self.__timing(item.nodeid).peak_memory = max(peak, 0)
+
+    def pytest_runtest_logreport(self, report: TestReport) -> None:
+        timing = self.__timing(report.nodeid)
+        setattr(timing, report.when, getattr(timing, report.when) + report.duration)
+
+    def __timing(self, node_id: str) -> TestTiming:
+        if node_id not in self.__tests:
+            self.__tests[node_id] = TestTiming(node_id)
+        return self.__tests[node_id]
@@ -0,0 +1,423 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Final, List, Optional, Tuple
+
+from jinja2 import Environment, StrictUndefined
+
+from codexa.client.accessor import ReportScanner
+from codexa.client.flakiness import RerunVerdict
+from codexa.client.knowledge import (
+    FailureSignature,
+    SignatureIndex,
+    group_by_signature,
+    split_sections,
+)
+from codexa.client.results import TestResult, summarize_outcomes
+from codexa.core.profiling import span
+
+logger = logging.getLogger(__name__)
+
+MAX_UNREPORTED_LINES = 40
+
+
+class Escalation:
+    """Policies for escalating the report generation to the LLM."""
+
+    ALWAYS: Final[str] = "always"
+    UNEXPLAINED: Final[str] = "unexplained"
+    NEVER: Final[str] = "never"
+    CHOICES: Final[Tuple[str, ...]] = (ALWAYS, UNEXPLAINED, NEVER)
+
+
+@dataclass
+class FailureGroup:
+    """Unexplained failures sharing a failure signature."""
+
+    digest: str
+    results: List[TestResult]
+    analysis: Optional[str] = None
+    known: bool = False
+    hits: int = 0
+
+
+@dataclass(frozen=True)
+class FailureExplanation:
+    """Deterministic explanation of a known class of failure."""
+
+    result: TestResult
+    category: str
+    summary: str
+    steps: List[str] = field(default_factory=list)
+
+
+Rule = Callable[[TestResult], Optional[FailureExplanation]]
+
+_COMPARISON = re.compile(
+    r"^(?:AssertionError: )?assert (?P<left>.+?) "
+    r"(?P<op>==|!=|<=|>=|<|>|not in|in|is not|is) (?P<right>.+)$"
+)
+_MISSING_MODULE = re.compile(r"No module named '(?P<module>[\w.]+)'")
+_MISSING_FIXTURE = re.compile(r"fixture '(?P<fixture>\w+)' not found")
+
+
+def _reproduce(result: TestResult) -> str:
+    return f"Reproduce locally with `pytest {result.node_id}`"
+
+
+def explain_assertion(result: TestResult) -> Optional[FailureExplanation]:
+    """Explain plain comparison assertions, e.g. `assert actual == expected`."""
+    if result.exception_type != "AssertionError" or not result.message:
+        return None
+    match = _COMPARISON.match(result.message)
+    if match is None:
+        return None
+    left, op, right = match.group("left", "op", "right")
+    return FailureExplanation(
+        result=result,
+        category="Assertion mismatch",
+        summary=f"The assertion `{left} {op} {right}` does not hold.",
+        steps=[
+            f"Check whether `{right}` is still the expected value for the "
+            "current behaviour",
+            "If the behaviour change is intended, update the assertion; "
+            "otherwise fix the code under test",
+            _reproduce(result),
+        ],
+    )
+
+
+def explain_missing_module(result: TestResult) -> Optional[FailureExplanation]:
+    """Explain failures caused by modules that cannot be imported."""
+    if result.exception_type not in ("ModuleNotFoundError", "ImportError"):
+        return None
+    match = _MISSING_MODULE.search(result.message or "")
+    if match is None:
+        return None
+    module = match.group("module")
+    return FailureExplanation(
+        result=result,
+        category="Missing dependency",
+        summary=f"The test environment cannot import {module}.",
+        steps=[
+            "Install the missing package in the test environment, or add it to "
+            "the project dependencies",
+            "If the module is part of this project, check the import path and "
+            "the Pytest rootdir / `pythonpath` configuration",
+            _reproduce(result),
+        ],
+    )
+
+
+def explain_missing_fixture(result: TestResult) -> Optional[FailureExplanation]:
+    """Explain tests requesting a fixture that is not defined."""
+    match = _MISSING_FIXTURE.search(result.message or "")
+    if match is None:
+        return None
+    fixture = match.group("fixture")
+    return FailureExplanation(
+        result=result,
+        category="Missing fixture",
+        summary=f"The fixture `{fixture}` is not available to this test.",
+        steps=[
+            f"Check the spelling of `{fixture}` in the test signature",
+            "Define the fixture in the test module or a `conftest.py` visible "
+            "to it, or install the plugin providing it",
+            _reproduce(result),
+        ],
+    )
+
+
+DEFAULT_RULES: List[Rule] = [
+    explain_assertion,
+    explain_missing_module,
+    explain_missing_fixture,
+]
+
+REPORT_TEMPLATE = """\
+# Test Execution Report
+
+## Summary
+
+- **Result**: {{ "FAILED" if failures else "FLAKY" if flaky else "PASSED" }}
+- **Tests**: {{ total }} ({{ counts }})
+- **Duration**: {{ "%.2f" | format(duration) }}s
+{% if verdicts %}
+- **Reruns**: {{ verdicts | length - flaky | length }} deterministic, \
+{{ flaky | length }} flaky failure(s)
+{% endif %}
+
+{% if flaky %}
+## Flaky Tests
+
+These tests failed, then passed in at least one rerun. They most likely depend on timing,
+ordering or shared state rather than on a defect in the code under test.
+
+{% for verdict in flaky %}
+- `{{ verdict.node_id }}`: passed {{ verdict.passes }} of {{ verdict.runs }} reruns
+{% endfor %}
+
+{% endif %}
+{% if not failures %}
+{% if not flaky %}
+All tests passed, no action is required.
+{% endif %}
+{% else %}
+{% if output %}
+## Unreported Failures
+
+Pytest reported a failure that no test result accounts for, e.g. because a test report
+is missing or unreadable. The end of its output:
+
+```text
+{{ output }}
+```
+
+{% endif %}
+{% if explained or not output %}
+## Failures
+
+{% endif %}
+{% for item in explained %}
+### `{{ item.result.node_id }}`
+
+- **Category**: {{ item.category }}
+- **Error**: `{{ item.result.message }}`
+- **Summary**: {{ item.summary }}
+{% if item.result.node_id in verdicts %}
+- **Reruns**: failed all {{ verdicts[item.result.node_id].runs }} reruns (deterministic)
+{% endif %}
+
+Steps to fix:
+
+{% for step in item.steps %}
+{{ loop.index }}. {{ step }}
+{% endfor %}
+
+{% endfor %}
+{% if groups %}
+## Failures Requiring Further Analysis
+
+{% for group in groups %}
+{% set first = group.results[0] %}
+### `{{ first.node_id }}`
+
+{% if group.results | length > 1 %}
+Same failure signature in {{ group.results | length - 1 }} other test(s): \
+{{ group.results[1:] | map(attribute="node_id") | join(", ") }}
+
+{% endif %}
+- **Error**: `{{ first.exception_type or "Error" }}: {{ first.message or "no message" }}`
+- **Signature**: `{{ group.digest }}`
+{% if first.node_id in verdicts %}
+- **Reruns**: failed all {{ verdicts[first.node_id].runs }} reruns (deterministic)
+{% endif %}
+{% if group.known %}
+- **Known failure**: analysis reused from a previous run (reused {{ group.hits }} time(s))
+{% endif %}
+
+{% if group.analysis %}
+{{ group.analysis }}
+
+{% endif %}
+{% endfor %}
+{% if analysis %}
+{{ analysis }}
+{% endif %}
+{% endif %}
+{% endif %}
+"""
+
+
+class LocalReportEngine:
+    """Generate Markdown test reports locally, without an LLM round trip.
+
+    Failures matching one of the rules are explained deterministically; the
+    others are returned separately so they can be escalated.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None) -> None:
+        self.__rules = rules if rules is not None else DEFAULT_RULES
+        environment = Environment(
+            trim_blocks=True, lstrip_blocks=True, undefined=StrictUndefined
+        )
+        self.__template = environment.from_string(REPORT_TEMPLATE)
+
+    def explain(
+        self, results: List[TestResult]
+    ) -> Tuple[List[FailureExplanation], List[TestResult]]:
+        """Split the failures into locally explained and unexplained ones.
+
+        Args:
+            results (List[TestResult]): Structured test results
+
+        Returns:
+            Tuple[List[FailureExplanation], List[TestResult]]: Explained and
+                unexplained failures
+        """
+        explained, unexplained = [], []
+        for result in results:
+            if not result.is_failure:
+                continue
+            explanation = next(
+                (e for e in (rule(result) for rule in self.__rules) if e), None
+            )
+            if explanation is None:
+                unexplained.append(result)
+            else:
+                explained.append(explanation)
+        return explained, unexplained
+
+    def render(
+        self,
+        results: List[TestResult],
+        explained: List[FailureExplanation],
+        groups: List[FailureGroup],
+        analysis: Optional[str] = None,
+        verdicts: Optional[Dict[str, RerunVerdict]] = None,
+        output: Optional[str] = None,
+    ) -> str:
+        """Render the Markdown report.
+
+        Args:
+            results (List[TestResult]): Structured test results
+            explained (List[FailureExplanation]): Locally explained failures
+            groups (List[FailureGroup]): Unexplained failures, by signature
+            analysis (str, optional): LLM analysis not attributable to a
+                single failure signature
+            verdicts (Dict[str, RerunVerdict], optional): Rerun verdicts of
+                the failures; flaky ones are listed separately
+            output (str, optional): Pytest output of a failure without any
+                failed test result
+
+        Returns:
+            str: Markdown report
+        """
+        verdicts = verdicts or {}
+        counts = summarize_outcomes(results)
+        return self.__template.render(
+            total=len(results),
+            counts=", ".join(f"{n} {outcome}" for outcome, n in sorted(counts.items())),
+            duration=sum(r.duration for r in results),
+            failures=bool(explained or groups or output),
+            explained=explained,
+            groups=groups,
+            analysis=analysis,
+            verdicts=verdicts,
+            flaky=[v for v in verdicts.values() if v.is_flaky],
+            output=output,
+        )
+
+
+def is_unreported_failure(exit_code: int, results: List[TestResult]) -> bool:
+    """Return whether Pytest failed without a failed test result to show for it.
+
+    Args:
+        exit_code (int): Pytest exit code
+        results (List[TestResult]): Structured test results
+
+    Returns:
+        bool: True if the exit code is not OK but no result failed
+    """
+    return exit_code != 0 and not any(r.is_failure for r in results)
+
+
+def _analyze_novel(
+    groups: List[FailureGroup],
+    scanner_factory: Callable[[], ReportScanner],
+    appendix: Optional[str] = None,
+) -> Optional[str]:
+    representatives = [group.results[0] for group in groups]
+    analysis = scanner_factory().analyze_failures(representatives, appendix=appendix)
+    sections = split_sections(analysis, [r.node_id for r in representatives])
+    for group, representative in zip(groups, representatives):
+        group.analysis = sections.get(representative.node_id)
+    if not sections:
+        logger.debug("LLM analysis has no per-test sections, keeping it whole")
+        return analysis
+    return None
+
+
+def generate_report(
+    results: List[TestResult],
+    shell_output: str,
+    scanner_factory: Callable[[], ReportScanner],
+    escalation: str = Escalation.UNEXPLAINED,
+    knowledge: Optional[SignatureIndex] = None,
+    verdicts: Optional[Dict[str, RerunVerdict]] = None,
+    appendix: Optional[str] = None,
+    exit_code: int = 0,
+) -> str:
+    """Generate the test report, only calling the LLM when needed.
+
+    Failures the local engine cannot explain are grouped by failure
+    signature. Signatures found in the knowledge base reuse their stored
+    analysis; only one test per novel signature is sent to the LLM, and the
+    resulting analyses are stored for later runs. Failures found flaky by
+    reruns are reported as such and never escalated. A failed exit code
+    without failed results is reported from the raw output.
+
+    Args:
+        results (List[TestResult]): Structured test results
+        shell_output (str): Raw Pytest output, used for full LLM reports
+        scanner_factory (Callable[[], ReportScanner]): Creates the LLM client
+        escalation (str, optional): One of the `Escalation` policies
+        knowledge (SignatureIndex, optional): Knowledge base of prior analyses
+        verdicts (Dict[str, RerunVerdict], optional): Rerun verdicts
+        appendix (str, optional): Markdown section appended to the report,
+            and sent along with any output or failures given to the LLM
+        exit_code (int, optional): Pytest exit code of the run
+
+    Returns:
+        str: Markdown report
+    """
+    verdicts = verdicts or {}
+    flaky = {node_id for node_id, verdict in verdicts.items() if verdict.is_flaky}
+    unreported = is_unreported_failure(exit_code, results)
+    if escalation == Escalation.ALWAYS or (
+        (not results or unreported) and escalation != Escalation.NEVER
+    ):
+        logger.debug("Generating full test report with the LLM")
+        notes = [
+            f"FLAKY {v.node_id} (passed {v.passes} of {v.runs} reruns)"
+            for v in verdicts.values()
+            if v.is_flaky
+        ]
+        test_output = "\n".join([shell_output, *notes, appendix or ""])
+        return scanner_factory().analyze_tests(test_output)
+
+    engine = LocalReportEngine()
+    with span("report.local"):
+        explained, unexplained = engine.explain(
+            [r for r in results if r.node_id not in flaky]
+        )
+    logger.info(
+        f"Explained {len(explained)} failure(s) locally, "
+        f"{len(unexplained)} without a known cause"
+    )
+
+    groups = []
+    for digest, (signature, failures) in group_by_signature(unexplained).items():
+        group = FailureGroup(digest=digest, results=failures)
+        entry = knowledge.lookup(signature) if knowledge is not None else None
+        if entry is not None:
+            group.analysis, group.known, group.hits = entry.analysis, True, entry.hits
+        groups.append(group)
+
+    analysis = None
+    novel = [group for group in groups if not group.known]
+    if novel and escalation == Escalation.UNEXPLAINED:
+        logger.info(f"Escalating {len(novel)} novel failure signature(s) to the LLM")
+        analysis = _analyze_novel(novel, scanner_factory, appendix)
+        if knowledge is not None:
+            for group in novel:
+                if group.analysis:
+                    signature = FailureSignature.from_result(group.results[0])
+                    knowledge.store(signature, group.analysis, group.results[0].node_id)
+    if knowledge is not None:
+        knowledge.save()
+    output = None
+    if unreported:
+        output = "\n".join(shell_output.rstrip().splitlines()[-MAX_UNREPORTED_LINES:])
+    report = engine.render(results, explained, groups, analysis, verdicts, output)
+    return f"{report}\n{appendix}" if appendix else report
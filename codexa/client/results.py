@@ -0,0 +1,227 @@
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from _pytest.reports import CollectReport, TestReport
+
+logger = logging.getLogger(__name__)
+
+_INTERNAL_FRAME_DIRS = ("/_pytest/", "/pluggy/")
+_ERROR_LINE = re.compile(r"^E\s+(?:(?P<type>[\w.]+(?:Error|Exception|Exit))\s*:\s*)?")
+_LOCATION_LINE = re.compile(r"^(?P<path>[^\s:]+\.py):(?P<line>\d+):")
+
+# Outcome precedence when merging the setup, call and teardown phases
+_OUTCOME_RANK = {"passed": 0, "skipped": 1, "xfailed": 1, "xpassed": 2, "failed": 3}
+
+
+@dataclass(frozen=True)
+class TestResult:
+    """Outcome of a single test, merged across its setup/call/teardown phases."""
+
+    node_id: str
+    outcome: str
+    when: str = "call"
+    duration: float = 0.0
+    exception_type: Optional[str] = None
+    message: Optional[str] = None
+    longrepr: Optional[str] = None
+    frames: List[str] = field(default_factory=list)
+
+    @property
+    def is_failure(self) -> bool:
+        """Return whether the test failed or errored."""
+        return self.outcome in ("failed", "error")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TestResult":
+        """Build a result from its dictionary map structure."""
+        return cls(**data)
+
+
+def summarize_outcomes(results: List[TestResult]) -> Dict[str, int]:
+    """Count the results per outcome."""
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.outcome] = counts.get(result.outcome, 0) + 1
+    return counts
+
+
+def _first_line(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    return text.strip().splitlines()[0] if text.strip() else None
+
+
+def _frames_from_excinfo(excinfo: Any, rootpath: Path) -> List[str]:
+    frames = []
+    for entry in excinfo.traceback:
+        path = str(entry.path)
+        if any(internal in path for internal in _INTERNAL_FRAME_DIRS):
+            continue
+        try:
+            path = Path(path).relative_to(rootpath).as_posix()
+        except ValueError:
+            pass
+        frames.append(f"{path}:{entry.name}")
+    return frames
+
+
+def _outcome(report: TestReport) -> str:
+    if hasattr(report, "wasxfail"):
+        return "xfailed" if report.skipped else "xpassed"
+    if report.failed and report.when != "call":
+        return "error"
+    return report.outcome
+
+
+class ResultCollectorPlugin:
+    """Pytest plugin recording structured results for each executed test."""
+
+    def __init__(self) -> None:
+        self.__results: Dict[str, TestResult] = {}
+        self.__rootpath = Path.cwd()
+
+    @property
+    def results(self) -> List[TestResult]:
+        """Return the results in execution order."""
+        return list(self.__results.values())
+
+    @property
+    def rootpath(self) -> Path:
+        """Return the rootdir the node IDs are relative to."""
+        return self.__rootpath
+
+    def pytest_configure(self, config: pytest.Config) -> None:
+        self.__rootpath = config.rootpath
+
+    def pytest_collectreport(self, report: CollectReport) -> None:
+        if report.failed:
+            message = _first_line(report.longreprtext)
+            self.__results[report.nodeid] = TestResult(
+                node_id=report.nodeid,
+                outcome="error",
+                when="collect",
+                message=message,
+                exception_type=_exception_type_from_text(report.longreprtext),
+                longrepr=report.longreprtext,
+            )
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item: pytest.Item, call: pytest.CallInfo):
+        report = yield
+        current = self.__results.get(item.nodeid)
+        outcome = _outcome(report)
+        merged = TestResult(
+            node_id=item.nodeid,
+            outcome=outcome,
+            when=report.when,
+            duration=(current.duration if current else 0.0) + report.duration,
+        )
+        if current is not None and _rank(current.outcome) >= _rank(outcome):
+            merged = replace(current, duration=merged.duration)
+        elif report.failed and call.excinfo is not None:
+            crash = getattr(report.longrepr, "reprcrash", None)
+            message = getattr(report.longrepr, "errorstring", None) or (
+                crash.message if crash is not None else call.excinfo.exconly()
+            )
+            merged = replace(
+                merged,
+                exception_type=call.excinfo.typename,
+                message=_first_line(message),
+                longrepr=report.longreprtext,
+                frames=_frames_from_excinfo(call.excinfo, self.__rootpath),
+            )
+        self.__results[item.nodeid] = merged
+        return report
+
+
+def _rank(outcome: str) -> int:
+    return 3 if outcome == "error" else _OUTCOME_RANK.get(outcome, 0)
+
+
+def _exception_type_from_text(text: Optional[str]) -> Optional[str]:
+    for line in (text or "").splitlines():
+        match = _ERROR_LINE.match(line)
+        if match and match.group("type"):
+            return match.group("type").rsplit(".", 1)[-1]
+    for line in reversed((text or "").splitlines()):
+        match = _LOCATION_LINE.match(line)
+        if match:
+            tail = line[match.end() :].strip()
+            return tail or None
+    return None
+
+
+def _frames_from_text(text: Optional[str]) -> List[str]:
+    frames = []
+    for line in (text or "").splitlines():
+        match = _LOCATION_LINE.match(line)
+        if match:
+            frames.append(match.group("path"))
+    return frames
+
+
+def parse_junit_xml(text: str) -> List[TestResult]:
+    """Parse a Pytest JUnit XML report into test results.
+
+    Used for runs outside the current process, where the collector plugin
+    cannot be attached. Exception types and frames are recovered from the
+    failure text on a best-effort basis.
+
+    Args:
+        text (str): JUnit XML document
+
+    Returns:
+        List[TestResult]: Parsed results
+    """
+    results = []
+    for case in ET.fromstring(text).iter("testcase"):
+        classname = case.get("classname", "")
+        name = case.get("name", "")
+        file = case.get("file")
+        if file:
+            module_parts = classname.split(".")
+            depth = len(Path(file).with_suffix("").parts)
+            node_id = "::".join([file, *module_parts[depth:], name])
+        else:
+            parts = classname.split(".")
+            split = next(
+                (i for i, part in enumerate(parts) if part[:1].isupper()), len(parts)
+            )
+            module = "/".join(parts[:split]) + ".py"
+            node_id = "::".join([module, *parts[split:], name])
+        outcome, when, detail = "passed", "call", None
+        for tag, tag_outcome in (("failure", "failed"), ("error", "error")):
+            element = case.find(tag)
+            if element is not None:
+                outcome, detail = tag_outcome, element
+                when = "setup" if tag == "error" else "call"
+                break
+        skipped = case.find("skipped")
+        if detail is None and skipped is not None:
+            is_xfail = skipped.get("type") == "pytest.xfail"
+            outcome = "xfailed" if is_xfail else "skipped"
+        longrepr = detail.text if detail is not None else None
+        results.append(
+            TestResult(
+                node_id=node_id,
+                outcome=outcome,
+                when=when,
+                duration=float(case.get("time", 0.0)),
+                exception_type=_exception_type_from_text(longrepr),
+                message=(
+                    _first_line(detail.get("message")) if detail is not None else None
+                ),
+                longrepr=longrepr,
+                frames=_frames_from_text(longrepr),
+            )
+        )
+    return results
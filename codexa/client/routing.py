@@ -0,0 +1,201 @@
+import json
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from codexa.client.knowledge import group_by_signature
+from codexa.client.results import TestResult
+from codexa.client.tokens import estimate_tokens
+from codexa.core.env import get_codexa_home
+
+logger = logging.getLogger(__name__)
+
+_FAILED_LINE = re.compile(r"^(?:FAILED|ERROR) \S+", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class InputProfile:
+    """Size and complexity of an LLM request input."""
+
+    tokens: int
+    failure_clusters: int = 0
+    files_touched: int = 0
+    diff_lines: int = 0
+
+    @classmethod
+    def from_test_output(cls, test_output: str) -> "InputProfile":
+        """Profile raw Pytest output, counting each failing test as a cluster."""
+        return cls(
+            tokens=estimate_tokens(test_output),
+            failure_clusters=len(_FAILED_LINE.findall(test_output)),
+        )
+
+    @classmethod
+    def from_failures(cls, failures: List[TestResult], message: str) -> "InputProfile":
+        """Profile structured failures, clustered by failure signature."""
+        return cls(
+            tokens=estimate_tokens(message),
+            failure_clusters=len(group_by_signature(failures)),
+        )
+
+    @classmethod
+    def from_diff(cls, diff: str) -> "InputProfile":
+        """Profile a unified diff by files touched and changed lines."""
+        lines = diff.splitlines()
+        return cls(
+            tokens=estimate_tokens(diff),
+            files_touched=sum(1 for line in lines if line.startswith("diff --git")),
+            diff_lines=sum(
+                1
+                for line in lines
+                if line[:1] in ("+", "-") and line[:3] not in ("+++", "---")
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class RoutingDecision:
+    """Model chosen for a request, and why."""
+
+    model: str
+    tier: str
+    reason: str
+    profile: InputProfile
+
+
+@dataclass(frozen=True)
+class ModelRouter:
+    """Send small, simple inputs to a fast model and the rest to a large one.
+
+    Configured under `llm.routing` in .codexa.yaml. An input is simple when
+    it is within every threshold; the large model defaults to the accessor's
+    own model.
+    """
+
+    fast_model: str
+    large_model: Optional[str] = None
+    max_tokens: int = 2000
+    max_failure_clusters: int = 2
+    max_files_touched: int = 3
+    max_diff_lines: int = 150
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ModelRouter"]:
+        """Build the router from the `llm.routing` configuration section.
+
+        Args:
+            config (Dict[str, Any]): Codexa configuration
+
+        Returns:
+            Optional[ModelRouter]: Router, None if routing is not configured
+        """
+        section = (config.get("llm", {}) or {}).get("routing", {}) or {}
+        if not section.get("fast_model"):
+            return None
+        return cls(
+            **{k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        )
+
+    def route(self, profile: InputProfile, default_model: str) -> RoutingDecision:
+        """Choose the model for an input.
+
+        Args:
+            profile (InputProfile): Input size and complexity
+            default_model (str): Model used for complex inputs if no large
+                model is configured
+
+        Returns:
+            RoutingDecision: Chosen model and the reason for the choice
+        """
+        limits = [
+            ("tokens", profile.tokens, self.max_tokens),
+            ("failure clusters", profile.failure_clusters, self.max_failure_clusters),
+            ("files touched", profile.files_touched, self.max_files_touched),
+            ("diff lines", profile.diff_lines, self.max_diff_lines),
+        ]
+        exceeded = [
+            f"{name} {value} > {limit}"
+            for name, value, limit in limits
+            if value > limit
+        ]
+        if exceeded:
+            return RoutingDecision(
+                model=self.large_model or default_model,
+                tier="large",
+                reason=", ".join(exceeded),
+                profile=profile,
+            )
+        return RoutingDecision(
+            model=self.fast_model,
+            tier="fast",
+            reason="within all thresholds",
+            profile=profile,
+        )
+
+
+@dataclass(frozen=True)
+class RoutingRecord:
+    """Routing decision with its measured outcome."""
+
+    model: str
+    tier: str
+    reason: str
+    tokens: int
+    failure_clusters: int
+    files_touched: int
+    diff_lines: int
+    latency_s: float
+    ok: bool
+    command: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+
+def get_routing_log() -> Path:
+    """Get the file recording routing decisions."""
+    return get_codexa_home() / "routing.jsonl"
+
+
+def log_decision(
+    decision: RoutingDecision,
+    latency_s: float,
+    ok: bool,
+    command: Optional[str] = None,
+    path: Optional[Path] = None,
+) -> RoutingRecord:
+    """Append a routing decision and its latency to the routing log.
+
+    Args:
+        decision (RoutingDecision): Routing decision
+        latency_s (float): Measured request latency (s)
+        ok (bool): Whether the request succeeded
+        command (str, optional): CLI command that made the request
+        path (Path, optional): Log file, defaults to the routing log
+
+    Returns:
+        RoutingRecord: Logged record
+    """
+    record = RoutingRecord(
+        model=decision.model,
+        tier=decision.tier,
+        reason=decision.reason,
+        latency_s=latency_s,
+        ok=ok,
+        command=command,
+        **asdict(decision.profile),
+    )
+    logger.info(
+        f"Routed request to {decision.model} ({decision.tier}: {decision.reason}), "
+        f"took {latency_s:.2f}s"
+    )
+    path = path or get_routing_log()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record.to_dict()) + "\n")
+    return record
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from codexa.client.flakiness import RerunVerdict
+from codexa.client.results import TestResult
+from codexa.core.env import get_codexa_home
+from codexa.core.errors import CodexaInputError
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 2
+DEFAULT_DURATION_S = 1.0
+SUMMARY_LINES = 20
+
+_SHARD_SPEC = re.compile(r"^(?P<index>\d+)/(?P<total>\d+)$")
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse a 1-based `i/n` shard specification.
+
+    Args:
+        spec (str): Shard specification, e.g. "2/4"
+
+    Raises:
+        CodexaInputError: If the specification is malformed or out of range
+
+    Returns:
+        Tuple[int, int]: Shard index and total number of shards
+    """
+    match = _SHARD_SPEC.match(spec.strip())
+    if match is None:
+        raise CodexaInputError(
+            message=f"Invalid shard specification: {spec}",
+            help_text="Use the form i/n, e.g. --shard 2/4",
+        )
+    index, total = int(match.group("index")), int(match.group("total"))
+    if not 1 <= index <= total:
+        raise CodexaInputError(
+            message=f"Shard index must be between 1 and {total}, got {index}",
+        )
+    return index, total
+
+
+def get_durations_file() -> Path:
+    """Get the file holding the recorded test durations."""
+    return get_codexa_home() / "durations.json"
+
+
+def load_durations(path: Optional[Path] = None) -> Dict[str, float]:
+    """Load the recorded duration (s) of each test node ID."""
+    path = path or get_durations_file()
+    if not path.is_file():
+        return {}
+    try:
+        return {k: float(v) for k, v in json.loads(path.read_text()).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable durations file {path}: {e}")
+        return {}
+
+
+def record_durations(results: List[TestResult], path: Optional[Path] = None) -> None:
+    """Store the durations of the given results, keeping the other tests'.
+
+    Args:
+        results (List[TestResult]): Structured test results
+        path (Path, optional): Durations file, defaults to the Codexa home one
+    """
+    measured = {r.node_id: r.duration for r in results if r.when != "collect"}
+    if not measured:
+        return
+    path = path or get_durations_file()
+    durations = {**load_durations(path), **measured}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(durations, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def partition(
+    node_ids: List[str], total: int, durations: Optional[Dict[str, float]] = None
+) -> List[List[str]]:
+    """Split node IDs into shards of balanced expected duration.
+
+    Tests are assigned longest first to the currently lightest shard. Tests
+    without a recorded duration count as the median recorded one. The result
+    only depends on the node IDs and durations, so every CI node computes the
+    same partition; each shard keeps the collection order.
+
+    Args:
+        node_ids (List[str]): Collected node IDs
+        total (int): Number of shards
+        durations (Dict[str, float], optional): Recorded durations (s)
+
+    Returns:
+        List[List[str]]: Node IDs of each shard
+    """
+    durations = durations or {}
+    known = [durations[n] for n in node_ids if n in durations]
+    fallback = statistics.median(known) if known else DEFAULT_DURATION_S
+    expected = {n: durations.get(n, fallback) for n in node_ids}
+
+    loads = [0.0] * total
+    assigned: Dict[str, int] = {}
+    for node_id in sorted(set(node_ids), key=lambda n: (-expected[n], n)):
+        shard = min(range(total), key=lambda i: (loads[i], i))
+        loads[shard] += expected[node_id]
+        assigned[node_id] = shard
+
+    shards: List[List[str]] = [[] for _ in range(total)]
+    for node_id in node_ids:
+        shards[assigned[node_id]].append(node_id)
+    return shards
+
+
+def partition_digest(node_ids: List[str], durations: Dict[str, float]) -> str:
+    """Hash everything a partition depends on.
+
+    Shards computed from the same digest are guaranteed to be disjoint and to
+    cover the whole suite, so 'codexa merge' compares them before combining.
+
+    Args:
+        node_ids (List[str]): Collected node IDs
+        durations (Dict[str, float]): Recorded durations (s)
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    relevant = {n: durations[n] for n in sorted(set(node_ids)) if n in durations}
+    payload = json.dumps(
+        {"node_ids": node_ids, "durations": relevant},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _summary(shell_output: str) -> str:
+    # Keep the short test summary and the final counts line only
+    lines = shell_output.rstrip().splitlines()
+    return "\n".join(lines[-SUMMARY_LINES:])
+
+
+@dataclass
+class ShardArtifact:
+    """Compact structured result of a single shard run."""
+
+    index: int
+    total: int
+    exit_code: int
+    results: List[TestResult] = field(default_factory=list)
+    summary: str = ""
+    verdicts: Dict[str, RerunVerdict] = field(default_factory=dict)
+    digest: str = ""
+    node_ids: List[str] = field(default_factory=list)
+    collected: int = 0
+
+    @classmethod
+    def from_run(
+        cls,
+        index: int,
+        total: int,
+        exit_code: int,
+        results: List[TestResult],
+        shell_output: str,
+        verdicts: Optional[Dict[str, RerunVerdict]] = None,
+        digest: str = "",
+        node_ids: Optional[List[str]] = None,
+        collected: int = 0,
+    ) -> "ShardArtifact":
+        """Build the artifact of a finished shard run."""
+        return cls(
+            index,
+            total,
+            int(exit_code),
+            results,
+            _summary(shell_output),
+            verdicts or {},
+            digest,
+            node_ids or [],
+            collected,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return {
+            "version": ARTIFACT_VERSION,
+            "index": self.index,
+            "total": self.total,
+            "exit_code": self.exit_code,
+            "digest": self.digest,
+            "node_ids": self.node_ids,
+            "collected": self.collected,
+            "summary": self.summary,
+            "results": [r.to_dict() for r in self.results],
+            "verdicts": [asdict(v) for v in self.verdicts.values()],
+        }
+
+    def write(self, path: Path) -> None:
+        """Write the artifact as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: Path) -> "ShardArtifact":
+        """Load an artifact written by `codexa run --shard`.
+
+        Raises:
+            CodexaInputError: If the file is not a valid shard artifact
+        """
+        try:
+            data = json.loads(path.read_text())
+            if data.get("version") != ARTIFACT_VERSION:
+                raise ValueError(f"unsupported version {data.get('version')}")
+            return cls(
+                index=data["index"],
+                total=data["total"],
+                exit_code=data["exit_code"],
+                results=[TestResult.from_dict(r) for r in data["results"]],
+                summary=data.get("summary", ""),
+                verdicts={
+                    v["node_id"]: RerunVerdict(**v) for v in data.get("verdicts", [])
+                },
+                digest=data["digest"],
+                node_ids=list(data["node_ids"]),
+                collected=data["collected"],
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise CodexaInputError(
+                message=f"Invalid shard artifact {path}: {e}",
+                help_text="Pass the files written by 'codexa run --shard'",
+            )
+
+
+def merge_artifacts(
+    artifacts: List[ShardArtifact],
+) -> Tuple[List[TestResult], str, Dict[str, RerunVerdict]]:
+    """Combine shard artifacts into the results of the whole suite.
+
+    Args:
+        artifacts (List[ShardArtifact]): Artifacts of one sharded pipeline
+
+    Raises:
+        CodexaInputError: If the artifacts belong to different shardings,
+            a shard is missing or given twice, or the shards do not cover
+            the collected tests exactly once
+
+    Returns:
+        Tuple[List[TestResult], str, Dict[str, RerunVerdict]]: Merged results,
+            shard summaries and rerun verdicts
+    """
+    totals = {a.total for a in artifacts}
+    if len(totals) != 1:
+        raise CodexaInputError(
+            message=f"Shard artifacts disagree on the shard count: {sorted(totals)}",
+        )
+    indexes = [a.index for a in artifacts]
+    duplicates = sorted({i for i in indexes if indexes.count(i) > 1})
+    if duplicates:
+        raise CodexaInputError(message=f"Shards given more than once: {duplicates}")
+    digests = {a.digest for a in artifacts}
+    if len(digests) != 1:
+        raise CodexaInputError(
+            message="Shard artifacts were partitioned from different inputs",
+            help_text="Run every shard on the same commit with the same --durations",
+        )
+    total = totals.pop()
+    missing = sorted(set(range(1, total + 1)) - set(indexes))
+    if missing:
+        raise CodexaInputError(message=f"Missing the artifacts of shard(s) {missing}")
+    assigned = [n for a in artifacts for n in a.node_ids]
+    collected = {a.collected for a in artifacts}
+    if len(set(assigned)) != len(assigned) or collected != {len(assigned)}:
+        raise CodexaInputError(
+            message=(
+                f"Shards cover {len(set(assigned))} of {max(collected)} collected "
+                f"tests, {len(assigned) - len(set(assigned))} more than once"
+            ),
+        )
+
+    results, summaries, verdicts = [], [], {}
+    for artifact in sorted(artifacts, key=lambda a: a.index):
+        results.extend(artifact.results)
+        verdicts.update(artifact.verdicts)
+        summaries.append(
+            f"Shard {artifact.index}/{total} (exit code {artifact.exit_code}):\n"
+            f"{artifact.summary}"
+        )
+    return results, "\n\n".join(summaries), verdicts
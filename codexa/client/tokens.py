@@ -0,0 +1,88 @@
+import math
+from typing import Dict, Iterable, Optional
+
+# Average characters per token of English text and code for BPE tokenizers
+CHARS_PER_TOKEN = 4.0
+# Share of the estimated budget actually used, absorbing estimation error
+# on symbol-heavy text such as tracebacks and diffs
+SAFETY_MARGIN = 0.85
+# Tokens kept free in the context window for the model's response
+RESPONSE_TOKENS = 4096
+# Used for models missing from the table, small enough for most providers
+DEFAULT_CONTEXT_WINDOW = 32768
+
+# Context window (tokens); override or extend with `llm.context_windows` in
+# .codexa.yaml. Variants such as ":free" share the window of their model.
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "deepseek/deepseek-r1": 163840,
+    "deepseek/deepseek-chat": 131072,
+    "openai/gpt-4o": 128000,
+    "openai/gpt-4o-mini": 128000,
+    "openai/gpt-4.1": 1047576,
+    "openai/gpt-4.1-mini": 1047576,
+    "anthropic/claude-3.5-sonnet": 200000,
+    "anthropic/claude-3.5-haiku": 200000,
+    "google/gemini-2.0-flash-001": 1048576,
+    "meta-llama/llama-3.3-70b-instruct": 131072,
+    "qwen/qwen-2.5-coder-32b-instruct": 32768,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text without a tokenizer.
+
+    Args:
+        text (str): Prompt or response text
+
+    Returns:
+        int: Approximate token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def context_window(model: str, overrides: Optional[Dict[str, int]] = None) -> int:
+    """Get the context window of a model.
+
+    The model is looked up with and without its variant suffix, then without
+    its provider prefix, in the configured overrides and the built-in table.
+
+    Args:
+        model (str): Model identifier, e.g. "deepseek/deepseek-r1:free"
+        overrides (Dict[str, int], optional): Configured context windows
+
+    Returns:
+        int: Context window (tokens)
+    """
+    windows = {**CONTEXT_WINDOWS, **(overrides or {})}
+    base = model.split(":", 1)[0]
+    for name in (model, base):
+        if name in windows:
+            return int(windows[name])
+    short = base.rsplit("/", 1)[-1]
+    for name, window in windows.items():
+        if name.rsplit("/", 1)[-1] == short:
+            return int(window)
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def prompt_budget(
+    models: Iterable[str],
+    system_prompt: str = "",
+    overrides: Optional[Dict[str, int]] = None,
+) -> int:
+    """Get the tokens a user message may use with every given model.
+
+    Args:
+        models (Iterable[str]): Models the request may be sent to
+        system_prompt (str, optional): System prompt sent with the message
+        overrides (Dict[str, int], optional): Configured context windows
+
+    Returns:
+        int: Message budget (tokens)
+    """
+    window = min(
+        (context_window(m, overrides) for m in models),
+        default=DEFAULT_CONTEXT_WINDOW,
+    )
+    available = window - RESPONSE_TOKENS - estimate_tokens(system_prompt)
+    return max(int(available * SAFETY_MARGIN), 0)
@@ -0,0 +1,111 @@
+import importlib.util
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from codexa.core.config import load_config
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool settings shared by all LLM clients.
+
+    Configurable under the `http` section of .codexa.yaml. HTTP/2 is enabled
+    automatically when the optional `h2` package is installed, unless set
+    explicitly.
+    """
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    http2: Optional[bool] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PoolSettings":
+        """Build the settings from the `http` configuration section."""
+        section = config.get("http", {}) or {}
+        return cls(
+            **{k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        )
+
+    @property
+    def use_http2(self) -> bool:
+        """Return whether to negotiate HTTP/2."""
+        available = importlib.util.find_spec("h2") is not None
+        if self.http2 and not available:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed")
+        return available if self.http2 is None else bool(self.http2) and available
+
+    @property
+    def limits(self) -> httpx.Limits:
+        """Return the equivalent httpx pool limits."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class ClientRegistry:
+    """Process-wide registry of OpenAI clients keyed by (base_url, api_key).
+
+    Accessors sharing an endpoint and key share a single client, and thereby
+    its HTTP connection pool, so repeated requests reuse open TLS connections.
+    """
+
+    def __init__(self, settings: Optional[PoolSettings] = None) -> None:
+        self.__settings = settings
+        self.__clients: Dict[ClientKey, OpenAI] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def settings(self) -> PoolSettings:
+        """Return the pool settings, loading them from configuration once."""
+        if self.__settings is None:
+            self.__settings = PoolSettings.from_config(load_config())
+        return self.__settings
+
+    def get(self, base_url: str, api_key: str) -> OpenAI:
+        """Return the shared synchronous client for an endpoint."""
+        with self.__lock:
+            client = self.__clients.get((base_url, api_key))
+            if client is None:
+                settings = self.settings
+                logger.debug(f"Creating pooled LLM client for {base_url}")
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=DefaultHttpxClient(
+                        limits=settings.limits, http2=settings.use_http2
+                    ),
+                )
+                self.__clients[(base_url, api_key)] = client
+            return client
+
+    def close(self) -> None:
+        """Close all clients and their connection pools."""
+        with self.__lock:
+            clients, self.__clients = self.__clients, {}
+        for client in clients.values():
+            client.close()
+
+
+REGISTRY = ClientRegistry()
+
+
+def get_client(base_url: str, api_key: str) -> OpenAI:
+    """Return the shared synchronous client for an endpoint."""
+    return REGISTRY.get(base_url, api_key)
+
+
+def close_clients() -> None:
+    """Close every pooled client; called when the CLI exits."""
+    REGISTRY.close()
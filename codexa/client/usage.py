@@ -0,0 +1,251 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from codexa.core.constants import Environment
+from codexa.core.env import get_codexa_home
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens; override or extend with `usage.prices` in .codexa.yaml
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "deepseek/deepseek-r1:free": {"prompt": 0.0, "completion": 0.0},
+    "deepseek/deepseek-r1": {"prompt": 0.40, "completion": 2.00},
+    "openai/gpt-4o": {"prompt": 2.50, "completion": 10.00, "cached_prompt": 1.25},
+    "openai/gpt-4o-mini": {"prompt": 0.15, "completion": 0.60, "cached_prompt": 0.075},
+}
+
+
+def _token_count(source: Any, attribute: str) -> int:
+    value = getattr(source, attribute, None)
+    return value if isinstance(value, int) else 0
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    """Token usage and latency of a single LLM request."""
+
+    model: str
+    latency_s: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0
+    cached_tokens: int = 0
+    ttft_s: Optional[float] = None
+    streamed: bool = False
+    command: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+    # "ok", "error" or "cancelled" for hedged attempts that lost the race
+    status: str = "ok"
+
+    @property
+    def cache_hit(self) -> bool:
+        """Return whether the provider served part of the prompt from cache."""
+        return self.cached_tokens > 0
+
+    @classmethod
+    def from_usage(cls, usage: Any, **kwargs: Any) -> "UsageRecord":
+        """Build a record from an OpenAI `CompletionUsage` object."""
+        prompt_details = getattr(usage, "prompt_tokens_details", None)
+        completion_details = getattr(usage, "completion_tokens_details", None)
+        return cls(
+            prompt_tokens=_token_count(usage, "prompt_tokens"),
+            completion_tokens=_token_count(usage, "completion_tokens"),
+            reasoning_tokens=_token_count(completion_details, "reasoning_tokens"),
+            cached_tokens=_token_count(prompt_details, "cached_tokens"),
+            **kwargs,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return {**asdict(self), "cache_hit": self.cache_hit}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UsageRecord":
+        """Build a record from its dictionary map structure."""
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in fields})
+
+
+def get_metrics_file() -> Path:
+    """Get the usage metrics file, overridable with CODEXA_METRICS_FILE."""
+    configured = os.environ.get(Environment.METRICS_FILE, None)
+    return Path(configured) if configured else get_codexa_home() / "usage.jsonl"
+
+
+# Records and command of the request captured in the current context
+_CAPTURE: ContextVar[Optional[Tuple[List[UsageRecord], Optional[str]]]] = ContextVar(
+    "codexa_usage_capture", default=None
+)
+
+
+class UsageTracker:
+    """Collects the usage records of the current command invocation.
+
+    Work done on behalf of another process, such as a daemon request, can be
+    captured instead: its records are tagged with the caller's command and
+    kept apart from the pending ones, to be handed back to the caller.
+    """
+
+    def __init__(self) -> None:
+        self.__records: List[UsageRecord] = []
+        self.__lock = threading.Lock()
+        self.__command: Optional[str] = None
+
+    @property
+    def command(self) -> Optional[str]:
+        """Return the command the current records are attributed to."""
+        captured = _CAPTURE.get()
+        return captured[1] if captured is not None else self.__command
+
+    @command.setter
+    def command(self, command: Optional[str]) -> None:
+        self.__command = command
+
+    @contextmanager
+    def capture(self, command: Optional[str] = None) -> Iterator[List[UsageRecord]]:
+        """Collect the records made in the current context into a list.
+
+        Threads must be started with a copy of the context to be captured.
+
+        Args:
+            command (str, optional): Command the records are attributed to
+
+        Yields:
+            List[UsageRecord]: Records captured so far
+        """
+        records: List[UsageRecord] = []
+        token = _CAPTURE.set((records, command))
+        try:
+            yield records
+        finally:
+            _CAPTURE.reset(token)
+
+    @property
+    def records(self) -> List[UsageRecord]:
+        """Return a copy of the pending records."""
+        with self.__lock:
+            return list(self.__records)
+
+    def record(self, record: UsageRecord) -> None:
+        """Add a request record, tagging it with the current command."""
+        if record.command is None and self.command is not None:
+            record = replace(record, command=self.command)
+        logger.debug(
+            f"LLM usage [{record.model}]: {record.prompt_tokens} prompt, "
+            f"{record.completion_tokens} completion tokens in {record.latency_s:.2f}s"
+        )
+        captured = _CAPTURE.get()
+        with self.__lock:
+            (captured[0] if captured is not None else self.__records).append(record)
+
+    def flush(self, path: Optional[Path] = None) -> int:
+        """Append the pending records to the metrics file.
+
+        Args:
+            path (Path, optional): Metrics file, defaults to the configured one
+
+        Returns:
+            int: Number of records written
+        """
+        with self.__lock:
+            pending, self.__records = self.__records, []
+        if not pending:
+            return 0
+        path = path or get_metrics_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            for record in pending:
+                f.write(json.dumps(record.to_dict()) + "\n")
+        logger.debug(f"Wrote {len(pending)} usage record(s) to {path}")
+        return len(pending)
+
+
+USAGE = UsageTracker()
+
+
+def load_records(path: Optional[Path] = None) -> List[UsageRecord]:
+    """Load all usage records from the metrics file, skipping corrupt lines."""
+    path = path or get_metrics_file()
+    if not path.is_file():
+        return []
+    records = []
+    for line in path.read_text().splitlines():
+        try:
+            records.append(UsageRecord.from_dict(json.loads(line)))
+        except (ValueError, TypeError):
+            logger.debug(f"Skipping malformed usage record: {line!r}")
+    return records
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Compute a nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def estimate_cost(record: UsageRecord, prices: Dict[str, Dict[str, float]]) -> float:
+    """Estimate the USD cost of a request, zero for models without a price."""
+    price = prices.get(record.model)
+    if price is None:
+        return 0.0
+    cached_price = price.get("cached_prompt", price.get("prompt", 0.0))
+    uncached = record.prompt_tokens - record.cached_tokens
+    return (
+        uncached * price.get("prompt", 0.0)
+        + record.cached_tokens * cached_price
+        + record.completion_tokens * price.get("completion", 0.0)
+    ) / 1_000_000
+
+
+def summarize(
+    records: Iterable[UsageRecord], prices: Dict[str, Dict[str, float]]
+) -> List[Dict[str, Any]]:
+    """Aggregate usage records per command and model.
+
+    Args:
+        records (Iterable[UsageRecord]): Records to aggregate
+        prices (Dict[str, Dict[str, float]]): USD per million tokens, by model
+
+    Returns:
+        List[Dict[str, Any]]: One summary row per (command, model) pair
+    """
+    groups: Dict[tuple, List[UsageRecord]] = defaultdict(list)
+    for record in records:
+        groups[(record.command or "-", record.model)].append(record)
+
+    rows = []
+    for (command, model), group in sorted(groups.items()):
+        latencies = [r.latency_s for r in group]
+        ttfts = [r.ttft_s for r in group if r.ttft_s is not None]
+        rows.append(
+            {
+                "command": command,
+                "model": model,
+                "requests": len(group),
+                "errors": sum(r.status == "error" for r in group),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "latency_p99": percentile(latencies, 99),
+                "ttft_p50": percentile(ttfts, 50),
+                "ttft_p95": percentile(ttfts, 95),
+                "prompt_tokens": sum(r.prompt_tokens for r in group),
+                "completion_tokens": sum(r.completion_tokens for r in group),
+                "reasoning_tokens": sum(r.reasoning_tokens for r in group),
+                "cache_hit_rate": sum(r.cache_hit for r in group) / len(group),
+                "cost_usd": sum(estimate_cost(r, prices) for r in group),
+            }
+        )
+    return rows
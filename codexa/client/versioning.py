@@ -1,35 +1,312 @@
+import hashlib
+import json
 import logging
 import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from git import Repo
 
+from codexa.core.env import get_codexa_home
 from codexa.core.errors import CodexaRuntimeError
+from codexa.core.profiling import span
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_REMOTE_REF = "origin/main"
+MAX_GIT_WORKERS = 8
+MAX_CACHED_DIFFS = 256
+DIFF_CACHE_VERSION = 2
+# Options making `git diff` output independent of the user's configuration
+_DIFF_OPTIONS = (
+    "--no-color",
+    "--no-ext-diff",
+    "--find-renames",
+    "--src-prefix=a/",
+    "--dst-prefix=b/",
+)
 
-def compare_git_diff(remote_ref: str, repo_path: str = os.getcwd()) -> str:
-    """
-    Get the diff between the current working tree and a remote branch using GitPython.
+# (path, patch) of each changed file
+FilePatch = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class RefDiff:
+    """Changes of HEAD relative to its merge-base with a reference."""
+
+    ref: str
+    merge_base: str
+    files: List[str] = field(default_factory=list)
+    diff: str = ""
+    pathspec: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+    @property
+    def line_counts(self) -> Tuple[int, int]:
+        """Return the number of added and removed lines."""
+        added = removed = 0
+        for line in self.diff.splitlines():
+            if line.startswith("+") and not line.startswith("+++"):
+                added += 1
+            elif line.startswith("-") and not line.startswith("---"):
+                removed += 1
+        return added, removed
+
+
+def open_repository(path: str) -> Repo:
+    """Open the repository containing a path, which may be a subdirectory."""
+    return Repo(path, search_parent_directories=True)
+
+
+def get_pathspec(repo: Repo, path: str) -> str:
+    """Get a path relative to the repository root, empty for the root itself.
 
     Args:
-        repo_path (str): Path to the Git repository.
-        remote_ref (str): Remote branch to diff against (e.g. 'origin/main').
+        repo (Repo): Repository containing the path
+        path (str): Directory inside the working tree
 
     Returns:
-        Optional[str]: The unified diff output as a string, or None on failure.
+        str: POSIX-style pathspec limiting a diff to the directory
     """
-    try:
-        repo = Repo(repo_path)
-        if repo.bare:
-            logger.warning(f"No changes detected in the repository: {repo_path}")
-            return ""
-
-        repo.remotes.origin.fetch()
-        head_commit = repo.head.commit
-        remote_commit = repo.commit(remote_ref)
-
-        diff_index = head_commit.diff(remote_commit, create_patch=True)
-        return "\n".join(str(d.diff) for d in diff_index if d.diff)
-    except Exception as e:
-        raise CodexaRuntimeError(f"Failed to get git diff: {e}")
+    if repo.working_tree_dir is None:
+        return ""
+    relative = os.path.relpath(
+        os.path.realpath(path), os.path.realpath(repo.working_tree_dir)
+    )
+    if relative == "." or relative.startswith(".."):
+        return ""
+    return Path(relative).as_posix()
+
+
+class DiffCache:
+    """Persistent store of file patches, keyed by what determines a diff.
+
+    A diff of HEAD since a merge-base, limited to a pathspec, only depends on
+    the merge-base commit, the HEAD tree and the pathspec, so an entry never
+    needs invalidating; the least recently written entries are pruned.
+    """
+
+    def __init__(
+        self, directory: Optional[Path] = None, max_entries: int = MAX_CACHED_DIFFS
+    ) -> None:
+        self.__directory = directory or get_codexa_home() / "diff-cache"
+        self.__max_entries = max_entries
+
+    def __path(self, merge_base: str, tree: str, pathspec: str) -> Path:
+        key = hashlib.sha256(
+            f"{DIFF_CACHE_VERSION}\0{merge_base}\0{tree}\0{pathspec}".encode()
+        ).hexdigest()
+        return self.__directory / f"{key}.json"
+
+    def get(
+        self, merge_base: str, tree: str, pathspec: str
+    ) -> Optional[List[FilePatch]]:
+        """Get the cached patches of a diff.
+
+        Args:
+            merge_base (str): Merge-base commit SHA
+            tree (str): HEAD tree SHA
+            pathspec (str): Pathspec the diff is limited to
+
+        Returns:
+            Optional[List[FilePatch]]: Path and patch of each file, None on a miss
+        """
+        path = self.__path(merge_base, tree, pathspec)
+        try:
+            entry = json.loads(path.read_text())
+            if (entry["merge_base"], entry["tree"], entry["pathspec"]) != (
+                merge_base,
+                tree,
+                pathspec,
+            ):
+                return None
+            return [(name, patch) for name, patch in entry["patches"]]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable diff cache entry {path}: {e}")
+            return None
+
+    def put(
+        self, merge_base: str, tree: str, pathspec: str, patches: List[FilePatch]
+    ) -> None:
+        """Store the patches of a diff, pruning the oldest entries.
+
+        Args:
+            merge_base (str): Merge-base commit SHA
+            tree (str): HEAD tree SHA
+            pathspec (str): Pathspec the diff is limited to
+            patches (List[FilePatch]): Path and patch of each file
+        """
+        entry = {
+            "merge_base": merge_base,
+            "tree": tree,
+            "pathspec": pathspec,
+            "patches": patches,
+        }
+        try:
+            self.__directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.__directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self.__path(merge_base, tree, pathspec))
+            entries = sorted(
+                self.__directory.glob("*.json"), key=lambda p: p.stat().st_mtime
+            )
+            for stale in entries[: max(len(entries) - self.__max_entries, 0)]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to write diff cache entry: {e}")
+
+
+class DiffSession:
+    """Compare HEAD against several references of one repository.
+
+    The repository is opened from any directory inside its working tree, and
+    the diffs are limited to that directory. It is fetched once per
+    comparison; merge-bases and diffs are computed concurrently by `git diff`,
+    each worker borrowing a repository handle from a pool that is kept for
+    the life of the session. Each finished diff is stored in a `DiffCache`,
+    so comparing an unchanged HEAD again reads it back instead of diffing.
+    A session runs one comparison at a time.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        repo: Optional[Repo] = None,
+        cache: Optional[DiffCache] = None,
+    ) -> None:
+        self.__repo_path = repo_path
+        self.__repo = repo
+        self.__cache = cache or DiffCache()
+        self.__handles: List[Repo] = []
+        self.__lock = threading.Lock()
+
+    @property
+    def repo(self) -> Repo:
+        """Return the repository handle of the session's own calls."""
+        if self.__repo is None:
+            self.__repo = open_repository(self.__repo_path)
+        return self.__repo
+
+    @contextmanager
+    def __handle(self) -> Iterator[Repo]:
+        # Repo objects are not thread-safe, so each worker borrows its own
+        with self.__lock:
+            repo = self.__handles.pop() if self.__handles else None
+        if repo is None:
+            repo = open_repository(self.__repo_path)
+        try:
+            yield repo
+        finally:
+            with self.__lock:
+                self.__handles.append(repo)
+
+    @property
+    def pathspec(self) -> str:
+        """Return the directory the diffs are limited to, relative to the root."""
+        return get_pathspec(self.repo, self.__repo_path)
+
+    def __merge_base(self, ref: str) -> str:
+        with self.__handle() as repo:
+            bases = repo.merge_base(repo.head.commit, ref)
+        if not bases:
+            raise CodexaRuntimeError(f"No merge-base between HEAD and {ref}")
+        return bases[0].hexsha
+
+    def __diff(self, merge_base: str, pathspec: str) -> List[FilePatch]:
+        scope = ["--", pathspec] if pathspec else []
+        with self.__handle() as repo:
+            names = repo.git.diff(
+                merge_base, "HEAD", *_DIFF_OPTIONS, "--name-only", "-z", *scope
+            )
+            output = repo.git.diff(
+                merge_base,
+                "HEAD",
+                *_DIFF_OPTIONS,
+                *scope,
+                strip_newline_in_stdout=False,
+            )
+        # One patch per file, each starting with its `diff --git` header
+        patches: List[List[str]] = []
+        for line in output.splitlines(keepends=True):
+            if line.startswith("diff --git ") or not patches:
+                patches.append([])
+            patches[-1].append(line)
+        paths = [name for name in names.split("\0") if name]
+        if len(paths) != len(patches):
+            raise CodexaRuntimeError(
+                f"Diff of {len(patches)} file(s) does not match {len(paths)} path(s)"
+            )
+        return [(path, "".join(lines)) for path, lines in zip(paths, patches)]
+
+    def compare(self, refs: Sequence[str], fetch: bool = True) -> Dict[str, RefDiff]:
+        """Compute the diff of HEAD relative to each reference.
+
+        Args:
+            refs (Sequence[str]): References to compare against
+            fetch (bool, optional): Fetch the origin remote first
+
+        Raises:
+            CodexaRuntimeError: If the repository or a reference is invalid
+
+        Returns:
+            Dict[str, RefDiff]: Diff per reference
+        """
+        try:
+            repo = self.repo
+            if repo.bare:
+                logger.warning(f"No changes detected in the repository: {repo.git_dir}")
+                return {ref: RefDiff(ref, "") for ref in refs}
+            if fetch and repo.remotes:
+                with span("git.fetch"):
+                    repo.remotes.origin.fetch()
+            for ref in refs:
+                repo.commit(ref)
+            tree = repo.head.commit.tree.hexsha
+            pathspec = self.pathspec
+
+            workers = min(MAX_GIT_WORKERS, max(len(refs), 1))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                with span("git.merge_base", refs=len(refs)):
+                    bases = dict(zip(refs, pool.map(self.__merge_base, refs)))
+                diffs: Dict[str, Optional[List[FilePatch]]] = {
+                    base: self.__cache.get(base, tree, pathspec)
+                    for base in dict.fromkeys(bases.values())
+                }
+                missing = [base for base, patches in diffs.items() if patches is None]
+                logger.debug(
+                    f"Diff cache: {len(diffs) - len(missing)} hit(s), "
+                    f"{len(missing)} miss(es) for pathspec '{pathspec}'"
+                )
+                if missing:
+                    with span("git.patch", refs=len(missing)):
+                        computed = pool.map(lambda b: self.__diff(b, pathspec), missing)
+                        patches = dict(zip(missing, computed))
+                    for base, found in patches.items():
+                        diffs[base] = found
+                        self.__cache.put(base, tree, pathspec, found)
+        except CodexaRuntimeError:
+            raise
+        except Exception as e:
+            raise CodexaRuntimeError(f"Failed to get git diff: {e}")
+
+        return {
+            ref: RefDiff(
+                ref=ref,
+                merge_base=base,
+                files=[name for name, _ in diffs[base]],
+                diff="".join(patch for _, patch in diffs[base]),
+                pathspec=pathspec,
+            )
+            for ref, base in bases.items()
+        }
@@ -1,17 +1,124 @@
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import click
 
 from codexa.client.accessor import RepoAnalyzer
-from codexa.client.versioning import compare_git_diff
+from codexa.client.daemon import DaemonClient, RemoteRepoAnalyzer
+from codexa.client.executor import TestExecutor
+from codexa.client.indexer import RepositoryIndex, changed_lines
+from codexa.client.versioning import (
+    DEFAULT_REMOTE_REF,
+    DiffSession,
+    RefDiff,
+    get_pathspec,
+    open_repository,
+)
 from codexa.core.env import load_api_key
-from codexa.core.errors import CodexaInputError, CodexaOutputError
+from codexa.core.errors import CodexaInputError
+from codexa.core.profiling import span
 
 logger = logging.getLogger(__name__)
 
+_SUMMARY_HEADING = re.compile(r"^#+\s*Summary\s*$", re.IGNORECASE)
+
+
+def _report_path(output: Path, ref: str) -> Path:
+    slug = re.sub(r"[^\w.-]+", "-", ref).strip("-")
+    return output.with_name(f"{output.stem}-{slug}{output.suffix}")
+
+
+def _summary_section(assessment: str) -> str:
+    lines, capturing = [], False
+    for line in assessment.splitlines():
+        if line.lstrip().startswith("#"):
+            if capturing:
+                break
+            capturing = bool(_SUMMARY_HEADING.match(line.strip()))
+            continue
+        if capturing:
+            lines.append(line)
+    return "\n".join(lines).strip() or "No summary provided."
+
+
+def repository_context(
+    directory: str, diffs: Dict[str, RefDiff], daemon: Optional[DaemonClient] = None
+) -> Dict[str, str]:
+    """Describe the symbols changed by each diff, from the repository index.
+
+    The index of the directory is updated incrementally first. Tests are only
+    collected again when the test files changed since the tests stored in the
+    index were linked. Files edited in the working tree are read at HEAD, the
+    revision the diffs were taken from.
+
+    Args:
+        directory (str): Directory inside the repository being compared
+        diffs (Dict[str, RefDiff]): Diff per reference
+        daemon (DaemonClient, optional): Daemon to collect tests through
+
+    Returns:
+        Dict[str, str]: Markdown context per reference
+    """
+    repo = open_repository(directory)
+    if repo.working_tree_dir is None:
+        return {ref: "" for ref in diffs}
+    index = RepositoryIndex(Path(repo.working_tree_dir))
+    scope = get_pathspec(repo, directory)
+    with span("repo.index"):
+        index.update(scope)
+    if not index.has_linked_tests(scope):
+        try:
+            with span("repo.collect"):
+                if daemon is not None:
+                    tests = daemon.collect([directory])
+                else:
+                    tests = TestExecutor([directory]).collect_metadata()
+            if tests:
+                index.link_tests(tests, scope)
+                index.save()
+        except Exception as e:
+            logger.warning(f"Linking symbols to tests by name, collection failed: {e}")
+    edited = set(repo.git.diff("HEAD", "--name-only", "-z").split("\0"))
+    diffed = {p for diff in diffs.values() for p in changed_lines(diff.diff)}
+    sources = {p: repo.git.show(f"HEAD:{p}") for p in sorted(diffed & edited)}
+    return {
+        ref: index.context_for_diff(diff.diff, sources) for ref, diff in diffs.items()
+    }
+
+
+def consolidate(
+    diffs: Dict[str, RefDiff], assessments: Dict[str, str], reports: Dict[str, Path]
+) -> str:
+    """Combine the per-ref analyses into a single Markdown summary.
+
+    Args:
+        diffs (Dict[str, RefDiff]): Diff per reference
+        assessments (Dict[str, str]): Analysis per reference
+        reports (Dict[str, Path]): Report file per reference
+
+    Returns:
+        str: Consolidated Markdown summary
+    """
+    lines = [
+        "# Comparison Summary",
+        "",
+        "| Reference | Merge-base | Files | Lines | Report |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for ref, diff in diffs.items():
+        added, removed = diff.line_counts
+        lines.append(
+            f"| `{ref}` | `{diff.merge_base[:10]}` | {len(diff.files)} "
+            f"| +{added} -{removed} | [{reports[ref].name}]({reports[ref].name}) |"
+        )
+    for ref in diffs:
+        lines += ["", f"## `{ref}`", "", _summary_section(assessments[ref])]
+    return "\n".join(lines) + "\n"
+
 
 @click.command("compare")
 @click.option(
@@ -24,12 +131,26 @@ logger = logging.getLogger(__name__)
 )
 @click.option(
     "--ref-branch",
-    "ref_branch",
+    "ref_branches",
     "-r",
     type=str,
-    required=False,
-    default="os.getcwd()",
-    help="Remote branch to compare against",
+    multiple=True,
+    default=[DEFAULT_REMOTE_REF],
+    show_default=True,
+    help="Remote branch to compare against, repeat to compare several refs",
+)
+@click.option(
+    "--fetch/--no-fetch",
+    default=True,
+    show_default=True,
+    help="Fetch the origin remote before diffing",
+)
+@click.option(
+    "--index/--no-index",
+    "use_index",
+    default=True,
+    show_default=True,
+    help="Attach the callers and tests of the changed symbols to the analysis",
 )
 @click.option(
     "--quiet",
@@ -47,28 +168,74 @@ logger = logging.getLogger(__name__)
     help="Output file with generated code",
 )
 def compare_command(
-    directory: str, ref_branch: str, quiet: bool, output: Optional[Path]
+    directory: str,
+    ref_branches: Tuple[str, ...],
+    fetch: bool,
+    use_index: bool,
+    quiet: bool,
+    output: Optional[Path],
 ) -> None:
-    """Generate smart analysis from diff comparison.."""
+    """Generate smart analysis from diff comparison.
+
+    The changed functions and classes are looked up in a local repository
+    index, and their callers and tests are sent along with the diff. The diff
+    covers the changes since the merge-base with each ref, limited
+    to the given directory when it is inside a larger repository. With several
+    refs, the diffs are computed concurrently from a single fetch, each ref
+    gets its own report next to the output file, and the output file holds a
+    consolidated summary.
+    """
     if output is not None and output.suffix != ".md":
         raise CodexaInputError(
             message=f"Output file must be a Markdown file, got {output.suffix}",
             help_text=f"Rename the output file to a {output.stem}.md",
         )
+    refs: List[str] = list(dict.fromkeys(ref_branches))
     key = load_api_key()
-    diff = compare_git_diff(ref_branch, directory)
-    logger.info("Forwarding git diff to LLM")
-    analyzer = RepoAnalyzer(key)
-    assessment = analyzer.compare_diff(diff)
+    daemon = DaemonClient.connect()
+    if daemon is not None:
+        raw = daemon.call("git_diffs", refs=refs, repo_path=directory, fetch=fetch)
+        diffs = {ref: RefDiff(**raw[ref]) for ref in refs}
+        analyzer = RemoteRepoAnalyzer(daemon, key)
+    else:
+        with span("git.diff", refs=len(refs)):
+            diffs = DiffSession(directory).compare(refs, fetch=fetch)
+        analyzer = RepoAnalyzer(key)
+
+    contexts = {ref: "" for ref in refs}
+    if use_index:
+        contexts = repository_context(directory, diffs, daemon)
+
+    logger.info(f"Forwarding {len(refs)} git diff(s) to LLM")
+    with ThreadPoolExecutor(max_workers=len(refs)) as pool:
+        results = pool.map(
+            lambda ref: analyzer.compare_diff(diffs[ref].diff, context=contexts[ref]),
+            refs,
+        )
+        assessments = dict(zip(refs, results))
 
     click.secho(
         f"[!] Recommendations for tests: {directory}",
         fg="green",
         bold=True,
     )
-    if not quiet:
-        click.echo(assessment)
+    if len(refs) == 1:
+        assessment = assessments[refs[0]]
+        if not quiet:
+            click.echo(assessment)
+        if output is not None:
+            with span("report.write", path=str(output)):
+                output.write_text(assessment)
+            logger.info(f"Diff report generated: {output.absolute()}")
+        return
 
-    if output is not None:
-        output.write_text(assessment)
-        logger.info(f"Diff report generated: {output.absolute()}")
+    output = output or Path(Path.cwd(), "report.md")
+    reports = {ref: _report_path(output, ref) for ref in refs}
+    summary = consolidate(diffs, assessments, reports)
+    if not quiet:
+        click.echo(summary)
+    with span("report.write", path=str(output), refs=len(refs)):
+        for ref, path in reports.items():
+            path.write_text(assessments[ref])
+        output.write_text(summary)
+    logger.info(f"Diff reports generated: {output.absolute()}")
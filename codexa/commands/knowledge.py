@@ -0,0 +1,70 @@
+import datetime as dt
+import logging
+from typing import Optional
+
+import click
+
+from codexa.client.knowledge import SignatureIndex
+from codexa.core.config import load_config
+from codexa.core.errors import CodexaInputError
+from codexa.core.output import print_success
+
+logger = logging.getLogger(__name__)
+
+
+def _load_index() -> SignatureIndex:
+    return SignatureIndex.from_config(load_config())
+
+
+@click.group("knowledge")
+def knowledge_command() -> None:
+    """Manage stored analyses of known failure signatures."""
+
+
+@knowledge_command.command("list")
+def list_signatures() -> None:
+    """List the known failure signatures."""
+    index = _load_index()
+    if not index.entries:
+        click.echo("No failure signatures stored yet.")
+        return
+    for entry in index.entries:
+        seen = dt.datetime.fromtimestamp(entry.last_seen).strftime("%Y-%m-%d %H:%M")
+        expired = " (expired)" if index.is_expired(entry) else ""
+        click.echo(
+            f"{entry.digest}  {entry.exception_type}: {entry.message}\n"
+            f"    example: {entry.example}, reused {entry.hits} time(s), "
+            f"last seen {seen}{expired}"
+        )
+
+
+@knowledge_command.command("invalidate")
+@click.argument("digest", required=False)
+@click.option("--all", "invalidate_all", is_flag=True, help="Remove all signatures")
+def invalidate_signatures(digest: Optional[str], invalidate_all: bool) -> None:
+    """Remove a stored failure signature, forcing a fresh analysis."""
+    index = _load_index()
+    if invalidate_all:
+        removed = index.clear()
+    elif digest is not None:
+        if not index.invalidate(digest):
+            raise CodexaInputError(
+                message=f"Unknown failure signature: {digest}",
+                help_text="Use 'codexa knowledge list' to see the stored signatures",
+            )
+        removed = 1
+    else:
+        raise CodexaInputError(
+            message="Provide a signature digest or --all",
+        )
+    index.save()
+    print_success(f"Removed {removed} failure signature(s)")
+
+
+@knowledge_command.command("prune")
+def prune_signatures() -> None:
+    """Remove expired failure signatures."""
+    index = _load_index()
+    removed = index.prune()
+    index.save()
+    print_success(f"Pruned {removed} expired failure signature(s)")
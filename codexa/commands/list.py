@@ -6,7 +6,8 @@ from pathlib import Path
 import click
 
 from codexa.client.accessor import ReportScanner
-from codexa.client.executor import TestExecutor
+from codexa.client.daemon import DaemonClient
+from codexa.client.executor import TestExecutor, build_test_tree
 from codexa.core.env import load_api_key
 from codexa.core.errors import CodexaAccessorError, CodexaInputError
 
@@ -33,10 +34,14 @@ def list_command(base_dir: Path, as_json: bool) -> None:
     """List all available tests."""
     rendered_output = ""
     base_path = [str(base_dir)]
-    executor = TestExecutor(base_path)
+    daemon = DaemonClient.connect()
+    if daemon is not None:
+        entries = daemon.collect(base_path)
+    else:
+        entries = TestExecutor(base_path).collect_metadata()
     if as_json:
         logger.debug("Generating JSON map of all tests")
-        test_map = executor.get_structured_test_tree()
+        test_map = build_test_tree(entries)
         rendered_output = json.dumps(
             test_map, indent=2, sort_keys=True, ensure_ascii=False
         )
@@ -44,7 +49,7 @@ def list_command(base_dir: Path, as_json: bool) -> None:
         logger.debug("Generating list of all tests")
         numbered_list = [
             f"{index}. {entry}"
-            for index, entry in enumerate(executor.collect_all_tests(), start=1)
+            for index, entry in enumerate((e.node_id for e in entries), start=1)
         ]
         rendered_output = "\n".join(numbered_list)
     click.echo(rendered_output)
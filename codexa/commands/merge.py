@@ -0,0 +1,87 @@
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+import click
+
+from codexa.client.daemon import create_report_scanner
+from codexa.client.knowledge import SignatureIndex
+from codexa.client.reporting import Escalation, generate_report
+from codexa.client.sharding import ShardArtifact, merge_artifacts, record_durations
+from codexa.commands.run import raise_on_failures, write_report
+from codexa.core.config import load_config
+from codexa.core.errors import CodexaInputError
+
+logger = logging.getLogger(__name__)
+
+
+@click.command("merge")
+@click.argument(
+    "artifacts",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--output",
+    "output",
+    "-o",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=Path(Path.cwd(), "report.md"),
+    help="Output file with generated report",
+)
+@click.option(
+    "--escalation",
+    "escalation",
+    type=click.Choice(Escalation.CHOICES),
+    default=Escalation.UNEXPLAINED,
+    show_default=True,
+    help="When to use the LLM instead of the local report engine",
+)
+@click.option(
+    "--knowledge/--no-knowledge",
+    "use_knowledge",
+    default=True,
+    show_default=True,
+    help="Reuse stored analyses of previously seen failure signatures",
+)
+@click.option(
+    "--durations",
+    "durations_file",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Test durations file to record the merged durations into",
+)
+def merge_command(
+    artifacts: List[Path],
+    output: Path,
+    escalation: str,
+    use_knowledge: bool,
+    durations_file: Optional[Path],
+) -> None:
+    """Combine the artifacts of 'codexa run --shard' into a single report."""
+    if output.suffix != ".md":
+        raise CodexaInputError(
+            message=f"Output file must be a Markdown file, got {output.suffix}",
+            help_text=f"Rename the output file to a {output.stem}.md",
+        )
+    loaded = [ShardArtifact.load(a) for a in artifacts]
+    results, summary, verdicts = merge_artifacts(loaded)
+    exit_code = next((a.exit_code for a in loaded if a.exit_code != 0), 0)
+    logger.info(f"Merged {len(results)} results from {len(artifacts)} shard(s)")
+    record_durations(results, durations_file)
+
+    knowledge = SignatureIndex.from_config(load_config()) if use_knowledge else None
+    response = generate_report(
+        results,
+        summary,
+        scanner_factory=create_report_scanner,
+        escalation=escalation,
+        knowledge=knowledge,
+        verdicts=verdicts,
+        exit_code=exit_code,
+    )
+    write_report(response, output)
+    raise_on_failures(results, output, exit_code)
@@ -1,13 +1,36 @@
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import click
+import pytest
 
-from codexa.client.accessor import ReportScanner
-from codexa.client.executor import TestExecutor
-from codexa.core.env import load_api_key
-from codexa.core.errors import CodexaAccessorError, CodexaInputError
+from codexa.client.containers import DockerBackend
+from codexa.client.daemon import create_report_scanner
+from codexa.client.executor import LocalBackend, TestExecutor
+from codexa.client.flakiness import rerun_failures
+from codexa.client.knowledge import SignatureIndex
+from codexa.client.reporting import (
+    Escalation,
+    generate_report,
+    is_unreported_failure,
+)
+from codexa.client.results import TestResult
+from codexa.client.sharding import (
+    ShardArtifact,
+    load_durations,
+    parse_shard,
+    partition,
+    partition_digest,
+    record_durations,
+)
+from codexa.core.config import load_config
+from codexa.core.errors import (
+    CodexaAccessorError,
+    CodexaExecutionError,
+    CodexaInputError,
+)
+from codexa.core.profiling import span
 
 logger = logging.getLogger(__name__)
 
@@ -30,33 +53,287 @@ logger = logging.getLogger(__name__)
     is_flag=True,
     help="Suppress test execution shell output",
 )
-def run_command(test_ids: List[str], output: Path, quiet: bool) -> None:
-    """Analyze the contents of a file for testing."""
+@click.option(
+    "--docker-image",
+    "docker_image",
+    type=str,
+    required=False,
+    default=None,
+    help="Run the tests inside pooled containers of this image",
+)
+@click.option(
+    "--docker-workers",
+    "docker_workers",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Number of pooled containers to shard the tests across",
+)
+@click.option(
+    "--docker-install",
+    "docker_install",
+    type=str,
+    required=False,
+    default=None,
+    help="Command installing the dependency layer in new containers",
+)
+@click.option(
+    "--escalation",
+    "escalation",
+    type=click.Choice(Escalation.CHOICES),
+    default=Escalation.UNEXPLAINED,
+    show_default=True,
+    help="When to use the LLM instead of the local report engine",
+)
+@click.option(
+    "--knowledge/--no-knowledge",
+    "use_knowledge",
+    default=True,
+    show_default=True,
+    help="Reuse stored analyses of previously seen failure signatures",
+)
+@click.option(
+    "--shard",
+    "shard",
+    type=str,
+    required=False,
+    default=None,
+    help="Only run shard i of n (e.g. 2/4) and write a result artifact",
+)
+@click.option(
+    "--artifact",
+    "artifact",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Shard artifact file, defaults to codexa-shard-<i>.json",
+)
+@click.option(
+    "--durations",
+    "durations_file",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Test durations file to partition shards with and record into",
+)
+@click.option(
+    "--rerun-failures",
+    "reruns",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Re-run each failed test N times to tell flaky from deterministic ones",
+)
+@click.option(
+    "--rerun-workers",
+    "rerun_workers",
+    type=click.IntRange(min=1),
+    required=False,
+    default=None,
+    help="Number of parallel rerun processes, defaults to the CPU count",
+)
+@click.option(
+    "--profile-tests",
+    "profile_tests",
+    is_flag=True,
+    help="Time test phases and fixture setups, and rank the slowest",
+)
+@click.option(
+    "--profile-memory",
+    "profile_memory",
+    is_flag=True,
+    help="With --profile-tests, also measure peak memory per test",
+)
+@click.option(
+    "--profile-tests-output",
+    "profile_tests_output",
+    type=click.Path(exists=False, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=Path(Path.cwd(), "codexa-phases.json"),
+    help="JSON file for the test phase profile",
+)
+def run_command(
+    test_ids: List[str],
+    output: Path,
+    quiet: bool,
+    docker_image: Optional[str],
+    docker_workers: int,
+    docker_install: Optional[str],
+    escalation: str,
+    use_knowledge: bool,
+    shard: Optional[str],
+    artifact: Optional[Path],
+    durations_file: Optional[Path],
+    reruns: int,
+    rerun_workers: Optional[int],
+    profile_tests: bool,
+    profile_memory: bool,
+    profile_tests_output: Path,
+) -> None:
+    """Analyze the contents of a file for testing.
+
+    With --shard, only a deterministic slice of the collected tests is run
+    and its results are written to an artifact instead of being analyzed;
+    combine the artifacts of all shards with 'codexa merge'. Every shard must
+    see the same tests and --durations file, which the merge verifies.
+    """
     if output.suffix != ".md":
         raise CodexaInputError(
             message=f"Output file must be a Markdown file, got {output.suffix}",
             help_text=f"Rename the output file to a {output.stem}.md",
         )
-    key = load_api_key()
-    client = ReportScanner(key)
+    if reruns and docker_image is not None:
+        raise CodexaInputError(
+            message="--rerun-failures is not supported with --docker-image",
+        )
+    if (profile_tests or profile_memory) and docker_image is not None:
+        raise CodexaInputError(
+            message="--profile-tests is not supported with --docker-image",
+        )
+    shard_index, shard_total = parse_shard(shard) if shard else (None, None)
     if not test_ids:
         logger.info("No test IDs provided, running all tests")
+    if shard is not None:
+        entries = {e.node_id: e for e in TestExecutor(test_ids).collect_metadata()}
+        durations = load_durations(durations_file)
+        shards = partition(list(entries), shard_total, durations)
+        sharding = {
+            "digest": partition_digest(list(entries), durations),
+            "node_ids": shards[shard_index - 1],
+            "collected": len(entries),
+        }
+        # Containers see the sources under their own workdir, keep IDs relative
+        test_ids = [
+            entries[n].node_id if docker_image else entries[n].runnable_id
+            for n in shards[shard_index - 1]
+        ]
+        logger.info(
+            f"Shard {shard_index}/{shard_total}: running {len(test_ids)} "
+            f"of {len(entries)} tests"
+        )
+        if not test_ids:
+            _write_artifact(
+                ShardArtifact(shard_index, shard_total, pytest.ExitCode.OK, **sharding),
+                artifact,
+            )
+            return
 
-    executor = TestExecutor(test_ids)
+    backend = LocalBackend(profile=profile_tests, trace_memory=profile_memory)
+    if docker_image is not None:
+        logger.info(f"Running tests in Docker containers of {docker_image}")
+        backend = DockerBackend(
+            docker_image, workers=docker_workers, install_command=docker_install
+        )
+    executor = TestExecutor(test_ids, backend=backend)
     exit_code, shell_output, error_output = executor.run(verbose=not quiet)
     if not quiet:
         click.echo(shell_output)
         click.echo(error_output)
-    if exit_code != 0:
+    collection_failed = any(r.when == "collect" for r in executor.results)
+    analyzable = exit_code in (pytest.ExitCode.OK, pytest.ExitCode.TESTS_FAILED)
+    if not analyzable and not collection_failed:
         raise CodexaAccessorError(
             message=f"Failed to generate tests: {error_output}",
             help_text=f"Please check the output for more information",
         )
+    appendix = None
+    if executor.phases is not None:
+        try:
+            executor.phases.write(profile_tests_output)
+        except IOError as e:
+            raise CodexaAccessorError(message=f"Failed to write test profile: {e}")
+        logger.info(f"Test phase profile written to {profile_tests_output}")
+        appendix = executor.phases.to_markdown()
+    verdicts = rerun_failures(
+        executor.results, reruns, workers=rerun_workers, rootdir=executor.rootdir
+    )
+    if shard is not None:
+        # Durations are recorded by 'codexa merge', so that every shard of a
+        # pipeline partitions the suite with the same data
+        _write_artifact(
+            ShardArtifact.from_run(
+                shard_index,
+                shard_total,
+                exit_code,
+                executor.results,
+                shell_output,
+                verdicts=verdicts,
+                **sharding,
+            ),
+            artifact,
+        )
+        return
 
     logger.debug(f"Test execution complete, proceeding to results analysis")
-    response = client.analyze_tests(shell_output)
+    record_durations(executor.results, durations_file)
+    knowledge = SignatureIndex.from_config(load_config()) if use_knowledge else None
+    response = generate_report(
+        executor.results,
+        shell_output,
+        scanner_factory=create_report_scanner,
+        escalation=escalation,
+        knowledge=knowledge,
+        verdicts=verdicts,
+        appendix=appendix,
+        exit_code=exit_code,
+    )
+    write_report(response, output)
+    raise_on_failures(executor.results, output, exit_code)
+
+
+def _write_artifact(shard_artifact: ShardArtifact, path: Optional[Path]) -> None:
+    path = path or Path.cwd() / f"codexa-shard-{shard_artifact.index}.json"
+    try:
+        shard_artifact.write(path)
+    except IOError as e:
+        raise CodexaAccessorError(message=f"Failed to write shard artifact: {e}")
+    click.secho(
+        f"\n[!] Shard {shard_artifact.index}/{shard_artifact.total} complete! "
+        f"Artifact file: {path}",
+        fg="green",
+        bold=True,
+    )
+
+
+def raise_on_failures(
+    results: List[TestResult], output: Path, exit_code: int = pytest.ExitCode.OK
+) -> None:
+    """Fail the command if any test failed or errored, once reported.
+
+    Args:
+        results (List[TestResult]): Structured test results
+        output (Path): Report file describing the failures
+        exit_code (int, optional): Pytest exit code of the run
+
+    Raises:
+        CodexaExecutionError: If any result is a failure or error, or Pytest
+            failed without a failed result
+    """
+    failures = [r for r in results if r.is_failure]
+    if failures:
+        raise CodexaExecutionError(
+            message=f"{len(failures)} test(s) failed or errored",
+            help_text=f"See the test report for details: {output}",
+        )
+    if is_unreported_failure(exit_code, results):
+        raise CodexaExecutionError(
+            message=f"Pytest exited with code {int(exit_code)} without a failed test",
+            help_text=f"See the test output in the report: {output}",
+        )
+
+
+def write_report(response: str, output: Path) -> None:
+    """Write a generated test report to its Markdown file.
+
+    Args:
+        response (str): Markdown report
+        output (Path): Report file
+
+    Raises:
+        CodexaAccessorError: If the file cannot be written
+    """
     try:
-        with open(output, "w") as f:
+        with span("report.write", path=str(output)), open(output, "w") as f:
             f.write(response)
     except IOError as e:
         raise CodexaAccessorError(
@@ -0,0 +1,46 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from codexa.client.daemon import DaemonClient, DaemonServer, get_socket_path
+from codexa.core.errors import CodexaRuntimeError
+from codexa.core.output import print_success
+
+logger = logging.getLogger(__name__)
+
+
+@click.command("serve")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help="Unix socket to listen on, defaults to $CODEXA_HOME/codexa.sock",
+)
+@click.option(
+    "--stop",
+    is_flag=True,
+    help="Stop the running daemon instead of starting one",
+)
+def serve_command(socket_path: Optional[Path], stop: bool) -> None:
+    """Run a daemon keeping clients, repositories and test collection warm."""
+    socket_path = socket_path or get_socket_path()
+    if stop:
+        client = DaemonClient(socket_path, timeout=2.0)
+        if not client.ping():
+            raise CodexaRuntimeError(
+                message=f"No codexa daemon is listening on {socket_path}",
+            )
+        client.call("shutdown")
+        print_success(f"Stopped codexa daemon on {socket_path}")
+        return
+
+    with DaemonServer(socket_path) as server:
+        print_success(f"Codexa daemon listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down codexa daemon")
@@ -0,0 +1,114 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import click
+
+from codexa.client.usage import (
+    DEFAULT_PRICES,
+    get_metrics_file,
+    load_records,
+    summarize,
+)
+from codexa.core.config import load_config
+from codexa.core.errors import CodexaInputError
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def _render_table(rows: list) -> str:
+    headers = [
+        "Command",
+        "Model",
+        "Calls",
+        "Errors",
+        "p50",
+        "p95",
+        "p99",
+        "TTFT p50",
+        "Prompt",
+        "Completion",
+        "Reasoning",
+        "Cache hits",
+        "Cost (USD)",
+    ]
+    table = [
+        [
+            row["command"],
+            row["model"],
+            str(row["requests"]),
+            str(row["errors"]),
+            _seconds(row["latency_p50"]),
+            _seconds(row["latency_p95"]),
+            _seconds(row["latency_p99"]),
+            _seconds(row["ttft_p50"]),
+            str(row["prompt_tokens"]),
+            str(row["completion_tokens"]),
+            str(row["reasoning_tokens"]),
+            f"{row['cache_hit_rate']:.0%}",
+            f"{row['cost_usd']:.4f}",
+        ]
+        for row in rows
+    ]
+    widths = [max(len(cell) for cell in column) for column in zip(headers, *table)]
+    lines = [
+        "  ".join(cell.ljust(w) for cell, w in zip(line, widths))
+        for line in [headers, *table]
+    ]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+@click.command("usage")
+@click.option(
+    "--metrics-file",
+    "metrics_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    default=None,
+    help="Usage metrics file, defaults to $CODEXA_HOME/usage.jsonl",
+)
+@click.option(
+    "--command",
+    "command_name",
+    type=str,
+    required=False,
+    default=None,
+    help="Only report requests made by this command",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    help="Print the usage summary as JSON",
+)
+def usage_command(
+    metrics_file: Optional[Path], command_name: Optional[str], as_json: bool
+) -> None:
+    """Report LLM token usage, latency and estimated cost."""
+    prices: Dict[str, Any] = dict(DEFAULT_PRICES)
+    configured = load_config().get("usage", {}).get("prices", {})
+    if not isinstance(configured, dict):
+        raise CodexaInputError(
+            message="usage.prices must map model names to token prices",
+            help_text="See the README for the price table format",
+        )
+    prices.update(configured)
+
+    records = load_records(metrics_file or get_metrics_file())
+    if command_name is not None:
+        records = [r for r in records if r.command == command_name]
+    if not records:
+        click.echo("No LLM usage recorded yet.")
+        return
+
+    rows = summarize(records, prices)
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+    else:
+        click.echo(_render_table(rows))
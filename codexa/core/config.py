@@ -0,0 +1,48 @@
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+from codexa.core.constants import Environment
+from codexa.core.errors import CodexaInputError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_FILE = ".codexa.yaml"
+
+
+def load_config(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Load the Codexa YAML configuration file.
+
+    The file is looked up in order from the given path, the CODEXA_CONFIG
+    environment variable and finally .codexa.yaml in the working directory.
+
+    Args:
+        path (Path, optional): Explicit configuration file path
+
+    Raises:
+        CodexaInputError: If the file cannot be parsed
+
+    Returns:
+        Dict[str, Any]: Configuration map, empty if no file was found
+    """
+    if path is None:
+        configured = os.environ.get(Environment.CONFIG_FILE, None)
+        path = Path(configured) if configured else Path.cwd() / DEFAULT_CONFIG_FILE
+    if not path.is_file():
+        logger.debug(f"No configuration file found at {path}")
+        return {}
+    try:
+        data = yaml.safe_load(path.read_text()) or {}
+    except yaml.YAMLError as e:
+        raise CodexaInputError(
+            message=f"Invalid configuration file {path}: {e}",
+            help_text="Fix the YAML syntax in the configuration file",
+        )
+    if not isinstance(data, dict):
+        raise CodexaInputError(
+            message=f"Configuration file {path} must contain a mapping",
+        )
+    return data
@@ -18,3 +18,8 @@ class Environment:
     """Environment variables for user configuration."""
 
     API_KEY: Final[str] = "CODEXA_API_KEY"
+    HOME: Final[str] = "CODEXA_HOME"
+    CONFIG_FILE: Final[str] = "CODEXA_CONFIG"
+    METRICS_FILE: Final[str] = "CODEXA_METRICS_FILE"
+    SOCKET: Final[str] = "CODEXA_SOCKET"
+    NO_DAEMON: Final[str] = "CODEXA_NO_DAEMON"
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 
 from codexa.core.constants import Environment
 from codexa.core.errors import CodexaEnvironmentError
@@ -20,3 +21,17 @@ def load_api_key() -> str:
             help_text=f"Set {Environment.API_KEY} and try again",
         )
     return key
+
+
+def get_codexa_home() -> Path:
+    """Get the directory holding Codexa's persistent local data.
+
+    Defaults to ~/.codexa, and can be overridden with the CODEXA_HOME
+    environment variable. The directory may not exist yet; code writing to
+    it creates it first.
+
+    Returns:
+        Path: Codexa data directory
+    """
+    home = os.environ.get(Environment.HOME, None)
+    return Path(home) if home else Path.home() / ".codexa"
@@ -4,6 +4,7 @@ from typing import Any, Dict
 
 import click
 
+from codexa.client.transport import close_clients
 from codexa.core.errors import CodexaBaseError, ExitCode
 from codexa.core.output import print_warning
 
@@ -32,6 +33,9 @@ class CliHandler(click.Group):
             err.show()
             sys.exit(ExitCode.RUNTIME_ERROR)
 
+        finally:
+            close_clients()
+
     def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
         """Customize help info."""
         super().format_help(ctx, formatter)
@@ -0,0 +1,182 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+
+from codexa.core.output import ColorFormatter, ColorHandler
+
+LOG_FORMATS = ("text", "json")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Attributes every record has; anything else was passed with `extra`
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def get_log_level(verbosity: int) -> int:
+    """Map the number of -v flags to a log level."""
+    levels = {0: logging.WARN, 1: logging.INFO, 2: logging.DEBUG}
+    return levels.get(verbosity, logging.DEBUG)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatter writing each record as a single JSON line.
+
+    Besides the message, every line carries the wall-clock timestamp, the
+    milliseconds elapsed since logging started and the emitting thread, so
+    CI can reconstruct timelines. Fields passed with `extra`, such as
+    durations, are included as they are.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "elapsed_ms": round(record.relativeCreated, 3),
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class _RecordQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments into the message and render the traceback here,
+        # on the calling thread, while the frames are still alive; the rest
+        # of the formatting is left to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """Hand log records to a background thread that formats and writes them.
+
+    The calling thread only enqueues records; a `QueueListener` thread
+    formats them and writes to the stream. Installing a pipeline replaces the
+    one installed before on the same logger, so configuring logging again in
+    a long-lived process never stacks handlers.
+    """
+
+    def __init__(self, handler: logging.Handler) -> None:
+        self.__queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.__handler = handler
+        self.queue_handler = _RecordQueueHandler(self.__queue)
+        self.__listener = QueueListener(
+            self.__queue, handler, respect_handler_level=True
+        )
+        self.__lock = threading.Lock()
+        self.__running = False
+
+    def start(self) -> None:
+        """Start the listener thread."""
+        with self.__lock:
+            if not self.__running:
+                self.__listener.start()
+                self.__running = True
+
+    def flush(self) -> None:
+        """Wait for the queued records to be written, then keep listening."""
+        with self.__lock:
+            if self.__running:
+                self.__listener.stop()
+                self.__listener.start()
+            self.__handler.flush()
+
+    def stop(self) -> None:
+        """Write the queued records and stop the listener thread."""
+        with self.__lock:
+            if self.__running:
+                self.__listener.stop()
+                self.__running = False
+            self.__handler.flush()
+
+
+_PIPELINES: Dict[str, LogPipeline] = {}
+_PIPELINES_LOCK = threading.Lock()
+
+
+def configure_logging(
+    verbosity: int,
+    log_format: str = "text",
+    logger_name: str = "codexa",
+    stream: Optional[TextIO] = None,
+) -> logging.Logger:
+    """Route a logger's records through a non-blocking pipeline.
+
+    Calling this again replaces the previous pipeline of the logger, so the
+    logger always has exactly one handler.
+
+    Args:
+        verbosity (int): Number of -v flags
+        log_format (str, optional): "text" for colored lines, "json" for
+            JSON lines
+        logger_name (str, optional): Logger to configure
+        stream (TextIO, optional): Output stream, defaults to stderr
+
+    Returns:
+        logging.Logger: Configured logger
+    """
+    logger = logging.getLogger(logger_name)
+    level = get_log_level(verbosity)
+    logger.setLevel(level)
+
+    if log_format == "json":
+        handler: logging.Handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler = ColorHandler(stream)
+        fmt = "[%(asctime)s][%(levelname)s] %(message)s"
+        if level == logging.DEBUG:
+            fmt = "[%(asctime)s][%(levelname)s] %(name)s: %(message)s"
+        handler.setFormatter(ColorFormatter(fmt=fmt, datefmt=DATE_FORMAT))
+    handler.setLevel(level)
+
+    pipeline = LogPipeline(handler)
+    with _PIPELINES_LOCK:
+        previous = _PIPELINES.pop(logger_name, None)
+        if previous is not None:
+            logger.removeHandler(previous.queue_handler)
+            previous.stop()
+        logger.addHandler(pipeline.queue_handler)
+        pipeline.start()
+        _PIPELINES[logger_name] = pipeline
+    return logger
+
+
+def flush_logging() -> None:
+    """Wait until every record logged so far has been written."""
+    with _PIPELINES_LOCK:
+        pipelines = list(_PIPELINES.values())
+    for pipeline in pipelines:
+        pipeline.flush()
+
+
+def shutdown_logging() -> None:
+    """Write the pending records and stop the pipelines."""
+    with _PIPELINES_LOCK:
+        pipelines = list(_PIPELINES.items())
+        _PIPELINES.clear()
+    for name, pipeline in pipelines:
+        logging.getLogger(name).removeHandler(pipeline.queue_handler)
+        pipeline.stop()
+
+
+atexit.register(shutdown_logging)
@@ -1,27 +1,56 @@
 import logging
+from typing import Dict, Optional, TextIO
 
 import click
 from colorama import Fore, Style
 
+LEVEL_COLORS: Dict[int, str] = {
+    logging.DEBUG: Fore.CYAN,
+    logging.INFO: Fore.GREEN,
+    logging.WARNING: Fore.YELLOW,
+    logging.ERROR: Fore.RED,
+    logging.CRITICAL: Fore.RED,
+}
 
-class ColorHandler(logging.StreamHandler):
-    def emit(self, record: logging.LogRecord) -> None:
-        colors = {
-            logging.DEBUG: Fore.CYAN,
-            logging.INFO: Fore.GREEN,
-            logging.WARNING: Fore.YELLOW,
-            logging.ERROR: Fore.RED,
-            logging.CRITICAL: Fore.RED,
+
+class ColorFormatter(logging.Formatter):
+    """Formatter coloring the level name, without touching the record.
+
+    One plain formatter per level is built upfront with the color codes
+    baked into its format string, so formatting a record is a dict lookup
+    and a regular `logging.Formatter.format` call.
+    """
+
+    def __init__(
+        self, fmt: Optional[str] = None, datefmt: Optional[str] = None
+    ) -> None:
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self.__formatters = {
+            level: logging.Formatter(
+                fmt=self._fmt.replace(
+                    "%(levelname)s", f"{color}%(levelname)s{Style.RESET_ALL}"
+                ),
+                datefmt=datefmt,
+            )
+            for level, color in LEVEL_COLORS.items()
         }
-        color = colors.get(record.levelno, Fore.WHITE)
-        original_levelname = record.levelname
-        try:
-            # Replace levelname with colored version
-            record.levelname = f"{color}{record.levelname}{Style.RESET_ALL}"
-            super().emit(record)
-        finally:
-            # Restore original levelname to avoid side effects
-            record.levelname = original_levelname
+        self.__default = logging.Formatter(
+            fmt=self._fmt.replace(
+                "%(levelname)s", f"{Fore.WHITE}%(levelname)s{Style.RESET_ALL}"
+            ),
+            datefmt=datefmt,
+        )
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.__formatters.get(record.levelno, self.__default).format(record)
+
+
+class ColorHandler(logging.StreamHandler):
+    """Stream handler formatting records with a `ColorFormatter`."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        super().__init__(stream)
+        self.setFormatter(ColorFormatter())
 
 
 def print_error(message: str) -> None:
@@ -0,0 +1,227 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_DISABLED_SPAN = nullcontext()
+
+# Spans and start time (ns) of the capture active in the current context
+_CAPTURE: ContextVar[Optional[Tuple[List["Span"], int]]] = ContextVar(
+    "codexa_span_capture", default=None
+)
+
+
+@dataclass(frozen=True)
+class Span:
+    """A completed, timed section of work."""
+
+    name: str
+    category: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    def to_trace_event(self, pid: int) -> Dict[str, Any]:
+        """Convert to a Chrome trace 'complete' event (timestamps in µs)."""
+        return {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self.start_ns / 1000,
+            "dur": self.duration_ns / 1000,
+            "pid": pid,
+            "tid": self.thread_id,
+            "args": self.args,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary map structure."""
+        return asdict(self)
+
+
+class Profiler:
+    """Lightweight span recorder for phase-level timing.
+
+    While disabled, `span` hands out a shared no-op context manager so that
+    instrumented code paths pay little more than a boolean check. A capture
+    records the spans of its context even while disabled, which lets the
+    daemon time a request for the client that profiles it.
+    """
+
+    def __init__(self) -> None:
+        self.__enabled = False
+        self.__spans: List[Span] = []
+        self.__lock = threading.Lock()
+        self.__origin_ns = time.perf_counter_ns()
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether spans are being recorded."""
+        return self.__enabled
+
+    @property
+    def spans(self) -> List[Span]:
+        """Return a copy of the recorded spans."""
+        with self.__lock:
+            return list(self.__spans)
+
+    def enable(self) -> None:
+        """Start recording spans, discarding any previous recording."""
+        with self.__lock:
+            self.__spans.clear()
+            self.__origin_ns = time.perf_counter_ns()
+        self.__enabled = True
+
+    def disable(self) -> None:
+        """Stop recording spans."""
+        self.__enabled = False
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Span]]:
+        """Collect the spans of the current context into a list.
+
+        Captured start times are relative to the start of the capture. Threads
+        must be started with a copy of the context to be captured.
+
+        Yields:
+            List[Span]: Spans captured so far
+        """
+        spans: List[Span] = []
+        token = _CAPTURE.set((spans, time.perf_counter_ns()))
+        try:
+            yield spans
+        finally:
+            _CAPTURE.reset(token)
+
+    def merge(self, spans: Iterable[Span], start_ns: int) -> None:
+        """Add spans captured elsewhere to the recording.
+
+        Args:
+            spans (Iterable[Span]): Captured spans
+            start_ns (int): `perf_counter_ns` time the captured work started
+        """
+        if not self.__enabled:
+            return
+        offset = start_ns - self.__origin_ns
+        with self.__lock:
+            self.__spans.extend(replace(s, start_ns=s.start_ns + offset) for s in spans)
+
+    @contextmanager
+    def __record(self, name: str, category: str, args: Dict[str, Any]) -> Iterator:
+        captured = _CAPTURE.get()
+        spans, origin = captured or (self.__spans, self.__origin_ns)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            recorded = Span(
+                name=name,
+                category=category,
+                start_ns=start - origin,
+                duration_ns=end - start,
+                thread_id=threading.get_ident(),
+                args=args,
+            )
+            with self.__lock:
+                spans.append(recorded)
+
+    def span(self, name: str, category: str = "codexa", **args: Any) -> ContextManager:
+        """Time the enclosed block as a named span.
+
+        Args:
+            name (str): Span name, e.g. "executor.run"
+            category (str, optional): Trace category, defaults to "codexa"
+            **args: Extra attributes attached to the trace event
+
+        Returns:
+            ContextManager: Span context, a no-op when profiling is disabled
+        """
+        if not self.__enabled and _CAPTURE.get() is None:
+            return _DISABLED_SPAN
+        return self.__record(name, category, args)
+
+    def timed(self, name: str, category: str = "codexa") -> Callable[[F], F]:
+        """Decorate a function so that each call is recorded as a span."""
+
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.__enabled and _CAPTURE.get() is None:
+                    return func(*args, **kwargs)
+                with self.__record(name, category, {}):
+                    return func(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the recorded spans in Chrome trace event format."""
+        pid = os.getpid()
+        events = [s.to_trace_event(pid) for s in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: Path) -> None:
+        """Write the Chrome trace JSON, loadable in chrome://tracing or Perfetto."""
+        path.write_text(json.dumps(self.to_chrome_trace(), indent=2))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Aggregate recorded spans by name, slowest total time first."""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for recorded in self.spans:
+            entry = totals.setdefault(
+                recorded.name, {"name": recorded.name, "count": 0, "total_ns": 0}
+            )
+            entry["count"] += 1
+            entry["total_ns"] += recorded.duration_ns
+            entry["max_ns"] = max(entry.get("max_ns", 0), recorded.duration_ns)
+        return sorted(totals.values(), key=lambda e: e["total_ns"], reverse=True)
+
+    def format_summary(self) -> str:
+        """Render the span summary as a plain-text table."""
+        rows = self.summary()
+        width = max([len("Span")] + [len(row["name"]) for row in rows])
+        header = (
+            f"{'Span':<{width}}  {'Calls':>5}  {'Total (ms)':>10}  {'Max (ms)':>10}"
+        )
+        lines = [header, "-" * len(header)]
+        for row in rows:
+            lines.append(
+                f"{row['name']:<{width}}  {row['count']:>5}  "
+                f"{row['total_ns'] / 1e6:>10.1f}  {row['max_ns'] / 1e6:>10.1f}"
+            )
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
+
+
+def span(name: str, category: str = "codexa", **args: Any) -> ContextManager:
+    """Time the enclosed block on the global profiler."""
+    return PROFILER.span(name, category, **args)
+
+
+def timed(name: str, category: str = "codexa") -> Callable[[F], F]:
+    """Record each call of the decorated function on the global profiler."""
+    return PROFILER.timed(name, category)
@@ -1,39 +1,30 @@
 import logging
+from pathlib import Path
 
 import click
 import colorama
 
 from codexa import __version__
+from codexa.client.usage import USAGE
 from codexa.commands.compare import compare_command
+from codexa.commands.knowledge import knowledge_command
 from codexa.commands.list import list_command
+from codexa.commands.merge import merge_command
 from codexa.commands.run import run_command
+from codexa.commands.serve import serve_command
+from codexa.commands.usage import usage_command
 from codexa.core.handler import CliHandler
-from codexa.core.output import ColorHandler
+from codexa.core.logs import LOG_FORMATS, configure_logging, flush_logging
+from codexa.core.profiling import PROFILER
 
 colorama.init(autoreset=True)
 
 
-def __get_log_level(verbosity: int) -> int:
-    levels = {0: logging.WARN, 1: logging.INFO, 2: logging.DEBUG}
-    return levels.get(verbosity, logging.DEBUG)
-
-
-def __set_logger(level: int):
-    logger = logging.getLogger(__package__)
-    log_level = __get_log_level(level)
-    logger.setLevel(log_level)
-    handler = ColorHandler()
-    handler.setLevel(log_level)
-
-    timestamp_format = "[%(asctime)s][%(levelname)s] %(message)s"
-    if log_level == logging.DEBUG:
-        timestamp_format = "[%(asctime)s][%(levelname)s] %(name)s: %(message)s"
-    formatter = logging.Formatter(
-        fmt=timestamp_format,
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+def __emit_profile(trace_file: Path) -> None:
+    PROFILER.disable()
+    PROFILER.write_trace(trace_file)
+    click.echo(PROFILER.format_summary(), err=True)
+    click.echo(f"Profile trace written to {trace_file}", err=True)
 
 
 @click.group(cls=CliHandler)
@@ -45,12 +36,52 @@ def __set_logger(level: int):
     count=True,
     help="Increase verbosity. Use multiple times for more detail (e.g., -vv for debug).",
 )
-def cli(context: click.Context, verbose: int):
+@click.option(
+    "--log-format",
+    "log_format",
+    type=click.Choice(LOG_FORMATS),
+    default="text",
+    show_default=True,
+    envvar="CODEXA_LOG_FORMAT",
+    help="Log line format, 'json' writes one JSON object per line for CI ingestion",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Record phase timings and print a summary table on exit.",
+)
+@click.option(
+    "--profile-output",
+    "profile_output",
+    type=click.Path(dir_okay=False, resolve_path=True, path_type=Path),
+    default=Path(Path.cwd(), "codexa-trace.json"),
+    help="Chrome trace JSON file written when profiling",
+)
+def cli(
+    context: click.Context,
+    verbose: int,
+    log_format: str,
+    profile: bool,
+    profile_output: Path,
+):
     """Codexa: CLI tool for test automation assistance."""
-    __set_logger(verbose)
+    configure_logging(verbose, log_format)
+    context.call_on_close(flush_logging)
     context.ensure_object(dict)
+    USAGE.command = context.invoked_subcommand
+    context.call_on_close(USAGE.flush)
+    if profile:
+        PROFILER.enable()
+        context.call_on_close(lambda: __emit_profile(profile_output))
+        context.with_resource(
+            PROFILER.span(f"cli.{context.invoked_subcommand}", category="cli")
+        )
 
 
 cli.add_command(run_command)
+cli.add_command(merge_command)
 cli.add_command(list_command)
 cli.add_command(compare_command)
+cli.add_command(usage_command)
+cli.add_command(knowledge_command)
+cli.add_command(serve_command)
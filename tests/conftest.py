@@ -3,12 +3,36 @@ from typing import Iterator
 from unittest.mock import MagicMock, patch
 
 import pytest
+from git import Repo
 
+from codexa.client.transport import ClientRegistry, PoolSettings
+from tests.helpers import commit_files
 from tests.tools import CommandRunner, MockLogger
 
 RESOURCES_DIR = Path(__file__).parent / "resources"
 
 
+@pytest.fixture(autouse=True)
+def codexa_home(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Keep persistent Codexa data out of the user's home directory."""
+    home = tmp_path_factory.mktemp("codexa-home")
+    monkeypatch.setenv("CODEXA_HOME", str(home))
+    monkeypatch.delenv("CODEXA_METRICS_FILE", raising=False)
+    monkeypatch.delenv("CODEXA_CONFIG", raising=False)
+    return home
+
+
+@pytest.fixture(autouse=True)
+def client_registry() -> Iterator[ClientRegistry]:
+    """Give every test a fresh pool of shared LLM clients."""
+    registry = ClientRegistry(PoolSettings())
+    with patch("codexa.client.transport.REGISTRY", registry):
+        yield registry
+    registry.close()
+
+
 @pytest.fixture
 def runner() -> CommandRunner:
     return CommandRunner()
@@ -37,7 +61,7 @@ def mock_pytest_file(tmp_path: Path) -> Iterator[Path]:
 
 @pytest.fixture
 def mock_openai_client() -> Iterator[MagicMock]:
-    with patch("codexa.client.accessor.OpenAI") as mock_client:
+    with patch("codexa.client.transport.OpenAI") as mock_client:
         mock_client_instance = MagicMock()
         mock_response = MagicMock()
         mock_response.choices = [
@@ -46,3 +70,31 @@ def mock_openai_client() -> Iterator[MagicMock]:
         mock_client_instance.chat.completions.create.return_value = mock_response
         mock_client.return_value = mock_client_instance
         yield mock_client
+
+
+@pytest.fixture
+def mock_docker_client() -> MagicMock:
+    """Mock a Docker client with no pooled containers running."""
+    client = MagicMock()
+    client.containers.list.return_value = []
+    return client
+
+
+@pytest.fixture
+def feature_repo(tmp_path: Path) -> Repo:
+    """Clone on a feature branch, behind an upstream change on main."""
+    Repo.init(tmp_path / "origin.git", bare=True)
+    repo = Repo.init(tmp_path / "work")
+    repo.git.checkout("-b", "main")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Codexa")
+        config.set_value("user", "email", "codexa@example.com")
+    repo.create_remote("origin", str(tmp_path / "origin.git"))
+    commit_files(repo, {"app.py": "x = 1\n", "lib/util.py": "y = 1\n"}, "Initial")
+    base = repo.head.commit
+    repo.git.push("origin", "main", "main:release")
+    commit_files(repo, {"upstream.py": "z = 1\n"}, "Upstream change")
+    repo.git.push("origin", "main")
+    repo.git.checkout("-b", "feature", base.hexsha)
+    commit_files(repo, {"app.py": "x = 2\n", "lib/util.py": "y = 2\n"}, "Feature")
+    return repo
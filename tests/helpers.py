@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, List
+
+from git import Repo
 
 
 def assert_files_created(working_dir: str, files: List[str]) -> None:
@@ -16,3 +18,13 @@ def assert_lines_in_file(filename: str, expected_lines: List[str]) -> None:
         contents = file.read()
         for line in expected_lines:
             assert line in contents, f"Line not found in {filename}: '{line}'"
+
+
+def commit_files(repo: Repo, files: Dict[str, str], message: str) -> None:
+    """Write files into a working tree and commit them."""
+    for name, content in files.items():
+        path = Path(repo.working_dir) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        repo.index.add([name])
+    repo.index.commit(message)
@@ -1,11 +1,95 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
 from unittest.mock import MagicMock
 
 import pytest
 
-from codexa.client.accessor import RemoteAIAccessor, ReportScanner
+from codexa.client import hedging
+from codexa.client.accessor import RemoteAIAccessor, RepoAnalyzer, ReportScanner
+from codexa.client.hedging import (
+    DEFAULT_HEDGE_DELAY_S,
+    Attempt,
+    CircuitBreaker,
+    EndpointTarget,
+    HedgePolicy,
+    hedged_call,
+)
+from codexa.client.packing import pack_diff, pack_test_output
+from codexa.client.results import TestResult
+from codexa.client.routing import InputProfile, ModelRouter, get_routing_log
+from codexa.client.tokens import (
+    DEFAULT_CONTEXT_WINDOW,
+    context_window,
+    estimate_tokens,
+    prompt_budget,
+)
+from codexa.client.transport import ClientRegistry, PoolSettings
+from codexa.client.usage import (
+    USAGE,
+    UsageRecord,
+    estimate_cost,
+    get_metrics_file,
+    load_records,
+    summarize,
+)
 from codexa.core.errors import CodexaAccessorError
 
 
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps(
+            {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "stub-model",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "## Report"},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 3,
+                    "completion_tokens": 2,
+                    "total_tokens": 5,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_llm_server() -> Iterator[str]:
+    _StubLLMHandler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubLLMHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
 def test_accessor_init_ok():
     accessor = RemoteAIAccessor(api_key="dummy-key", prompt="dummy-prompt")
     assert accessor.setup_prompt == "dummy-prompt"
@@ -52,3 +136,342 @@ def test_analyze_tests_create_failure(mock_openai_client: MagicMock):
     with pytest.raises(CodexaAccessorError, match="Failed to generate code"):
         _ = generator.analyze_tests(test_output="Some mock report output")
     mock_client_instance.chat.completions.create.assert_called_once()
+
+
+def test_make_request_records_usage(mock_openai_client: MagicMock):
+    response = mock_openai_client.return_value.chat.completions.create.return_value
+    response.usage = MagicMock(
+        prompt_tokens=120,
+        completion_tokens=30,
+        prompt_tokens_details=MagicMock(cached_tokens=100),
+        completion_tokens_details=MagicMock(reasoning_tokens=12),
+    )
+    USAGE.flush()
+    generator = ReportScanner(api_key="dummy-key")
+    generator.analyze_tests(test_output="1 passed")
+    (record,) = USAGE.records
+    assert (record.prompt_tokens, record.completion_tokens) == (120, 30)
+    assert record.reasoning_tokens == 12
+    assert record.cache_hit
+    assert record.latency_s >= 0
+    assert USAGE.flush() == 1
+
+
+def test_make_request_stream_records_ttft(mock_openai_client: MagicMock):
+    chunks = [
+        MagicMock(usage=None, choices=[MagicMock(delta=MagicMock(content="## "))]),
+        MagicMock(usage=None, choices=[MagicMock(delta=MagicMock(content="Hi"))]),
+        MagicMock(
+            usage=MagicMock(prompt_tokens=10, completion_tokens=2),
+            choices=[],
+        ),
+    ]
+    create = mock_openai_client.return_value.chat.completions.create
+    create.return_value = iter(chunks)
+    USAGE.flush()
+    accessor = RemoteAIAccessor(api_key="dummy-key", prompt="dummy-prompt")
+    assert accessor.make_request("hello", stream=True) == "## Hi"
+    (record,) = USAGE.records
+    USAGE.flush()
+    assert record.streamed
+    assert record.ttft_s is not None and record.ttft_s <= record.latency_s
+    assert record.completion_tokens == 2
+
+
+def test_failed_requests_record_usage(
+    mock_openai_client: MagicMock, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+):
+    home = tmp_path / "missing-home"
+    monkeypatch.setenv("CODEXA_HOME", str(home))
+    create = mock_openai_client.return_value.chat.completions.create
+    create.side_effect = ConnectionError("unreachable")
+    USAGE.flush()
+    accessor = RemoteAIAccessor(api_key="dummy-key", prompt="dummy-prompt")
+    for stream in (False, True):
+        with pytest.raises(ConnectionError):
+            accessor.make_request("hello", stream=stream)
+    assert [(r.status, r.streamed) for r in USAGE.records] == [
+        ("error", False),
+        ("error", True),
+    ]
+    assert not home.exists()
+    assert USAGE.flush() == 2
+    (row,) = summarize(load_records(), {})
+    assert (row["requests"], row["errors"]) == (2, 2)
+
+
+def test_usage_summary_percentiles_and_cost():
+    records = [
+        UsageRecord(model="m", latency_s=float(i), prompt_tokens=1000, command="run")
+        for i in range(1, 101)
+    ]
+    prices = {"m": {"prompt": 2.0, "completion": 4.0}}
+    (row,) = summarize(records, prices)
+    assert row["requests"] == 100
+    assert (row["latency_p50"], row["latency_p95"]) == (50.0, 95.0)
+    assert row["cost_usd"] == pytest.approx(100 * estimate_cost(records[0], prices))
+    assert estimate_cost(records[0], prices) == pytest.approx(0.002)
+
+
+def test_accessors_share_pooled_connection(stub_llm_server: str):
+    accessors = [
+        RemoteAIAccessor("dummy-key", prompt="dummy", base_url=stub_llm_server)
+        for _ in range(3)
+    ]
+    for accessor in accessors:
+        assert accessor.make_request("hello") == "## Report"
+    assert _StubLLMHandler.connections == 1
+
+
+def test_registry_keys_clients_by_endpoint_and_key():
+    registry = ClientRegistry(PoolSettings(max_connections=4, http2=False))
+    first = registry.get("http://localhost/v1", "key-a")
+    assert registry.get("http://localhost/v1", "key-a") is first
+    assert registry.get("http://localhost/v1", "key-b") is not first
+    registry.close()
+    assert registry.get("http://localhost/v1", "key-a") is not first
+    registry.close()
+
+
+PRIMARY = EndpointTarget("http://primary/v1", "slow-model")
+SECONDARY = EndpointTarget("http://secondary/v1", "fast-model")
+
+
+def test_hedged_call_takes_first_response_and_cancels_rest():
+    def call(attempt: Attempt) -> str:
+        if attempt.target is PRIMARY:
+            attempt.cancelled.wait(5)
+            return "late"
+        return "fast"
+
+    started = time.perf_counter()
+    result = hedged_call([PRIMARY, SECONDARY], call, delay=0.05)
+    assert result == "fast"
+    assert time.perf_counter() - started < 2
+
+
+def test_hedged_call_waits_for_streaming_primary():
+    def call(attempt: Attempt) -> str:
+        if attempt.target is SECONDARY:
+            raise AssertionError("should not hedge a streaming request")
+        attempt.first_token.set()
+        time.sleep(0.2)
+        return "primary"
+
+    assert hedged_call([PRIMARY, SECONDARY], call, delay=0.05) == "primary"
+
+
+def test_hedged_call_falls_back_and_opens_circuit():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after_s=60)
+    calls = []
+
+    def call(attempt: Attempt) -> str:
+        calls.append(attempt.target)
+        if attempt.target is PRIMARY:
+            raise ConnectionError("unreachable")
+        return "ok"
+
+    for _ in range(3):
+        assert hedged_call([PRIMARY, SECONDARY], call, 10, breaker) == "ok"
+    assert calls == [PRIMARY, SECONDARY, PRIMARY, SECONDARY, SECONDARY]
+    assert not breaker.allow(PRIMARY)
+
+
+def test_hedged_call_checks_health_only_of_tried_endpoints():
+    breaker = CircuitBreaker(failure_threshold=1, reset_after_s=0.2)
+    breaker.record_failure(SECONDARY)
+    time.sleep(0.25)
+    assert hedged_call([PRIMARY, SECONDARY], lambda a: "ok", 10, breaker) == "ok"
+    # The secondary was never tried, so its half-open trial is still unused
+    calls = []
+
+    def call(attempt: Attempt) -> str:
+        calls.append(attempt.target)
+        if attempt.target is PRIMARY:
+            raise ConnectionError("unreachable")
+        return "ok"
+
+    assert hedged_call([PRIMARY, SECONDARY], call, 10, breaker) == "ok"
+    assert calls == [PRIMARY, SECONDARY]
+
+
+def test_hedged_call_all_endpoints_failing():
+    def call(attempt: Attempt) -> str:
+        raise ConnectionError(f"{attempt.target.model} down")
+
+    with pytest.raises(CodexaAccessorError, match="All LLM endpoints failed"):
+        hedged_call([PRIMARY, SECONDARY], call, 10, CircuitBreaker())
+
+
+def test_hedge_delay_reads_usage_history_once_per_change(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    loads = []
+    monkeypatch.setattr(
+        hedging, "load_records", lambda path: loads.append(path) or load_records(path)
+    )
+    policy = HedgePolicy(targets=(PRIMARY, SECONDARY))
+    path = get_metrics_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = UsageRecord(model=PRIMARY.model, latency_s=9.0, ttft_s=3.0)
+    path.write_text(json.dumps(record.to_dict()) + "\n")
+    assert policy.delay() == policy.delay() == DEFAULT_HEDGE_DELAY_S
+    assert len(loads) == 1
+    with open(path, "a") as f:
+        f.write((json.dumps(record.to_dict()) + "\n") * 4)
+    assert policy.delay() == 3.0
+    assert len(loads) == 2
+
+
+def test_hedge_policy_from_config_and_delay():
+    config = {
+        "llm": {
+            "endpoints": [
+                {"base_url": PRIMARY.base_url, "model": PRIMARY.model},
+                {"base_url": SECONDARY.base_url, "model": SECONDARY.model},
+            ]
+        }
+    }
+    policy = HedgePolicy.from_config(config)
+    assert policy.targets == (PRIMARY, SECONDARY)
+    assert policy.delay([]) == DEFAULT_HEDGE_DELAY_S
+    records = [
+        UsageRecord(model=PRIMARY.model, latency_s=9.0, ttft_s=float(i))
+        for i in range(1, 21)
+    ]
+    assert policy.delay(records) == 19.0
+    assert policy.delay(records, model=SECONDARY.model) == DEFAULT_HEDGE_DELAY_S
+    assert (
+        HedgePolicy.from_config({"llm": {"endpoints": config["llm"]["endpoints"][:1]}})
+        is None
+    )
+
+
+SMALL_DIFF = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+-x = 1
++x = 2
+"""
+
+
+def test_input_profile_from_diff():
+    profile = InputProfile.from_diff(SMALL_DIFF)
+    assert profile.files_touched == 1
+    assert profile.diff_lines == 2
+    assert profile.tokens == estimate_tokens(SMALL_DIFF)
+
+
+def test_model_router_thresholds():
+    router = ModelRouter.from_config(
+        {"llm": {"routing": {"fast_model": "fast", "max_diff_lines": 10}}}
+    )
+    assert router.route(InputProfile.from_diff(SMALL_DIFF), "large").model == "fast"
+    decision = router.route(InputProfile(tokens=10, diff_lines=50), "large")
+    assert decision.tier == "large"
+    assert decision.model == "large"
+    assert decision.reason == "diff lines 50 > 10"
+    assert ModelRouter.from_config({}) is None
+
+
+def test_analyzer_routes_and_logs_decision(
+    mock_openai_client: MagicMock, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    config_file = tmp_path / "codexa.yaml"
+    config_file.write_text("llm:\n  routing:\n    fast_model: openai/gpt-4o-mini\n")
+    monkeypatch.setenv("CODEXA_CONFIG", str(config_file))
+
+    RepoAnalyzer(api_key="dummy-key").compare_diff(SMALL_DIFF)
+    create = mock_openai_client.return_value.chat.completions.create
+    assert create.call_args.kwargs["model"] == "openai/gpt-4o-mini"
+    records = [json.loads(line) for line in get_routing_log().read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]["tier"] == "fast"
+    assert records[0]["files_touched"] == 1
+    assert records[0]["ok"] is True
+
+
+def _long_test_output(passes: int) -> str:
+    progress = "".join(
+        f"tests/test_app.py::test_ok_{i} PASSED\n" for i in range(passes)
+    )
+    return (
+        "============================= test session starts ==============================\n"
+        + progress
+        + "=================================== FAILURES ===================================\n"
+        "___________________________________ test_bad ___________________________________\n"
+        "    def test_bad():\n>       assert 1 == 2\nE       assert 1 == 2\n"
+        "=========================== short test summary info ============================\n"
+        "FAILED tests/test_app.py::test_bad - assert 1 == 2\n"
+        f"========================= 1 failed, {passes} passed in 0.50s =========================\n"
+    )
+
+
+def test_context_window_lookup():
+    assert context_window("deepseek/deepseek-r1:free") == 163840
+    assert context_window("gpt-4o-mini") == 128000
+    assert context_window("acme/unknown") == DEFAULT_CONTEXT_WINDOW
+    assert context_window("acme/unknown", {"acme/unknown": 4000}) == 4000
+    assert prompt_budget(["openai/gpt-4o", "acme/unknown"]) < prompt_budget(
+        ["openai/gpt-4o"]
+    )
+
+
+def test_pack_test_output_keeps_failures_first():
+    test_output = _long_test_output(passes=2000)
+    packed = pack_test_output(test_output, budget=1000)
+    assert packed.tokens <= 1000
+    assert packed.text.startswith("=" * 27 + " short test summary info")
+    assert ">       assert 1 == 2" in packed.text
+    assert packed.truncated == ["test session starts"]
+    assert "Truncated: test session starts" in packed.text
+    short_output = _long_test_output(passes=2)
+    packed = pack_test_output(short_output, budget=1000)
+    assert packed.complete
+    assert packed.text == short_output
+
+
+def test_pack_diff_prefers_source_changes():
+    def patch(path: str, lines: int) -> str:
+        body = "".join(f"+line {i}\n" for i in range(lines))
+        return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n{body}"
+
+    diff = (
+        patch("README.md", 400) + patch("tests/test_app.py", 20) + patch("app.py", 20)
+    )
+    packed = pack_diff(diff, budget=600)
+    assert packed.text.index("b/app.py") < packed.text.index("b/tests/test_app.py")
+    assert packed.truncated == ["README.md"]
+    assert packed.tokens <= 600
+
+
+def test_analyze_tests_fits_context_window(
+    mock_openai_client: MagicMock, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    config_file = tmp_path / "codexa.yaml"
+    config_file.write_text("llm:\n  context_windows:\n    deepseek/deepseek-r1: 8000\n")
+    monkeypatch.setenv("CODEXA_CONFIG", str(config_file))
+
+    scanner = ReportScanner(api_key="dummy-key")
+    scanner.analyze_tests(_long_test_output(passes=5000))
+    create = mock_openai_client.return_value.chat.completions.create
+    message = create.call_args.kwargs["messages"][1]["content"]
+    assert estimate_tokens(message) + estimate_tokens(scanner.setup_prompt) < 8000
+    assert "FAILED tests/test_app.py::test_bad" in message
+    assert "Truncated: test session starts" in message
+
+
+def test_analyze_failures_packs_appendix_after_failures(
+    mock_openai_client: MagicMock,
+):
+    failure = TestResult(
+        node_id="tests/test_app.py::test_bad",
+        outcome="failed",
+        longrepr="AssertionError: boom",
+    )
+    scanner = ReportScanner(api_key="dummy-key")
+    scanner.analyze_failures([failure], appendix="## Test Profile\n\nsetup: 4.20s")
+    create = mock_openai_client.return_value.chat.completions.create
+    message = create.call_args.kwargs["messages"][1]["content"]
+    assert message.index("AssertionError: boom") < message.index("setup: 4.20s")
@@ -1,5 +1,16 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from codexa.client.executor import TestExecutor
+from codexa.client.sharding import ShardArtifact
+from codexa.client.usage import UsageRecord
+from codexa.core.errors import CodexaExecutionError
 from tests.tools import CommandRunner, verify_cli_output
 
+TESTS_FAILED_EXIT_CODE = CodexaExecutionError("").exit_code
+
 
 class TestBaseCommands:
     """Test the base CLI commands."""
@@ -8,6 +19,23 @@ class TestBaseCommands:
         result = runner.run_cli(["--help"])
         assert result.exit_code == 0
 
+    def test_profile_writes_trace(self, runner: CommandRunner, tmp_path: Path):
+        (tmp_path / "test_profiled.py").write_text("def test_ok():\n    pass\n")
+        trace_file = tmp_path / "trace.json"
+        result = runner.run_cli(
+            [
+                "--profile",
+                "--profile-output",
+                str(trace_file),
+                "list",
+                "-b",
+                str(tmp_path),
+            ]
+        )
+        verify_cli_output(result, 0, expected_stderr="executor.collect")
+        names = {e["name"] for e in json.loads(trace_file.read_text())["traceEvents"]}
+        assert {"cli.list", "executor.collect"} <= names
+
 
 class TestRunCommand:
     """Test the execution and report generation."""
@@ -17,3 +45,227 @@ class TestRunCommand:
         verify_cli_output(
             result, 2, expected_stderr="Output file must be a Markdown file, got .txt"
         )
+
+    def test_rerun_failures_classifies_flaky_tests(
+        self, runner: CommandRunner, tmp_path: Path
+    ):
+        marker = tmp_path / "ran-once"
+        (tmp_path / "test_rerun.py").write_text(
+            "from pathlib import Path\n\n"
+            "def test_flaky():\n"
+            f"    marker = Path({str(marker)!r})\n"
+            "    first_run = not marker.exists()\n"
+            "    marker.touch()\n"
+            "    assert not first_run\n\n"
+            "def test_broken():\n"
+            "    assert 1 == 2\n"
+        )
+        report = tmp_path / "report.md"
+        result = runner.run_cli(
+            ["run", str(tmp_path), "-q", "-o", str(report)]
+            + ["--rerun-failures", "2", "--escalation", "never"]
+        )
+        verify_cli_output(
+            result, TESTS_FAILED_EXIT_CODE, expected_stdout="Test summary generated"
+        )
+        text = report.read_text()
+        assert "## Flaky Tests" in text
+        assert "`test_rerun.py::test_flaky`: passed 2 of 2 reruns" in text
+        assert "failed all 2 reruns (deterministic)" in text
+
+    def test_run_fails_on_exit_code_without_failed_results(
+        self,
+        runner: CommandRunner,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        # A backend losing its JUnit report yields no results for the failure
+        monkeypatch.setattr(
+            TestExecutor,
+            "run",
+            lambda self, verbose=False: (
+                pytest.ExitCode.TESTS_FAILED,
+                "FAILED test_lost.py::test_lost\n1 failed in 0.01s",
+                "",
+            ),
+        )
+        report = tmp_path / "report.md"
+        result = runner.run_cli(
+            ["run", str(tmp_path), "-q", "-o", str(report), "--escalation", "never"]
+        )
+        verify_cli_output(
+            result, TESTS_FAILED_EXIT_CODE, expected_stderr="without a failed test"
+        )
+        text = report.read_text()
+        assert "- **Result**: FAILED" in text
+        assert "## Unreported Failures" in text
+        assert "FAILED test_lost.py::test_lost" in text
+
+    def test_profile_tests_ranks_fixtures(self, runner: CommandRunner, tmp_path: Path):
+        (tmp_path / "test_phased.py").write_text(
+            "import time\n\nimport pytest\n\n"
+            "@pytest.fixture\n"
+            "def slow_resource():\n"
+            "    time.sleep(0.1)\n"
+            "    return 1\n\n"
+            "def test_first(slow_resource):\n"
+            "    data = [0] * 100_000\n"
+            "    assert slow_resource\n\n"
+            "def test_second(slow_resource):\n"
+            "    assert slow_resource\n"
+        )
+        profile_file = tmp_path / "phases.json"
+        report = tmp_path / "report.md"
+        result = runner.run_cli(
+            ["run", str(tmp_path), "-q", "-o", str(report), "--escalation", "never"]
+            + ["--profile-tests", "--profile-memory"]
+            + ["--profile-tests-output", str(profile_file)]
+        )
+        verify_cli_output(result, 0, expected_stdout="Test summary generated")
+        profile = json.loads(profile_file.read_text())
+        fixture = profile["expensive_fixtures"][0]
+        assert (fixture["name"], fixture["scope"], fixture["setups"]) == (
+            "slow_resource",
+            "function",
+            2,
+        )
+        assert fixture["scope_hint"] is True
+        assert profile["slowest_tests"][0]["setup"] >= 0.1
+        assert profile["biggest_allocators"][0]["node_id"].endswith("test_first")
+        text = report.read_text()
+        assert "### Most Expensive Fixtures" in text
+        assert "consider a wider scope" in text
+
+
+class TestShardedRun:
+    """Test sharded execution and merging of the shard artifacts."""
+
+    def test_shards_merge_into_single_report(
+        self, runner: CommandRunner, tmp_path: Path
+    ):
+        (tmp_path / "test_sharded.py").write_text(
+            "def test_one():\n    pass\n\n"
+            "def test_two():\n    assert 1 == 2\n\n"
+            "def test_three():\n    pass\n"
+        )
+        durations = tmp_path / "durations.json"
+        durations.write_text(json.dumps({}))
+        artifacts = [tmp_path / f"shard-{i}.json" for i in (1, 2)]
+        for index, artifact in enumerate(artifacts, start=1):
+            result = runner.run_cli(
+                ["run", str(tmp_path), "-q", "--shard", f"{index}/2"]
+                + ["--artifact", str(artifact), "--durations", str(durations)]
+            )
+            verify_cli_output(result, 0, expected_stdout=f"Shard {index}/2 complete")
+        shard_ids = [
+            {r["node_id"] for r in json.loads(a.read_text())["results"]}
+            for a in artifacts
+        ]
+        assert not shard_ids[0] & shard_ids[1]
+        assert len(shard_ids[0] | shard_ids[1]) == 3
+
+        report = tmp_path / "report.md"
+        result = runner.run_cli(
+            ["merge", *map(str, artifacts), "-o", str(report), "--escalation", "never"]
+            + ["--durations", str(durations)]
+        )
+        verify_cli_output(
+            result, TESTS_FAILED_EXIT_CODE, expected_stdout="Test summary generated"
+        )
+        text = report.read_text()
+        assert "**Tests**: 3 (1 failed, 2 passed)" in text
+        assert "test_sharded.py::test_two" in text
+        assert len(json.loads(durations.read_text())) == 3
+
+    def test_merge_fails_on_shard_exit_code_without_results(
+        self, runner: CommandRunner, tmp_path: Path
+    ):
+        artifacts = []
+        for index, exit_code in ((1, 0), (2, 1)):
+            artifact = tmp_path / f"shard-{index}.json"
+            ShardArtifact(
+                index,
+                2,
+                exit_code,
+                summary=f"shard {index} output",
+                digest="aaa",
+                node_ids=[f"a.py::t{index}"],
+                collected=2,
+            ).write(artifact)
+            artifacts.append(str(artifact))
+        report = tmp_path / "report.md"
+        result = runner.run_cli(
+            ["merge", *artifacts, "-o", str(report), "--escalation", "never"]
+        )
+        verify_cli_output(
+            result, TESTS_FAILED_EXIT_CODE, expected_stderr="exited with code 1"
+        )
+        text = report.read_text()
+        assert "## Unreported Failures" in text
+        assert "shard 2 output" in text
+
+    def test_merge_rejects_mismatched_shards(
+        self, runner: CommandRunner, tmp_path: Path
+    ):
+        artifacts = []
+        for index, total in ((1, 2), (1, 3)):
+            artifact = tmp_path / f"shard-{index}-{total}.json"
+            ShardArtifact(index, total, 0).write(artifact)
+            artifacts.append(str(artifact))
+        result = runner.run_cli(["merge", *artifacts])
+        verify_cli_output(result, 2, expected_stderr="disagree on the shard count")
+
+    @pytest.mark.parametrize(
+        "shards, expected",
+        [
+            (
+                [(1, "aaa", ["a.py::t1"]), (2, "bbb", ["a.py::t2"])],
+                "partitioned from different inputs",
+            ),
+            ([(1, "aaa", ["a.py::t1"])], "Missing the artifacts of shard(s) [2]"),
+            (
+                [(1, "aaa", ["a.py::t1"]), (2, "aaa", ["a.py::t1"])],
+                "Shards cover 1 of 2 collected tests, 1 more than once",
+            ),
+        ],
+    )
+    def test_merge_rejects_inconsistent_shards(
+        self, runner: CommandRunner, tmp_path: Path, shards: list, expected: str
+    ):
+        artifacts = []
+        for index, digest, node_ids in shards:
+            artifact = tmp_path / f"shard-{index}.json"
+            ShardArtifact(
+                index, 2, 0, digest=digest, node_ids=node_ids, collected=2
+            ).write(artifact)
+            artifacts.append(str(artifact))
+        result = runner.run_cli(["merge", *artifacts])
+        verify_cli_output(result, 2, expected_stderr=expected)
+
+
+class TestUsageCommand:
+    """Test the LLM usage report."""
+
+    def test_usage_report(self, runner: CommandRunner, tmp_path: Path):
+        metrics = tmp_path / "usage.jsonl"
+        record = UsageRecord(model="test-model", latency_s=1.5, command="run")
+        metrics.write_text(json.dumps(record.to_dict()) + "\n")
+        result = runner.run_cli(["usage", "--metrics-file", str(metrics)])
+        verify_cli_output(result, 0, expected_stdout="test-model")
+        assert "1.50s" in result.output
+
+    def test_usage_report_empty(self, runner: CommandRunner, tmp_path: Path):
+        result = runner.run_cli(["usage", "--metrics-file", str(tmp_path / "x")])
+        verify_cli_output(result, 0, expected_stdout="No LLM usage recorded yet.")
+
+
+class TestKnowledgeCommand:
+    """Test the failure signature management."""
+
+    def test_list_empty(self, runner: CommandRunner):
+        result = runner.run_cli(["knowledge", "list"])
+        verify_cli_output(result, 0, expected_stdout="No failure signatures stored")
+
+    def test_invalidate_unknown_signature(self, runner: CommandRunner):
+        result = runner.run_cli(["knowledge", "invalidate", "deadbeef"])
+        verify_cli_output(result, 2)
@@ -0,0 +1,166 @@
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+
+from codexa.client.daemon import (
+    CodexaDaemon,
+    DaemonClient,
+    DaemonServer,
+    RemoteRepoAnalyzer,
+    RemoteReportScanner,
+)
+from codexa.client.usage import USAGE
+from codexa.core.errors import CodexaRuntimeError
+from codexa.core.profiling import PROFILER
+from tests.tools import CommandRunner, verify_cli_output
+
+
+@pytest.fixture
+def daemon_socket(monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    # Unix socket paths are length-limited, so avoid the deep pytest tmp_path
+    socket_path = Path(tempfile.mkdtemp(prefix="codexa-")) / "codexa.sock"
+    server = DaemonServer(socket_path, CodexaDaemon())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("CODEXA_SOCKET", str(socket_path))
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_client_connects_only_to_running_daemon(tmp_path: Path, daemon_socket: Path):
+    assert DaemonClient.connect(tmp_path / "missing.sock") is None
+    assert DaemonClient.connect(daemon_socket) is not None
+
+
+def test_daemon_caches_collection_until_files_change(
+    tmp_path: Path, daemon_socket: Path
+):
+    test_file = tmp_path / "test_daemon_collect.py"
+    test_file.write_text("def test_one():\n    pass\n")
+    client = DaemonClient.connect(daemon_socket)
+    first = client.collect([str(tmp_path)])
+    assert [e.name for e in first] == ["test_one"]
+    assert client.collect([str(tmp_path)]) == first
+
+    test_file.write_text("def test_one():\n    pass\n\n\ndef test_two():\n    pass\n")
+    updated = client.collect([str(tmp_path)])
+    assert [e.name for e in updated] == ["test_one", "test_two"]
+
+
+def test_daemon_collects_from_client_directory_without_stale_modules(
+    tmp_path: Path,
+):
+    (tmp_path / "daemon_cases.py").write_text("CASES = [1]\n")
+    (tmp_path / "test_daemon_cases.py").write_text(
+        "import pytest\n"
+        "from daemon_cases import CASES\n\n\n"
+        "@pytest.mark.parametrize('case', CASES)\n"
+        "def test_case(case):\n    pass\n"
+    )
+    daemon = CodexaDaemon()
+    assert len(daemon.collect(["test_daemon_cases.py"], cwd=str(tmp_path))) == 1
+    (tmp_path / "daemon_cases.py").write_text("CASES = [1, 2, 3]\n")
+    (tmp_path / "test_daemon_cases.py").touch()
+    assert len(daemon.collect(["test_daemon_cases.py"], cwd=str(tmp_path))) == 3
+
+
+def test_daemon_collects_without_changing_its_directory(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    (tmp_path / "test_daemon_cwd.py").write_text("def test_one():\n    pass\n")
+
+    def chdir(path: str) -> None:
+        raise AssertionError(f"daemon changed its directory to {path}")
+
+    monkeypatch.setattr(os, "chdir", chdir)
+    entries = CodexaDaemon().collect(["test_daemon_cwd.py"], cwd=str(tmp_path))
+    assert [e["name"] for e in entries] == ["test_one"]
+
+
+def test_daemon_rejects_malformed_requests(daemon_socket: Path):
+    assert stat.S_IMODE(daemon_socket.stat().st_mode) == 0o600
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(str(daemon_socket))
+        conn.sendall(b"not json\n")
+        with conn.makefile("rb") as stream:
+            response = json.loads(stream.readline())
+    assert not response["ok"]
+    assert "Malformed daemon request" in response["error"]["message"]
+    assert DaemonClient.connect(daemon_socket) is not None
+
+
+def test_daemon_returns_usage_to_client(
+    daemon_socket: Path,
+    mock_openai_client: MagicMock,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(USAGE, "command", "run")
+    USAGE.flush()
+    scanner = RemoteReportScanner(DaemonClient.connect(daemon_socket), "dummy-key")
+    scanner.analyze_tests("1 passed")
+    assert [r.command for r in USAGE.records] == ["run"]
+    USAGE.flush()
+
+
+def test_daemon_returns_spans_to_profiling_client(tmp_path: Path, daemon_socket: Path):
+    (tmp_path / "test_daemon_spans.py").write_text("def test_one():\n    pass\n")
+    client = DaemonClient.connect(daemon_socket)
+    PROFILER.enable()
+    try:
+        client.collect([str(tmp_path)])
+    finally:
+        PROFILER.disable()
+    spans = [s for s in PROFILER.spans if s.name == "executor.collect"]
+    assert len(spans) == 1 and spans[0].start_ns >= 0
+
+
+def test_daemon_forwards_errors(tmp_path: Path, daemon_socket: Path):
+    client = DaemonClient.connect(daemon_socket)
+    with pytest.raises(CodexaRuntimeError, match="Failed to get git diff"):
+        client.call("git_diffs", refs=["origin/main"], repo_path=str(tmp_path))
+
+
+def test_daemon_applies_client_configuration(
+    tmp_path: Path,
+    daemon_socket: Path,
+    mock_openai_client: MagicMock,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    client = DaemonClient.connect(daemon_socket)
+    create = mock_openai_client.return_value.chat.completions.create
+    RemoteRepoAnalyzer(client, "dummy-key").compare_diff("+x = 1\n")
+    assert create.call_args.kwargs["model"] == "deepseek/deepseek-r1:free"
+
+    config_file = tmp_path / "codexa.yaml"
+    config_file.write_text("llm:\n  routing:\n    fast_model: openai/gpt-4o-mini\n")
+    monkeypatch.setenv("CODEXA_CONFIG", str(config_file))
+    analyzer = RemoteRepoAnalyzer(client, "dummy-key")
+    # Only the client reads the configuration
+    monkeypatch.delenv("CODEXA_CONFIG")
+    analyzer.compare_diff("+x = 1\n")
+    assert create.call_args.kwargs["model"] == "openai/gpt-4o-mini"
+
+
+def test_daemon_reuses_accessor(daemon_socket: Path, mock_openai_client: MagicMock):
+    scanner = RemoteReportScanner(DaemonClient.connect(daemon_socket), "dummy-key")
+    assert "## Summary" in scanner.analyze_tests("1 passed")
+    assert "## Summary" in scanner.analyze_tests("2 passed")
+    mock_openai_client.assert_called_once()
+
+
+def test_list_command_uses_daemon(
+    runner: CommandRunner, tmp_path: Path, daemon_socket: Path
+):
+    (tmp_path / "test_daemon_list.py").write_text("def test_listed():\n    pass\n")
+    result = runner.run_cli(["list", "-b", str(tmp_path)])
+    verify_cli_output(result, 0, expected_stdout="test_daemon_list.py::test_listed")
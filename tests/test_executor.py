@@ -1,6 +1,24 @@
 from pathlib import Path
+from unittest.mock import MagicMock
 
+import pytest
+
+from codexa.client.containers import (
+    DEPENDENCY_LABEL,
+    LEASE_DIR,
+    ContainerPool,
+    DockerBackend,
+    build_manifest,
+)
 from codexa.client.executor import TestExecutor
+from codexa.client.results import TestResult
+from codexa.client.sharding import (
+    load_durations,
+    parse_shard,
+    partition,
+    record_durations,
+)
+from codexa.core.errors import CodexaExecutionError, CodexaInputError
 
 
 def test_executor_collect_all_tests(tmp_path: Path, mock_pytest_file: Path):
@@ -10,3 +28,204 @@ def test_executor_collect_all_tests(tmp_path: Path, mock_pytest_file: Path):
         "test_example.py::test_foo",
         "test_example.py::TestBar::test_bar",
     ]
+
+
+def _mock_container(output: bytes = b"", labels: dict = None) -> MagicMock:
+    container = MagicMock(status="running", short_id="abc123", labels=labels or {})
+    container.exec_run.return_value = MagicMock(exit_code=0, output=output)
+    return container
+
+
+def test_container_pool_reuses_running_containers(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    pool = ContainerPool(mock_docker_client, "python:3.12", size=1)
+    mock_docker_client.containers.run.return_value = _mock_container()
+    first = pool.acquire(tmp_path)
+    labels = mock_docker_client.containers.run.call_args.kwargs["labels"]
+
+    reused = _mock_container(labels=labels)
+    mock_docker_client.containers.list.return_value = [reused]
+    second = pool.acquire(tmp_path)
+    assert len(first) == 1
+    assert second == [reused]
+    mock_docker_client.containers.run.assert_called_once()
+
+
+def test_container_pool_retires_outdated_containers(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    outdated = _mock_container(labels={DEPENDENCY_LABEL: "old-digest"})
+    mock_docker_client.containers.list.return_value = [outdated]
+    mock_docker_client.containers.run.return_value = _mock_container()
+    pool = ContainerPool(mock_docker_client, "python:3.12", size=1)
+    pool.acquire(tmp_path)
+    outdated.remove.assert_called_once_with(force=True)
+    mock_docker_client.containers.run.assert_called_once()
+
+
+def test_container_pool_skips_containers_leased_by_other_runs(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    pool = ContainerPool(mock_docker_client, "python:3.12", size=1)
+    mock_docker_client.containers.run.return_value = _mock_container()
+    pool.acquire(tmp_path)
+    labels = mock_docker_client.containers.run.call_args.kwargs["labels"]
+
+    busy = _mock_container(labels=labels)
+    busy.exec_run.return_value = MagicMock(exit_code=1, output=b"")
+    fresh = _mock_container()
+    mock_docker_client.containers.list.return_value = [busy]
+    mock_docker_client.containers.run.return_value = fresh
+    assert pool.acquire(tmp_path) == [fresh]
+    busy.remove.assert_not_called()
+
+    pool.release([fresh])
+    fresh.exec_run.assert_called_with(["rm", "-rf", LEASE_DIR])
+
+
+def test_container_pool_releases_leases_when_a_start_fails(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    pool = ContainerPool(
+        mock_docker_client, "python:3.12", size=2, install_command="pip install ."
+    )
+    mock_docker_client.containers.run.return_value = _mock_container()
+    pool.acquire(tmp_path)
+    labels = mock_docker_client.containers.run.call_args.kwargs["labels"]
+
+    reused = _mock_container(labels=labels)
+    broken = _mock_container()
+    broken.exec_run.side_effect = [
+        MagicMock(exit_code=0, output=b""),
+        MagicMock(exit_code=1, output=b"No matching distribution"),
+    ]
+    mock_docker_client.containers.list.return_value = [reused]
+    mock_docker_client.containers.run.return_value = broken
+    with pytest.raises(CodexaExecutionError, match="Dependency install failed"):
+        pool.acquire(tmp_path)
+    reused.exec_run.assert_called_with(["rm", "-rf", LEASE_DIR])
+    broken.remove.assert_called_once_with(force=True)
+
+
+def test_docker_backend_syncs_only_changed_files(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    (tmp_path / "same.py").write_text("x = 1\n")
+    (tmp_path / "changed.py").write_text("x = 2\n")
+    manifest = build_manifest(tmp_path)
+    remote_listing = (
+        f"{manifest['same.py']}  ./same.py\n"
+        f"{'0' * 40}  ./changed.py\n"
+        f"{'1' * 40}  ./leftover.txt\n"
+    ).encode()
+    container = _mock_container(output=remote_listing)
+    backend = DockerBackend(
+        "python:3.12", source_dir=tmp_path, client=mock_docker_client
+    )
+    copied, deleted = backend.sync(container, manifest)
+    assert (copied, deleted) == (1, 1)
+    container.exec_run.assert_any_call(
+        ["rm", "-f", "--", "leftover.txt"], workdir="/workspace"
+    )
+    container.put_archive.assert_called_once()
+
+
+def test_docker_backend_deletes_stale_files_in_batches(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    stale = [f"{'x' * 200}_{i}.txt" for i in range(1000)]
+    listing = "".join(f"{'1' * 40}  ./{path}\n" for path in stale).encode()
+    container = _mock_container(output=listing)
+    backend = DockerBackend(
+        "python:3.12", source_dir=tmp_path, client=mock_docker_client
+    )
+    assert backend.sync(container, {}) == (0, len(stale))
+    batches = [
+        call.args[0][3:]
+        for call in container.exec_run.call_args_list
+        if call.args[0][:3] == ["rm", "-f", "--"]
+    ]
+    assert len(batches) > 1
+    assert sum(batches, []) == stale
+
+
+def test_docker_backend_shards_across_containers(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    containers = [_mock_container(), _mock_container()]
+    mock_docker_client.containers.run.side_effect = containers
+    collected = b"test_a.py::test_1\ntest_a.py::test_2\ntest_b.py::test_3\n"
+    for container in containers:
+        container.exec_run.side_effect = lambda cmd, **kwargs: (
+            MagicMock(exit_code=0, output=(b"passed", b""))
+            if kwargs.get("demux")
+            else MagicMock(exit_code=0, output=collected)
+        )
+    backend = DockerBackend(
+        "python:3.12", workers=2, source_dir=tmp_path, client=mock_docker_client
+    )
+    exit_code, shell_output, _ = backend.run([])
+    assert exit_code == 0
+    assert "shard 2/2" in shell_output
+    shards = [
+        [arg for arg in call.args[0] if "::" in arg]
+        for container in containers
+        for call in container.exec_run.call_args_list
+        if call.kwargs.get("demux")
+    ]
+    assert sorted(shards) == [
+        ["test_a.py::test_1", "test_b.py::test_3"],
+        ["test_a.py::test_2"],
+    ]
+
+
+def test_docker_backend_uses_fresh_junit_report_per_run(
+    tmp_path: Path, mock_docker_client: MagicMock
+):
+    container = _mock_container()
+    container.exec_run.side_effect = lambda cmd, **kwargs: MagicMock(
+        exit_code=0, output=(b"", b"") if kwargs.get("demux") else b""
+    )
+    mock_docker_client.containers.run.return_value = container
+    backend = DockerBackend(
+        "python:3.12", workers=1, source_dir=tmp_path, client=mock_docker_client
+    )
+    backend.run(["test_a.py"])
+    backend.run(["test_a.py"])
+    reports = [
+        call.args[0][1]
+        for call in container.exec_run.call_args_list
+        if call.args[0][0] == "cat"
+    ]
+    removed = [
+        call.args[0][-1]
+        for call in container.exec_run.call_args_list
+        if call.args[0][:2] == ["rm", "-f"]
+    ]
+    assert len(set(reports)) == 2
+    assert set(reports) <= set(removed)
+
+
+def test_partition_is_deterministic_and_balanced():
+    node_ids = [f"test_mod.py::test_{i}" for i in range(7)]
+    durations = {node_ids[0]: 8.0, node_ids[1]: 4.0, node_ids[2]: 4.0}
+    shards = partition(node_ids, 2, durations)
+    assert shards == partition(list(node_ids), 2, dict(durations))
+    assert sorted(sum(shards, [])) == sorted(node_ids)
+    loads = [sum(durations.get(n, 4.0) for n in shard) for shard in shards]
+    assert loads[0] == loads[1]
+    assert all(shard == sorted(shard, key=node_ids.index) for shard in shards)
+
+
+@pytest.mark.parametrize("spec", ["3", "0/2", "3/2", "a/b"])
+def test_parse_shard_rejects_invalid_specs(spec: str):
+    with pytest.raises(CodexaInputError):
+        parse_shard(spec)
+
+
+def test_record_durations_merges_runs(tmp_path: Path):
+    path = tmp_path / "durations.json"
+    record_durations([TestResult("a.py::test_a", "passed", duration=1.0)], path)
+    record_durations([TestResult("a.py::test_b", "failed", duration=2.0)], path)
+    assert load_durations(path) == {"a.py::test_a": 1.0, "a.py::test_b": 2.0}
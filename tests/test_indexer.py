@@ -0,0 +1,243 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from git import Repo
+
+from codexa.client.executor import TestcaseMetadata, TestExecutor
+from codexa.client.indexer import RepositoryIndex, changed_lines
+from codexa.client.versioning import DiffSession
+from codexa.commands.compare import repository_context
+from tests.tools import CommandRunner, verify_cli_output
+
+CORE_SOURCE = '''def add(a, b):
+    """Add two numbers."""
+    return a + b
+
+
+class Calculator:
+    def total(self, values):
+        result = 0
+        for value in values:
+            result = add(result, value)
+        return result
+'''
+
+TEST_SOURCE = """from pkg.core import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+
+
+def helper():
+    return add(0, 0)
+"""
+
+ADD_DIFF = """diff --git a/pkg/core.py b/pkg/core.py
+--- a/pkg/core.py
++++ b/pkg/core.py
+@@ -1,3 +1,3 @@
+ def add(a, b):
+     \"\"\"Add two numbers.\"\"\"
+-    return a - b
++    return a + b
+"""
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    root = tmp_path / "project"
+    (root / "pkg").mkdir(parents=True)
+    (root / "tests").mkdir()
+    (root / "pkg" / "core.py").write_text(CORE_SOURCE)
+    (root / "tests" / "test_indexer_core.py").write_text(TEST_SOURCE)
+    return root
+
+
+def test_changed_lines_maps_hunks_to_new_file():
+    assert changed_lines(ADD_DIFF) == {"pkg/core.py": {3}}
+
+
+def test_index_context_lists_callers_and_tests(project: Path):
+    index = RepositoryIndex(project)
+    index.update()
+    context = index.context_for_diff(ADD_DIFF)
+    assert "`pkg/core.py::add` (function, lines 1-3): `def add(a, b)` - Add" in context
+    assert "Callers: `pkg/core.py::Calculator.total`" in context
+    assert "`tests/test_indexer_core.py::helper`" in context
+    assert "Tests: `tests/test_indexer_core.py::test_add`" in context
+
+    index.link_tests(
+        [
+            TestcaseMetadata(
+                node_id="tests/test_indexer_core.py::test_add",
+                name="test_add",
+                file="tests/test_indexer_core.py",
+                line_number=3,
+                keywords=[],
+                function="test_add",
+                path=str(project / "tests" / "test_indexer_core.py"),
+            )
+        ]
+    )
+    assert [s.key for s in index.tests_for(index.changed_symbols(ADD_DIFF)[0])] == [
+        "tests/test_indexer_core.py::test_add"
+    ]
+
+
+def test_index_resolves_references_through_imports(tmp_path: Path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "jobs.py").write_text(
+        "class Job:\n"
+        "    def run(self):\n        return self.prepare()\n\n"
+        "    def prepare(self):\n        return 1\n\n\n"
+        "class Task:\n"
+        "    def run(self):\n        return 2\n"
+    )
+    (tmp_path / "pkg" / "api.py").write_text(
+        "from pkg import jobs\n"
+        "from .jobs import Task as Work\n\n\n"
+        "def start(job):\n    return job.run()\n\n\n"
+        "def build():\n    return jobs.Job()\n\n\n"
+        "def make():\n    return Work()\n"
+    )
+    index = RepositoryIndex(tmp_path)
+    index.update()
+    symbols = {s.qualname: s for s in index.symbols}
+
+    def callers(qualname: str):
+        return [s.key for s in index.callers(symbols[qualname])]
+
+    assert callers("Job") == ["pkg/api.py::build"]
+    assert callers("Task") == ["pkg/api.py::make"]
+    assert callers("Job.prepare") == ["pkg/jobs.py::Job.run"]
+    # Only called on an unknown object, and defined by both classes
+    assert callers("Job.run") == []
+
+
+def test_index_links_tests_of_nested_classes(tmp_path: Path):
+    (tmp_path / "test_nested.py").write_text(
+        "class TestOuter:\n"
+        "    class TestInner:\n"
+        "        def test_inner(self):\n            pass\n"
+    )
+    index = RepositoryIndex(tmp_path)
+    index.update()
+    index.link_tests(
+        [
+            TestcaseMetadata(
+                node_id="test_nested.py::TestOuter::TestInner::test_inner",
+                name="test_inner",
+                file="test_nested.py",
+                line_number=2,
+                keywords=[],
+                cls="TestInner",
+                function="test_inner",
+                path=str(tmp_path / "test_nested.py"),
+            )
+        ]
+    )
+    (symbol,) = [s for s in index.symbols if s.name == "test_inner"]
+    assert index.is_test(symbol)
+
+
+def test_index_reads_changed_symbols_from_diffed_source(project: Path):
+    (project / "pkg" / "core.py").write_text("import os\n\n\n" + CORE_SOURCE)
+    index = RepositoryIndex(project)
+    index.update()
+    assert index.changed_symbols(ADD_DIFF) == []
+    changed = index.changed_symbols(ADD_DIFF, {"pkg/core.py": CORE_SOURCE})
+    assert [s.key for s in changed] == ["pkg/core.py::add"]
+
+
+def test_index_keeps_linked_tests_until_test_files_change(project: Path):
+    index = RepositoryIndex(project)
+    index.update()
+    assert not index.has_linked_tests()
+    index.link_tests([], "tests")
+    index.save()
+
+    reloaded = RepositoryIndex(project)
+    assert reloaded.has_linked_tests("tests")
+    assert not reloaded.has_linked_tests()
+    (project / "tests" / "conftest.py").write_text("")
+    reloaded.update()
+    assert not reloaded.has_linked_tests("tests")
+
+
+def test_index_updates_incrementally(project: Path):
+    assert RepositoryIndex(project).update() == 2
+    index = RepositoryIndex(project)
+    assert index.update() == 0
+    assert len(index.symbols) == 5
+
+    (project / "pkg" / "core.py").write_text(
+        CORE_SOURCE + "\n\ndef sub(a, b):\n    return a - b\n"
+    )
+    (project / "tests" / "test_indexer_core.py").unlink()
+    assert index.update() == 1
+    assert {s.path for s in index.symbols} == {"pkg/core.py"}
+
+
+def test_compare_attaches_repository_context(
+    runner: CommandRunner,
+    feature_repo: Repo,
+    mock_openai_client: MagicMock,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv("CODEXA_API_KEY", "dummy-key")
+    monkeypatch.setenv("CODEXA_NO_DAEMON", "1")
+    work = Path(feature_repo.working_dir)
+    (work / "lib" / "util.py").write_text("def scale(y):\n    return y * 2\n")
+    feature_repo.index.add(["lib/util.py"])
+    feature_repo.index.commit("Add scale")
+
+    result = runner.run_cli(
+        ["compare", "-d", str(work), "-q", "-o", str(tmp_path / "report.md")]
+    )
+    verify_cli_output(result, 0)
+    create = mock_openai_client.return_value.chat.completions.create
+    message = create.call_args.kwargs["messages"][1]["content"]
+    assert "# Repository Context" in message
+    assert "`lib/util.py::scale` (function, lines 1-2)" in message
+
+
+def test_compare_context_maps_committed_lines_and_reuses_tests(
+    feature_repo: Repo, monkeypatch: pytest.MonkeyPatch
+):
+    work = Path(feature_repo.working_dir)
+    (work / "lib" / "util.py").write_text("def scale(y):\n    return y * 2\n")
+    (work / "lib" / "test_util.py").write_text(
+        "def test_scale():\n    assert scale(1) == 2\n"
+    )
+    feature_repo.index.add(["lib/util.py", "lib/test_util.py"])
+    feature_repo.index.commit("Add scale")
+    # Uncommitted edit shifting the definition away from the diffed lines
+    (work / "lib" / "util.py").write_text(
+        "import os\n\n\ndef scale(y):\n    return y * 2\n"
+    )
+    diffs = DiffSession(str(work)).compare(["origin/main"], fetch=False)
+    collected = []
+    original = TestExecutor.collect_metadata
+
+    def collect_metadata(self: TestExecutor):
+        collected.append(self)
+        return original(self)
+
+    monkeypatch.setattr(TestExecutor, "collect_metadata", collect_metadata)
+
+    context = repository_context(str(work), diffs)["origin/main"]
+    assert "`lib/util.py::scale` (function, lines 1-2)" in context
+    assert "Tests: `lib/test_util.py::test_scale`" in context
+    repository_context(str(work), diffs)
+    assert len(collected) == 1
+
+    (work / "lib" / "test_util.py").write_text(
+        (work / "lib" / "test_util.py").read_text() + "\n\ndef test_more():\n"
+        "    pass\n"
+    )
+    repository_context(str(work), diffs)
+    assert len(collected) == 2
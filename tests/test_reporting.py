@@ -0,0 +1,226 @@
+import os
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from codexa.client import knowledge
+from codexa.client.executor import TestExecutor
+from codexa.client.knowledge import FailureSignature, SignatureIndex
+from codexa.client.reporting import (
+    Escalation,
+    LocalReportEngine,
+    explain_missing_module,
+    generate_report,
+)
+from codexa.client.results import TestResult, parse_junit_xml
+
+FAILING_TESTS = """\
+import pytest
+
+
+def test_passes():
+    assert True
+
+
+def test_mismatch():
+    assert 1 + 1 == 3
+
+
+def test_missing_module():
+    import codexa_missing_module
+
+
+def test_missing_fixture(codexa_missing_fixture):
+    pass
+
+
+def test_unexplained():
+    raise RuntimeError("boom")
+"""
+
+
+def _run(tmp_path: Path, name: str, contents: str) -> TestExecutor:
+    test_file = tmp_path / name
+    test_file.write_text(contents)
+    executor = TestExecutor([str(test_file)])
+    executor.run()
+    return executor
+
+
+def test_executor_collects_structured_results(tmp_path: Path):
+    executor = _run(tmp_path, "test_structured_results.py", FAILING_TESTS)
+    results = {r.node_id.split("::")[-1]: r for r in executor.results}
+    assert results["test_passes"].outcome == "passed"
+    assert results["test_mismatch"].exception_type == "AssertionError"
+    assert results["test_mismatch"].message == "assert (1 + 1) == 3"
+    assert results["test_missing_fixture"].outcome == "error"
+    assert results["test_unexplained"].frames[-1].endswith(":test_unexplained")
+
+
+def test_local_engine_explains_known_failures(tmp_path: Path):
+    executor = _run(tmp_path, "test_known_failures.py", FAILING_TESTS)
+    explained, unexplained = LocalReportEngine().explain(executor.results)
+    categories = {e.result.node_id.split("::")[-1]: e.category for e in explained}
+    assert categories == {
+        "test_mismatch": "Assertion mismatch",
+        "test_missing_module": "Missing dependency",
+        "test_missing_fixture": "Missing fixture",
+    }
+    assert [r.node_id.split("::")[-1] for r in unexplained] == ["test_unexplained"]
+
+
+def test_unrecognized_import_error_is_not_explained():
+    failure = TestResult(
+        node_id="test_a.py::test_import",
+        outcome="failed",
+        exception_type="ImportError",
+        message="ImportError: cannot import name 'X' from 'pkg' (pkg/__init__.py)",
+    )
+    assert explain_missing_module(failure) is None
+
+
+def test_generate_report_all_pass_skips_llm():
+    scanner_factory = MagicMock()
+    results = [TestResult(node_id="test_a.py::test_ok", outcome="passed")]
+    report = generate_report(results, "1 passed", scanner_factory)
+    assert "All tests passed" in report
+    scanner_factory.assert_not_called()
+
+
+def test_generate_report_escalates_unexplained_only():
+    failure = TestResult(
+        node_id="test_a.py::test_boom",
+        outcome="failed",
+        exception_type="RuntimeError",
+        message="RuntimeError: boom",
+    )
+    scanner_factory = MagicMock()
+    scanner_factory.return_value.analyze_failures.return_value = "LLM analysis"
+    report = generate_report([failure], "1 failed", scanner_factory)
+    assert "LLM analysis" in report
+    scanner_factory.return_value.analyze_failures.assert_called_once_with(
+        [failure], appendix=None
+    )
+
+    scanner_factory.reset_mock()
+    report = generate_report([failure], "", scanner_factory, Escalation.NEVER)
+    assert "RuntimeError: boom" in report
+    scanner_factory.assert_not_called()
+
+
+def test_parse_junit_xml():
+    xml = """<?xml version="1.0" encoding="utf-8"?>
+    <testsuites><testsuite name="pytest">
+      <testcase classname="tests.test_x.TestBar" file="tests/test_x.py" name="test_ok"
+        time="0.5"/>
+      <testcase classname="tests.test_x" name="test_bad" time="0.25">
+        <failure message="assert 1 == 2">def test_bad():
+&gt;       assert 1 == 2
+E       assert 1 == 2
+
+tests/test_x.py:9: AssertionError</failure>
+      </testcase>
+    </testsuite></testsuites>"""
+    ok, bad = parse_junit_xml(xml)
+    assert ok.node_id == "tests/test_x.py::TestBar::test_ok"
+    assert ok.outcome == "passed" and ok.duration == 0.5
+    assert bad.node_id == "tests/test_x.py::test_bad"
+    assert bad.exception_type == "AssertionError"
+    assert bad.frames == ["tests/test_x.py"]
+
+
+def _failure(node_id: str, message: str) -> TestResult:
+    return TestResult(
+        node_id=node_id,
+        outcome="failed",
+        exception_type="ConnectionError",
+        message=message,
+        frames=["tests/test_api.py:test_call", "app/client.py:connect"],
+    )
+
+
+def test_failure_signature_ignores_volatile_details():
+    first = _failure("a.py::test_1", "Timed out after 5.2s at 0x7f3a in /tmp/x/y")
+    second = _failure("b.py::test_2", "Timed out after 9.9s at 0x1b2c in /var/z/w")
+    assert (
+        FailureSignature.from_result(first).digest
+        == FailureSignature.from_result(second).digest
+    )
+    other = _failure("a.py::test_1", "Connection refused")
+    assert (
+        FailureSignature.from_result(first).digest
+        != FailureSignature.from_result(other).digest
+    )
+
+
+def test_signature_index_expiry_and_invalidation(tmp_path: Path):
+    index = SignatureIndex(tmp_path / "signatures.json", ttl_days=1)
+    signature = FailureSignature.from_result(_failure("a.py::t", "refused"))
+    entry = index.store(signature, "Restart the service", "a.py::t")
+    index.save()
+
+    reloaded = SignatureIndex(tmp_path / "signatures.json", ttl_days=1)
+    assert reloaded.lookup(signature).analysis == "Restart the service"
+    entry.created_at -= 2 * 24 * 3600
+    assert index.lookup(signature) is None
+    assert index.prune() == 1
+    assert reloaded.invalidate(signature.digest)
+    assert reloaded.lookup(signature) is None
+
+
+def test_signature_index_merges_concurrent_saves(tmp_path: Path):
+    path = tmp_path / "signatures.json"
+    first, second = SignatureIndex(path), SignatureIndex(path)
+    refused = FailureSignature.from_result(_failure("a.py::t", "refused"))
+    reset = FailureSignature.from_result(_failure("b.py::t", "reset by peer"))
+    first.store(refused, "Restart the service", "a.py::t")
+    first.save()
+    second.store(reset, "Retry the call", "b.py::t")
+    second.save()
+
+    merged = SignatureIndex(path)
+    assert merged.lookup(refused).analysis == "Restart the service"
+    assert merged.lookup(reset).analysis == "Retry the call"
+    merged.save()
+    assert second.invalidate(refused.digest)
+    second.save()
+    assert SignatureIndex(path).lookup(refused) is None
+    assert SignatureIndex(path).lookup(reset).hits == 2
+
+
+def test_signature_index_saves_without_fcntl(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(knowledge, "fcntl", None)
+    path = tmp_path / "signatures.json"
+    lock_path = tmp_path / "signatures.json.lock"
+    lock_path.touch()
+    stale = time.time() - 2 * knowledge.LOCK_STALE_S
+    os.utime(lock_path, (stale, stale))
+
+    index = SignatureIndex(path)
+    signature = FailureSignature.from_result(_failure("a.py::t", "refused"))
+    index.store(signature, "Restart the service", "a.py::t")
+    index.save()
+    assert SignatureIndex(path).lookup(signature).analysis == "Restart the service"
+    assert not lock_path.exists()
+
+
+def test_generate_report_reuses_known_signatures(tmp_path: Path):
+    knowledge = SignatureIndex(tmp_path / "signatures.json")
+    scanner_factory = MagicMock()
+    scanner_factory.return_value.analyze_failures.return_value = (
+        "## a.py::test_1\n\nThe service is down, restart it."
+    )
+    failures = [_failure("a.py::test_1", "refused")]
+    report = generate_report(failures, "", scanner_factory, knowledge=knowledge)
+    assert "restart it" in report
+
+    scanner_factory.reset_mock()
+    rerun = [_failure("a.py::test_1", "refused")]
+    report = generate_report(rerun, "", scanner_factory, knowledge=knowledge)
+    assert "The service is down, restart it." in report
+    assert "Known failure" in report
+    scanner_factory.assert_not_called()
@@ -1,7 +1,14 @@
+import io
+import json
+import logging
+
 from pytest import MonkeyPatch, raises
 
 from codexa.core.env import load_api_key
 from codexa.core.errors import CodexaEnvironmentError
+from codexa.core.logs import configure_logging, flush_logging, shutdown_logging
+from codexa.core.output import ColorFormatter
+from codexa.core.profiling import Profiler
 
 
 def test_load_api_key_success(monkeypatch: MonkeyPatch):
@@ -17,3 +24,88 @@ def test_load_api_key_not_set_failure(monkeypatch: MonkeyPatch):
     monkeypatch.delenv("CODEXA_API_KEY", raising=False)
     with raises(CodexaEnvironmentError):
         _ = load_api_key()
+
+
+def test_profiler_disabled_records_nothing():
+    """Test that spans are no-ops while profiling is disabled."""
+    profiler = Profiler()
+    with profiler.span("phase"):
+        pass
+    assert profiler.spans == []
+
+
+def test_profiler_chrome_trace_and_summary():
+    """Test that recorded spans export to the Chrome trace format."""
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span("outer", detail="x"):
+        with profiler.span("inner"):
+            pass
+    profiler.timed("decorated")(lambda: None)()
+
+    trace = profiler.to_chrome_trace()
+    events = {event["name"]: event for event in trace["traceEvents"]}
+    assert set(events) == {"outer", "inner", "decorated"}
+    assert events["outer"]["ph"] == "X"
+    assert events["outer"]["args"] == {"detail": "x"}
+    assert events["outer"]["dur"] >= events["inner"]["dur"]
+    assert "outer" in profiler.format_summary()
+
+
+def test_configure_logging_is_idempotent():
+    try:
+        for _ in range(3):
+            logger = configure_logging(1, logger_name="codexa-test-idempotent")
+        assert len(logger.handlers) == 1
+    finally:
+        shutdown_logging()
+    assert not logger.handlers
+
+
+def test_json_logging_writes_timed_lines():
+    stream = io.StringIO()
+    try:
+        logger = configure_logging(
+            1, "json", logger_name="codexa-test-json", stream=stream
+        )
+        logger.info("Ran %d tests", 3, extra={"duration_ms": 12.5})
+        logger.debug("Filtered out")
+        flush_logging()
+    finally:
+        shutdown_logging()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["message"] == "Ran 3 tests"
+    assert entry["level"] == "INFO"
+    assert entry["duration_ms"] == 12.5
+    assert {"timestamp", "elapsed_ms", "thread"} <= set(entry)
+
+
+def test_json_logging_includes_tracebacks():
+    stream = io.StringIO()
+    try:
+        logger = configure_logging(
+            0, "json", logger_name="codexa-test-json-exc", stream=stream
+        )
+        try:
+            raise ValueError("bad input")
+        except ValueError:
+            logger.exception("Request failed")
+        flush_logging()
+    finally:
+        shutdown_logging()
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Request failed"
+    assert "ValueError: bad input" in entry["exception"]
+    assert "Traceback" in entry["exception"]
+
+
+def test_color_formatter_leaves_record_untouched():
+    formatter = ColorFormatter(fmt="[%(levelname)s] %(message)s")
+    record = logging.makeLogRecord(
+        {"levelno": logging.WARNING, "levelname": "WARNING", "msg": "careful"}
+    )
+    assert "WARNING" in formatter.format(record)
+    assert "\x1b[" in formatter.format(record)
+    assert record.levelname == "WARNING"
@@ -0,0 +1,123 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from git import Git, Repo
+
+from codexa.client import versioning
+from codexa.client.versioning import DiffCache, DiffSession
+from codexa.core.errors import CodexaRuntimeError
+from tests.helpers import commit_files
+from tests.tools import CommandRunner, verify_cli_output
+
+
+def test_diff_excludes_upstream_changes(feature_repo: Repo):
+    session = DiffSession(feature_repo.working_dir)
+    diff = session.compare(["origin/main"])["origin/main"].diff
+    assert "+x = 2" in diff
+    assert "-x = 1" in diff
+    assert "upstream.py" not in diff
+
+
+def test_session_shares_patches_between_refs(feature_repo: Repo):
+    session = DiffSession(feature_repo.working_dir)
+    diffs = session.compare(["origin/main", "origin/release"])
+    main, release = diffs["origin/main"], diffs["origin/release"]
+    assert main.merge_base == release.merge_base
+    assert main.diff == release.diff
+    assert sorted(main.files) == ["app.py", "lib/util.py"]
+    assert main.line_counts == (2, 2)
+
+
+def test_session_diffs_with_git_headers(feature_repo: Repo):
+    work = Path(feature_repo.working_dir)
+    lines = "".join(f"value_{i} = {i}\n" for i in range(10))
+    commit_files(feature_repo, {"lib/values.py": lines}, "Add values")
+    feature_repo.create_head("base")
+    feature_repo.git.mv("lib/values.py", "lib/constants.py")
+    (work / "app.py").write_text("x = 3")
+    feature_repo.index.add(["app.py"])
+    feature_repo.index.commit("Move values")
+    diff = DiffSession(str(work)).compare(["base"], fetch=False)["base"]
+    assert diff.files == ["app.py", "lib/constants.py"]
+    assert diff.diff.startswith("diff --git a/app.py b/app.py\nindex ")
+    assert "\\ No newline at end of file\n" in diff.diff
+    assert "rename from lib/values.py\nrename to lib/constants.py\n" in diff.diff
+
+
+def test_session_reuses_repository_handles(
+    feature_repo: Repo, monkeypatch: pytest.MonkeyPatch
+):
+    opened = []
+
+    def open_repository(path: str) -> Repo:
+        opened.append(path)
+        return Repo(path, search_parent_directories=True)
+
+    monkeypatch.setattr(versioning, "open_repository", open_repository)
+    session = DiffSession(feature_repo.working_dir)
+    refs = ["origin/main", "origin/release"]
+    first = session.compare(refs, fetch=False)
+    handles = len(opened)
+    assert session.compare(refs, fetch=False) == first
+    assert len(opened) == handles
+
+
+def test_session_rejects_unknown_ref(feature_repo: Repo):
+    with pytest.raises(CodexaRuntimeError, match="Failed to get git diff"):
+        DiffSession(feature_repo.working_dir).compare(["origin/missing"])
+
+
+def test_session_scopes_diff_to_subdirectory(feature_repo: Repo):
+    subdir = Path(feature_repo.working_dir) / "lib"
+    diff = DiffSession(str(subdir)).compare(["origin/main"])["origin/main"]
+    assert diff.pathspec == "lib"
+    assert diff.files == ["lib/util.py"]
+    assert "app.py" not in diff.diff
+
+
+def test_cached_diff_skips_diffing(
+    feature_repo: Repo, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    cache = DiffCache(tmp_path / "diff-cache")
+    first = DiffSession(feature_repo.working_dir, cache=cache).compare(["origin/main"])
+    assert len(list((tmp_path / "diff-cache").glob("*.json"))) == 1
+
+    def no_diff(*args, **kwargs):
+        raise AssertionError("diff recomputed despite a cache hit")
+
+    monkeypatch.setattr(Git, "diff", no_diff, raising=False)
+    second = DiffSession(feature_repo.working_dir, cache=cache).compare(
+        ["origin/main"], fetch=False
+    )
+    assert second == first
+
+    monkeypatch.undo()
+    commit_files(feature_repo, {"app.py": "x = 3\n"}, "Follow-up")
+    third = DiffSession(feature_repo.working_dir, cache=cache).compare(["origin/main"])
+    assert "+x = 3" in third["origin/main"].diff
+    assert len(list((tmp_path / "diff-cache").glob("*.json"))) == 2
+
+
+def test_compare_multiple_refs_writes_reports(
+    runner: CommandRunner,
+    feature_repo: Repo,
+    mock_openai_client: MagicMock,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv("CODEXA_API_KEY", "dummy-key")
+    monkeypatch.setenv("CODEXA_NO_DAEMON", "1")
+    output = tmp_path / "report.md"
+    result = runner.run_cli(
+        ["compare", "-d", feature_repo.working_dir, "-q", "-o", str(output)]
+        + ["-r", "origin/main", "-r", "origin/release"]
+    )
+    verify_cli_output(result, 0)
+    create = mock_openai_client.return_value.chat.completions.create
+    assert create.call_count == 2
+    summary = output.read_text()
+    assert "| `origin/main` |" in summary
+    assert "- 2 passed, 1 failed" in summary
+    assert (tmp_path / "report-origin-main.md").is_file()
+    assert (tmp_path / "report-origin-release.md").is_file()